@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+تطبيع النص العربي للبحث: إزالة التشكيل، توحيد الألف والياء والتاء المربوطة، وتجذيع خفيف
+"""
+
+import re
+
+# التشكيل (فتحتان حتى السكون) والألف الخنجرية والتطويل تُحذف
+_DIACRITICS = {code: None for code in range(0x064B, 0x0653)}
+_DIACRITICS[0x0670] = None
+_DIACRITICS[0x0640] = None
+
+NORMALIZE_TABLE = str.maketrans({
+    **_DIACRITICS,
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+})
+
+_WORD_RE = re.compile(r"\w+")
+
+# سوابق ولواحق التجذيع الخفيف (الأطول أولاً)
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال", "و")
+_SUFFIXES = ("ها", "هم", "كم", "نا", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+MIN_STEM = 3
+
+def normalize(text):
+    """إزالة التشكيل وتوحيد أشكال الحروف"""
+    return text.translate(NORMALIZE_TABLE)
+
+def light_stem(word):
+    """تجذيع خفيف: حذف سابقة ولاحقة شائعتين مع إبقاء ثلاثة أحرف على الأقل"""
+    for prefix in _PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= MIN_STEM:
+            word = word[len(prefix):]
+            break
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    return word
+
+def tokenize(text):
+    """كلمات النص بعد التطبيع والتجذيع"""
+    return [light_stem(word) for word in _WORD_RE.findall(normalize(text))]
+
+def search_form(text):
+    """الصيغة المفهرسة للنص: كلمات مطبعة ومجذعة مفصولة بمسافات"""
+    return " ".join(tokenize(text))
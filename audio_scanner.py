@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+مسح مجلدات الصوتيات بمرور واحد مع إزالة التكرار حسب الصيغة المفضلة
+"""
+
+import os
+from pathlib import Path
+
+import transcript_cache
+
+# ترتيب التفضيل عند وجود نفس الاسم بأكثر من صيغة (الأول هو الأفضل)
+DEFAULT_PREFERENCE = ('.mp3', '.m4a', '.opus', '.wav', '.flac')
+
+def _scan_directory(directory, ranks):
+    """مرور os.scandir واحد: أفضل ملف لكل اسم والمجلدات الفرعية"""
+    best = {}  # stem -> (rank, path)
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            stem, ext = os.path.splitext(entry.name)
+            rank = ranks.get(ext.lower())
+            if rank is None or not entry.is_file():
+                continue
+            if stem not in best or rank < best[stem][0]:
+                best[stem] = (rank, entry.path)
+    return best, subdirs
+
+def iter_audio_files(audio_dir="audio_files", preference=DEFAULT_PREFERENCE,
+                     recursive=False, dedup_by_hash=False):
+    """إرجاع الملفات الصوتية تدريجياً، مجلداً بعد مجلد، دون تكرار"""
+    ranks = {ext.lower(): i for i, ext in enumerate(preference)}
+    seen_hashes = set()
+    pending = [str(audio_dir)]
+
+    while pending:
+        best, subdirs = _scan_directory(pending.pop(), ranks)
+        for stem in sorted(best):
+            path = Path(best[stem][1])
+            if dedup_by_hash:
+                # نفس المحتوى بأسماء مختلفة (إعادة رفع مثلاً)
+                audio_hash = transcript_cache.file_hash(path)
+                if audio_hash in seen_hashes:
+                    continue
+                seen_hashes.add(audio_hash)
+            yield path
+        if recursive:
+            pending.extend(sorted(subdirs, reverse=True))
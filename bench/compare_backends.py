@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+مقارنة واجهات التحويل على محاضراتنا: معامل الزمن الحقيقي (RTF) ونسبة خطأ الحروف (CER)
+
+المرجع افتراضياً هو ملفات التوقيتات الموجودة (مخرجات openai-whisper base)، فالـ CER
+حينها يقيس التطابق معها لا الدقة المطلقة؛ لقياس الدقة مرّر --reference-dir بنصوص مصححة يدوياً.
+
+أمثلة:
+    python bench/compare_backends.py audio_files/*.mp3 --seconds 120
+    python bench/compare_backends.py lecture.mp3 --reference-dir refs/ --output bench/backends.json
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import contextlib
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from run_bench import REPO_ROOT, TRANSCRIPTS_DIR, _peak_rss_mb
+
+sys.path.insert(0, str(REPO_ROOT))
+
+SAMPLE_RATE = 16000
+
+def load_excerpt(audio_file, seconds):
+    """أول seconds ثانية من الملف كعينات 16 kHz (نفس العينات لكل الواجهات)"""
+    output = subprocess.run([
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", str(audio_file), "-t", str(seconds),
+        "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le", "-"
+    ], capture_output=True, check=True).stdout
+    return np.frombuffer(output, dtype=np.float32).copy()
+
+def reference_text(audio_file, reference_dir, seconds):
+    """نص المرجع للمقطع نفسه (المقاطع التي تبدأ قبل seconds) أو None"""
+    import segment_store
+    timestamps = Path(reference_dir) / f"{Path(audio_file).stem}_transcript_timestamps.txt"
+    if not timestamps.exists():
+        return None
+    return "".join(s["text"] for s in segment_store.read_timestamps_file(timestamps) if s["start"] < seconds)
+
+def _normalize_for_cer(text):
+    """توحيد النص قبل المقارنة: تطبيع الحروف وحذف الترقيم وتوحيد المسافات"""
+    import arabic_text
+    return " ".join(re.findall(r"\w+", arabic_text.normalize(text)))
+
+def edit_distance(a, b):
+    """مسافة ليفنشتاين بصف NumPy لكل حرف من a (الإدراج عبر minimum.accumulate)"""
+    if not a:
+        return len(b)
+    b_codes = np.array([ord(c) for c in b], dtype=np.int32)
+    steps = np.arange(len(b) + 1, dtype=np.int32)
+    row = steps.copy()
+    for i, ch in enumerate(a, 1):
+        substitute = row[:-1] + (b_codes != ord(ch))
+        delete = row[1:] + 1
+        current = np.empty_like(row)
+        current[0] = i
+        current[1:] = np.minimum(substitute, delete)
+        # الإدراج: current[j] = min(current[j], current[j-1] + 1)
+        row = np.minimum.accumulate(current - steps) + steps
+    return int(row[-1])
+
+def cer(hypothesis, reference):
+    """نسبة خطأ الحروف"""
+    hypothesis, reference = _normalize_for_cer(hypothesis), _normalize_for_cer(reference)
+    return edit_distance(reference, hypothesis) / max(len(reference), 1)
+
+def _child(backend, model, excerpts, batched, results):
+    """تحويل كل المقاطع بواجهة واحدة داخل عملية مستقلة"""
+    os.chdir(REPO_ROOT)
+    try:
+        import transcription_backends
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            model_obj = transcription_backends.get_backend(backend, model)
+            load_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            if batched:
+                texts = [r["text"] for r in model_obj.transcribe_many(excerpts, language="ar")]
+            else:
+                texts = [model_obj.transcribe(samples, language="ar", verbose=None)["text"]
+                         for samples in excerpts]
+            wall = time.perf_counter() - started
+        results.put({"load_seconds": load_seconds, "wall_seconds": wall,
+                     "peak_rss_mb": _peak_rss_mb(), "texts": texts})
+    except Exception as e:
+        results.put({"error": str(e)})
+
+def run_backend(backend, model, excerpts, batched=False):
+    """تشغيل واجهة في عملية جديدة (spawn) حتى لا تتشارك الذاكرة مع غيرها"""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(backend, model, excerpts, batched, results))
+    proc.start()
+    metrics = results.get()
+    proc.join()
+    return metrics
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="مقارنة openai-whisper و faster-whisper")
+    parser.add_argument("audio_files", nargs="+")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--seconds", type=float, default=120, help="طول المقطع المأخوذ من بداية كل ملف")
+    parser.add_argument("--reference-dir", default=str(TRANSCRIPTS_DIR))
+    parser.add_argument("--output", default="bench/backends.json")
+    args = parser.parse_args()
+
+    excerpts = [load_excerpt(f, args.seconds) for f in args.audio_files]
+    audio_seconds = sum(len(samples) for samples in excerpts) / SAMPLE_RATE
+    references = [reference_text(f, args.reference_dir, args.seconds) for f in args.audio_files]
+
+    plan = [
+        ("whisper", "whisper", False),
+        ("faster-whisper", "faster-whisper", False),
+        ("faster-whisper-batched", "faster-whisper", True),
+    ]
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model": args.model,
+            "files": [str(f) for f in args.audio_files],
+            "audio_seconds": audio_seconds,
+            "reference_dir": args.reference_dir,
+        },
+        "results": {},
+    }
+    for name, backend, batched in plan:
+        print(f"⏱️  {name}...", flush=True)
+        metrics = run_backend(backend, args.model, excerpts, batched)
+        if "error" not in metrics:
+            texts = metrics.pop("texts")
+            metrics["rtf"] = metrics["wall_seconds"] / audio_seconds
+            scored = [cer(text, ref) for text, ref in zip(texts, references) if ref is not None]
+            metrics["cer"] = sum(scored) / len(scored) if scored else None
+            metrics["files_scored"] = len(scored)
+        report["results"][name] = metrics
+        print(f"   {json.dumps(metrics, ensure_ascii=False)}")
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✓ تم حفظ النتائج في: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+قياس أداء خط التحويل والتلخيص: زمن كل مرحلة، معامل الزمن الحقيقي، الذاكرة القصوى، وكلمات/ثانية
+
+كل حالة تعمل في عملية مستقلة حتى تكون الذاكرة القصوى خاصة بها.
+
+أمثلة:
+    python bench/run_bench.py --output bench/results.json
+    python bench/run_bench.py --clips 1 --output new.json --compare bench/baseline.json
+"""
+
+import io
+import os
+import sys
+import json
+import queue
+import time
+import argparse
+import contextlib
+import platform
+import resource
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+FIXTURES_DIR = REPO_ROOT / "bench" / "fixtures"
+TRANSCRIPTS_DIR = REPO_ROOT / "ملخصات_الصوتيات" / "transcripts"
+RESULT_POLL_SECONDS = 1.0  # فترة التحقق من بقاء عملية الحالة حية أثناء انتظار مقاييسها
+
+def _peak_rss_mb():
+    """الذاكرة القصوى للعملية الحالية بالميغابايت"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # لينكس بالكيلوبايت، macOS بالبايت
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def make_clip(minutes):
+    """مقطع اصطناعي ثابت (نغمة + ضوضاء بذرة ثابتة + فترات صمت) يُنشأ مرة واحدة"""
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    clip = FIXTURES_DIR / f"clip_{minutes}min.mp3"
+    if not clip.exists():
+        seconds = minutes * 60
+        subprocess.run([
+            "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+            "-f", "lavfi", "-i", f"anoisesrc=duration={seconds}:amplitude=0.05:seed=42",
+            "-filter_complex", "amix=inputs=2,volume='if(lt(mod(t,20),15),1,0)':eval=frame",
+            "-ar", "16000", "-ac", "1", str(clip)
+        ], check=True)
+    return clip
+
+def make_scan_dir(n_files=5000):
+    """مجلد بأسماء ملفات فارغة (نصفها mp3/m4a مكرر) لقياس المسح"""
+    scan_dir = FIXTURES_DIR / f"scan_{n_files}"
+    if not scan_dir.exists():
+        scan_dir.mkdir(parents=True)
+        for i in range(n_files):
+            (scan_dir / f"lecture_{i:05d}.mp3").touch()
+            if i % 2 == 0:
+                (scan_dir / f"lecture_{i:05d}.m4a").touch()
+    return scan_dir
+
+# ---------------------------------------------------------------------------
+# الحالات: كل دالة تُجهّز ما تحتاجه ثم تعيد (الزمن، مقاييس إضافية)
+
+def case_get_audio_files(args):
+    import process_audio_improved
+    scan_dir = make_scan_dir()
+    started = time.perf_counter()
+    files = process_audio_improved.get_audio_files(scan_dir)
+    return time.perf_counter() - started, {"files": len(files)}
+
+def case_model_load(args):
+    import model_registry
+    started = time.perf_counter()
+    model_registry.get_model(args["model"])
+    return time.perf_counter() - started, {}
+
+def case_transcribe(args):
+    import model_registry
+    clip = make_clip(args["minutes"])
+    audio_seconds = args["minutes"] * 60
+    model = model_registry.get_model(args["model"])
+    started = time.perf_counter()
+    result = model.transcribe(str(clip), language="ar", verbose=None)
+    elapsed = time.perf_counter() - started
+    words = len(result["text"].split())
+    return elapsed, {"audio_seconds": audio_seconds, "rtf": elapsed / audio_seconds, "words": words}
+
+def case_save_transcript(args):
+    import tempfile
+    import process_all_audio
+    import segment_store
+    fixtures = sorted(TRANSCRIPTS_DIR.glob("*_transcript_timestamps.txt"))
+    results = [
+        (Path(f.name.replace("_transcript_timestamps.txt", ".mp3")), segment_store.read_timestamps_file(f))
+        for f in fixtures
+    ]
+    words = 0
+    with tempfile.TemporaryDirectory() as out_dir:
+        started = time.perf_counter()
+        for audio_file, segments in results:
+            text = "".join(s["text"] for s in segments)
+            words += len(text.split())
+            process_all_audio.save_transcript(audio_file, {"text": text, "segments": segments}, out_dir)
+        elapsed = time.perf_counter() - started
+    return elapsed, {"files": len(results), "words": words}
+
+def case_create_smart_summary(args):
+    import create_smart_summaries
+    fixtures = sorted(TRANSCRIPTS_DIR.glob("*_transcript.txt"))
+    words = 0
+    started = time.perf_counter()
+    for transcript_file in fixtures:
+        summary = create_smart_summaries.create_smart_summary(transcript_file, transcript_file.stem)
+        words += summary["statistics"]["word_count"]
+    return time.perf_counter() - started, {"files": len(fixtures), "words": words}
+
+def case_format_summary_markdown(args):
+    import create_smart_summaries
+    fixtures = sorted(TRANSCRIPTS_DIR.glob("*_transcript.txt"))
+    summaries = [create_smart_summaries.create_smart_summary(f, f.stem) for f in fixtures]
+    started = time.perf_counter()
+    for summary in summaries:
+        create_smart_summaries.format_summary_markdown(summary)
+    return time.perf_counter() - started, {"files": len(summaries)}
+
+CASES = {
+    "get_audio_files": case_get_audio_files,
+    "model_load": case_model_load,
+    "transcribe": case_transcribe,
+    "save_transcript": case_save_transcript,
+    "create_smart_summary": case_create_smart_summary,
+    "format_summary_markdown": case_format_summary_markdown,
+}
+
+def _child(case_name, args, results):
+    """تشغيل حالة واحدة داخل عملية مستقلة وإرجاع مقاييسها"""
+    os.chdir(REPO_ROOT)
+    try:
+        # إخفاء مخرجات السكريبتات نفسها حتى يبقى التقرير مقروءاً
+        with contextlib.redirect_stdout(io.StringIO()):
+            wall, extra = CASES[case_name](args)
+        metrics = {"wall_seconds": wall, "peak_rss_mb": _peak_rss_mb(), **extra}
+        if extra.get("words"):
+            metrics["words_per_second"] = extra["words"] / wall if wall > 0 else 0.0
+        results.put(metrics)
+    except Exception as e:
+        results.put({"error": str(e)})
+
+def run_case(case_name, args):
+    """تشغيل حالة في عملية جديدة (spawn) لعزل الذاكرة والنماذج المحملة"""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(case_name, args, results))
+    proc.start()
+    while True:
+        try:
+            metrics = results.get(timeout=RESULT_POLL_SECONDS)
+            break
+        except queue.Empty:
+            if proc.is_alive():
+                continue
+        # العملية انتهت: مقاييس أُرسلت قبل خروجها مباشرة قد تكون ما زالت في الأنبوب
+        try:
+            metrics = results.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            # ماتت قبل إرسال مقاييسها (نفاد الذاكرة، انهيار)
+            metrics = {"error": f"انتهت عملية الحالة دون نتيجة (رمز الخروج {proc.exitcode})"}
+        break
+    proc.join()
+    return metrics
+
+def compare(current, baseline, threshold):
+    """مقارنة النتائج بخط أساس وإرجاع قائمة التراجعات"""
+    regressions = []
+    for name, metrics in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or "wall_seconds" not in base or "wall_seconds" not in metrics:
+            continue
+        for key in ("wall_seconds", "peak_rss_mb"):
+            if base.get(key) and metrics[key] > base[key] * (1 + threshold):
+                change = metrics[key] / base[key] - 1
+                regressions.append(f"{name}.{key}: {base[key]:.3f} → {metrics[key]:.3f} (+{change:.0%})")
+    return regressions
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="قياس أداء خط المعالجة")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--clips", type=int, nargs="*", default=[1, 10, 60],
+                        help="أطوال المقاطع الاصطناعية بالدقائق")
+    parser.add_argument("--no-model", action="store_true",
+                        help="تخطي تحميل النموذج والتحويل (قياس النصوص فقط)")
+    parser.add_argument("--output", default="bench/results.json")
+    parser.add_argument("--compare", help="ملف JSON لخط أساس سابق")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="نسبة التراجع المسموحة قبل التنبيه")
+    args = parser.parse_args()
+
+    plan = [("get_audio_files", "get_audio_files", {})]
+    if not args.no_model:
+        plan.append(("model_load", "model_load", {"model": args.model}))
+        for minutes in args.clips:
+            plan.append((f"transcribe_{minutes}min", "transcribe", {"model": args.model, "minutes": minutes}))
+    plan += [
+        ("save_transcript", "save_transcript", {}),
+        ("create_smart_summary", "create_smart_summary", {}),
+        ("format_summary_markdown", "format_summary_markdown", {}),
+    ]
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model,
+        },
+        "results": {},
+    }
+    for name, case, case_args in plan:
+        print(f"⏱️  {name}...", flush=True)
+        metrics = run_case(case, case_args)
+        report["results"][name] = metrics
+        print(f"   {json.dumps(metrics, ensure_ascii=False)}")
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✓ تم حفظ النتائج في: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ تراجعات أكبر من {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\n✓ لا تراجعات مقارنة بـ {args.compare}")
+
+if __name__ == "__main__":
+    main()
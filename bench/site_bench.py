@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+قياس موقع الإعلان قبل البناء وبعده: البايتات المنقولة وتقدير زمن الرسم الأول
+
+التقدير نموذج شبكة بسيط (افتراضياً "4G بطيء" كما في Lighthouse للجوال): إنشاء كل اتصال جديد
+(DNS + TCP + TLS)، بدء TCP البطيء بنافذة أولى 10 حزم، وعرض النطاق. الرسم الأول ينتظر الصفحة
+وكل مورد يعطل العرض في <head> (أوراق الأنماط والسكربتات المتزامنة)؛ أحجام الموارد الخارجية
+غير المعروفة محلياً تقديرية (EXTERNAL_BYTES).
+
+عمود "الصفحة" هو ما يُنقل في الزيارة المتكررة: الأصول ذات الأسماء المشتقة من المحتوى تبقى في
+ذاكرة المتصفح سنة كاملة. في الزيارة الأولى قد يزيد المنقول قليلاً لأن CSS الحرج يُرسل مرتين.
+
+أمثلة:
+    python build_site.py && python bench/site_bench.py
+    python bench/site_bench.py --rtt-ms 40 --mbps 10 --output bench/site.json
+"""
+
+import re
+import sys
+import gzip
+import json
+import argparse
+from urllib.parse import urlparse
+
+from run_bench import REPO_ROOT
+
+sys.path.insert(0, str(REPO_ROOT))
+
+import build_site
+
+RTT_MS = 150
+MBPS = 1.6
+INIT_CWND_BYTES = 10 * 1460
+SETUP_ROUND_TRIPS = 3        # DNS + TCP + TLS 1.3
+EXTERNAL_BYTES = 1500        # تقدير حجم ورقة خطوط Google المضغوطة
+
+_BLOCKING = re.compile(
+    r'<link\b(?=[^>]*\brel="stylesheet")[^>]*\bhref="([^"]+)"[^>]*>'
+    r'|<script\b(?![^>]*\b(?:defer|async)\b)[^>]*\bsrc="([^"]+)"[^>]*>'
+)
+
+def encoded_sizes(data):
+    """حجم الملف بلا ضغط، وبـ gzip، وبـ Brotli إن وُجدت المكتبة"""
+    sizes = {"identity": len(data), "gzip": len(gzip.compress(data, compresslevel=9, mtime=0))}
+    if build_site.brotli:
+        sizes["br"] = len(build_site.brotli.compress(data, quality=11))
+    return sizes
+
+def transfer_ms(size, rtt_ms, mbps):
+    """زمن استلام size بايت على اتصال قائم: جولات بدء TCP البطيء + زمن الإرسال"""
+    rounds, sent, window = 1, INIT_CWND_BYTES, INIT_CWND_BYTES
+    while sent < size:
+        window *= 2
+        sent += window
+        rounds += 1
+    return rounds * rtt_ms + size * 8 / (mbps * 1000)
+
+def blocking_resources(html):
+    """الموارد التي تعطل الرسم الأول: في <head> وخارج <noscript>"""
+    head = html[:html.find("</head>")] if "</head>" in html else html
+    head = re.sub(r"<noscript>.*?</noscript>", "", head, flags=re.S)
+    return [link or script for link, script in _BLOCKING.findall(head)]
+
+def measure(page, encoding, rtt_ms, mbps):
+    """البايتات المنقولة (الصفحة وأصولها المحلية) وتقدير الرسم الأول لترميز واحد"""
+    html = page.read_text(encoding="utf-8")
+    local = [page] + [page.parent / m for m in re.findall(r'(?:href|src)="(assets/[^"]+)"', html)]
+    total = sum(encoded_sizes(path.read_bytes()).get(encoding, 0) for path in local)
+    html_bytes = encoded_sizes(page.read_bytes())[encoding]
+
+    first_paint = SETUP_ROUND_TRIPS * rtt_ms + transfer_ms(html_bytes, rtt_ms, mbps)
+    waits = []
+    origins = set()
+    for url in blocking_resources(html):
+        origin = urlparse(url).netloc
+        if origin:
+            # اتصال جديد لكل أصل خارجي (preconnect يسبقه لكنه لا يلغي زمن الطلب)
+            size = EXTERNAL_BYTES
+            setup = 0 if origin in origins else SETUP_ROUND_TRIPS * rtt_ms
+            origins.add(origin)
+        else:
+            size = encoded_sizes((page.parent / url).read_bytes())[encoding]
+            setup = 0
+        waits.append(setup + transfer_ms(size, rtt_ms, mbps))
+    first_paint += max(waits, default=0)
+    return {"transfer_bytes": total, "html_bytes": html_bytes,
+            "blocking_requests": len(waits), "first_paint_ms": round(first_paint)}
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="قياس موقع الإعلان قبل البناء وبعده")
+    parser.add_argument("--rtt-ms", type=float, default=RTT_MS)
+    parser.add_argument("--mbps", type=float, default=MBPS)
+    parser.add_argument("--output", help="حفظ النتائج بصيغة JSON")
+    args = parser.parse_args()
+
+    built = build_site.DIST_DIR / "index.html"
+    if not built.exists():
+        print("⚠ لم يُبنَ الموقع بعد: python build_site.py")
+        sys.exit(1)
+
+    encodings = ["identity", "gzip"] + (["br"] if build_site.brotli else [])
+    cases = {"قبل": build_site.SITE_DIR / "quran_program_announcement.html", "بعد": built}
+    report = {"rtt_ms": args.rtt_ms, "mbps": args.mbps, "results": {}}
+    print(f"الشبكة: RTT {args.rtt_ms:.0f} ms، {args.mbps} Mbps\n")
+    print(f"{'':<6}{'الترميز':<10}{'المنقول':>10}{'الصفحة':>10}{'معطِّلة':>9}{'الرسم الأول':>14}")
+    for name, page in cases.items():
+        for encoding in encodings:
+            result = measure(page, encoding, args.rtt_ms, args.mbps)
+            report["results"][f"{name}/{encoding}"] = result
+            print(f"{name:<6}{encoding:<10}{result['transfer_bytes']:>10,}{result['html_bytes']:>10,}"
+                  f"{result['blocking_requests']:>9}{result['first_paint_ms']:>11,} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ تم حفظ النتائج في: {args.output}")
+
+if __name__ == "__main__":
+    main()
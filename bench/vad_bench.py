@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+قياس أثر تقطيع الكلام (--vad) على معامل الزمن الحقيقي: نفس الملفات ونفس النموذج بالمسارين
+
+RTF مع التقطيع يشمل زمن التقطيع نفسه. عمود "مقاطع في الصمت" يعد مقاطع التحويل الكامل التي تقع
+بالكامل خارج مقاطع الكلام (غالباً نص وهمي من الصمت أو الضوضاء).
+
+أمثلة:
+    python bench/vad_bench.py audio_files/*.mp3 --seconds 600
+    python bench/vad_bench.py lecture.mp3 --model small --output bench/vad.json
+"""
+
+import sys
+import json
+import time
+import argparse
+
+from run_bench import REPO_ROOT
+
+sys.path.insert(0, str(REPO_ROOT))
+
+import speech_segmentation
+import transcription_backends
+
+def _outside_speech(segments, regions):
+    """عدد المقاطع التي لا تتقاطع مع أي مقطع كلامي"""
+    return sum(
+        not any(s["start"] < end and s["end"] > start for start, end in regions)
+        for s in segments
+    )
+
+def bench_file(model, audio_file, seconds, language):
+    import whisper
+    samples = whisper.load_audio(str(audio_file))
+    if seconds:
+        samples = samples[:int(seconds * speech_segmentation.SAMPLE_RATE)]
+    duration = len(samples) / speech_segmentation.SAMPLE_RATE
+
+    started = time.perf_counter()
+    full = model.transcribe(samples, language=language, task="transcribe", verbose=None)
+    full_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    regions = speech_segmentation.speech_regions(samples)
+    vad_seconds = time.perf_counter() - started
+    speech, _ = speech_segmentation.transcribe_speech(model, samples, language=language,
+                                                      task="transcribe", verbose=None)
+    speech_total = time.perf_counter() - started
+
+    return {
+        "file": str(audio_file),
+        "audio_seconds": duration,
+        "speech_ratio": sum(end - start for start, end in regions) / max(duration, 1e-9),
+        "rtf_full": full_seconds / duration,
+        "rtf_vad": speech_total / duration,
+        "vad_rtf": vad_seconds / duration,
+        "segments_full": len(full["segments"]),
+        "segments_vad": len(speech["segments"]),
+        "full_segments_outside_speech": _outside_speech(full["segments"], regions),
+    }
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="معامل الزمن الحقيقي مع تقطيع الكلام وبدونه")
+    parser.add_argument("audio_files", nargs="+")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--backend", choices=transcription_backends.BACKENDS, default="whisper")
+    parser.add_argument("--seconds", type=float, default=0, help="أول N ثانية من كل ملف (0 = كاملاً)")
+    parser.add_argument("--language", default="ar")
+    parser.add_argument("--output", help="حفظ النتائج بصيغة JSON")
+    args = parser.parse_args()
+
+    model = transcription_backends.get_backend(args.backend, args.model)
+    results = []
+    print(f"{'الملف':<40}{'كلام':>7}{'RTF كامل':>10}{'RTF كلام':>10}{'التوفير':>9}{'وهمية':>7}")
+    for audio_file in args.audio_files:
+        result = bench_file(model, audio_file, args.seconds, args.language)
+        results.append(result)
+        saving = 1 - result["rtf_vad"] / result["rtf_full"]
+        print(f"{str(audio_file)[-40:]:<40}{result['speech_ratio']:>7.0%}{result['rtf_full']:>10.3f}"
+              f"{result['rtf_vad']:>10.3f}{saving:>9.0%}{result['full_segments_outside_speech']:>7}")
+
+    audio = sum(r["audio_seconds"] for r in results)
+    rtf_full = sum(r["rtf_full"] * r["audio_seconds"] for r in results) / audio
+    rtf_vad = sum(r["rtf_vad"] * r["audio_seconds"] for r in results) / audio
+    print(f"\nالمجموع ({audio / 60:.1f} دقيقة): RTF {rtf_full:.3f} ← {rtf_vad:.3f} "
+          f"(توفير {1 - rtf_vad / rtf_full:.0%})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "backend": args.backend, "files": results,
+                       "rtf_full": rtf_full, "rtf_vad": rtf_vad}, f, ensure_ascii=False, indent=2)
+        print(f"✓ تم حفظ النتائج في: {args.output}")
+
+if __name__ == "__main__":
+    main()
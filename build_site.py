@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+بناء موقع الإعلان (quran-program-app) للنشر: تصغير HTML/CSS/JS، تضمين CSS الحرج فقط،
+أصول بأسماء مشتقة من محتواها، نسخ Brotli و gzip مضغوطة مسبقاً، وتحويل og-image.svg إلى PNG
+
+الناتج في quran-program-app/dist (يُنشر بإعدادات vercel.json).
+
+أمثلة:
+    python build_site.py
+    python build_site.py --fold-sections 2
+"""
+
+import re
+import sys
+import gzip
+import shutil
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SITE_DIR = Path(__file__).resolve().parent / "quran-program-app"
+DIST_DIR = SITE_DIR / "dist"
+
+# الصفحة المصدر -> اسمها في الناتج
+PAGES = {
+    "quran_program_announcement.html": "index.html",
+    "quran_program_teaser_poster.html": "quran_program_teaser_poster.html",
+}
+COMPRESSIBLE = (".html", ".css", ".js", ".svg")
+FOLD_SECTIONS = 1   # الأقسام الظاهرة دون تمرير بعد الترويسة (CSS الحرج يُستخرج منها)
+FULL_INLINE_RATIO = 0.9   # إذا كان الحرج أغلب الأنماط تُضمَّن كلها بلا ملف منفصل
+HASH_CHARS = 10
+
+_STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+# ----------------------------------------------------------------------
+# التصغير
+
+def _outside_strings(text, func):
+    """تطبيق func على أجزاء النص خارج السلاسل النصية فقط"""
+    parts = []
+    last = 0
+    for match in _STRING.finditer(text):
+        parts.append(func(text[last:match.start()]))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(func(text[last:]))
+    return "".join(parts)
+
+def minify_css(css):
+    """حذف التعليقات والمسافات الزائدة (السلاسل النصية تبقى كما هي)"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+
+    def squeeze(part):
+        part = re.sub(r"\s+", " ", part)
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        return re.sub(r":\s+", ":", part)
+
+    return _outside_strings(css, squeeze).replace(";}", "}").strip()
+
+# ما قبل / الذي يبدأ تعبيراً نمطياً لا قسمة
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+
+def minify_js(js):
+    """تصغير محافظ: حذف التعليقات والمسافات في أطراف الأسطر مع إبقاء الأسطر (آمن مع الفاصلة المنقوطة التلقائية)"""
+    out = []
+    last = ""   # آخر حرف غير فارغ خارج التعليقات
+    i, n = 0, len(js)
+    while i < n:
+        char = js[i]
+        if js.startswith("//", i):
+            end = js.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if js.startswith("/*", i):
+            end = js.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if char in "\"'`" or (char == "/" and (not last or last in _REGEX_PRECEDERS)):
+            # سلسلة نصية أو قالب أو تعبير نمطي حرفي: يُنسخ كما هو
+            end = i + 1
+            in_class = False
+            while end < n and (js[end] != char or in_class):
+                if js[end] == "\\":
+                    end += 1
+                elif char == "/" and js[end] in "[]":
+                    in_class = js[end] == "["
+                end += 1
+            out.append(js[i:end + 1])
+            last = char
+            i = end + 1
+            continue
+        out.append(char)
+        if not char.isspace():
+            last = char
+        i += 1
+    lines = (line.strip() for line in "".join(out).splitlines())
+    return "\n".join(line for line in lines if line)
+
+_RAW_BLOCK = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2>)", re.S | re.I)
+
+def minify_html(html):
+    """حذف التعليقات وطي المسافات خارج pre/textarea/script/style"""
+    parts = _RAW_BLOCK.split(html)
+    result = []
+    # split يعيد: نص، الكتلة كاملة، اسم الوسم، نص، ...
+    for i in range(0, len(parts), 3):
+        text = re.sub(r"<!--(?!\[if).*?-->", "", parts[i], flags=re.S)
+        result.append(re.sub(r"\s+", " ", text))
+        if i + 1 < len(parts):
+            result.append(parts[i + 1])
+    return "".join(result).strip()
+
+# ----------------------------------------------------------------------
+# CSS الحرج
+
+def _split_rules(css):
+    """قواعد CSS المصغّر على المستوى الأعلى: (المحدد أو @القاعدة، المحتوى)"""
+    rules = []
+    depth = 0
+    start = 0
+    selector_end = None
+    for i, char in enumerate(css):
+        if char == "{":
+            if depth == 0:
+                selector_end = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:selector_end].strip(), css[selector_end + 1:i]))
+                start = i + 1
+    return rules
+
+def _fold_names(html, fold_sections):
+    """الوسوم والأصناف والمعرّفات في الجزء الظاهر من الصفحة"""
+    body = html[html.find("<body"):]
+    cut = -1
+    for _ in range(fold_sections + 1):
+        cut = body.find("<section", cut + 1)
+        if cut < 0:
+            break
+    fold = body if cut < 0 else body[:cut]
+    names = set(re.findall(r"<([a-z][a-z0-9]*)", fold))
+    for classes in re.findall(r'class="([^"]*)"', fold):
+        names.update("." + name for name in classes.split())
+    names.update("#" + name for name in re.findall(r'id="([^"]*)"', fold))
+    return names | {"html", "body", ":root", "*"}
+
+def _selector_matches(selector, names):
+    """كل الوسوم والأصناف والمعرّفات في المحدد موجودة في الجزء الظاهر"""
+    if selector.strip() in names:
+        return True
+    selector = re.sub(r"::?[\w-]+(\([^)]*\))?", "", selector)   # أشباه الأصناف لا تؤثر
+    selector = re.sub(r"\[[^\]]*\]", "", selector)
+    tokens = re.findall(r"[.#]?[\w-]+|\*", selector)
+    return bool(tokens) and all(token in names for token in tokens)
+
+def critical_css(css, names):
+    """القواعد التي تطابق الجزء الظاهر (مع @media وحركات @keyframes المستخدمة فيها)"""
+    def select(rules):
+        kept = []
+        for selector, body in rules:
+            if selector.startswith("@media") or selector.startswith("@supports"):
+                inner = select(_split_rules(body))
+                if inner:
+                    kept.append(f"{selector}{{{inner}}}")
+            elif selector.startswith("@font-face"):
+                kept.append(f"{selector}{{{body}}}")
+            elif not selector.startswith("@") and any(
+                    _selector_matches(part, names) for part in selector.split(",")):
+                kept.append(f"{selector}{{{body}}}")
+        return "".join(kept)
+
+    rules = _split_rules(css)
+    critical = select(rules)
+    used = {name for value in re.findall(r"animation(?:-name)?:([^;}]*)", critical)
+            for name in re.findall(r"[\w-]+", value)}
+    for selector, body in rules:
+        if selector.startswith("@keyframes") and selector.split()[-1] in used:
+            critical += f"{selector}{{{body}}}"
+    return critical
+
+# ----------------------------------------------------------------------
+# الأصول
+
+def hashed_name(stem, suffix, data):
+    """اسم مشتق من المحتوى: يتغير فقط عند تغير الملف، فيُخزّن مؤقتاً للأبد"""
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_CHARS]}{suffix}"
+
+def write_asset(directory, stem, suffix, text):
+    data = text.encode("utf-8")
+    name = hashed_name(stem, suffix, data)
+    (directory / name).write_bytes(data)
+    return name
+
+def compress_file(path, write=True):
+    """أحجام gzip و Brotli للملف، ونسخ .gz و .br بجانبه إن طُلبت (Brotli فقط إذا كانت المكتبة مثبتة)"""
+    data = path.read_bytes()
+    sizes = {"identity": len(data)}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if write:
+        path.with_name(path.name + ".gz").write_bytes(gz)
+    sizes["gzip"] = len(gz)
+    if brotli:
+        br = brotli.compress(data, quality=11)
+        if write:
+            path.with_name(path.name + ".br").write_bytes(br)
+        sizes["br"] = len(br)
+    return sizes
+
+def render_og_image(svg_path, png_path):
+    """تحويل SVG إلى PNG بـ rsvg-convert (Pango يشكّل الحروف العربية ويرتبها من اليمين لليسار)
+
+    cairosvg لا يصلح هنا: يرسم النص بواجهة cairo البسيطة فتخرج الحروف العربية منفصلة ومعكوسة.
+    بلا rsvg-convert يُنسخ og-image.png المحفوظ بجانب SVG، وإلا يُرفع RuntimeError لأن الصفحة تشير إليه."""
+    if shutil.which("rsvg-convert"):
+        try:
+            subprocess.run(["rsvg-convert", "-o", str(png_path), str(svg_path)],
+                           check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, "stderr", None) or b""
+            raise RuntimeError(f"فشل rsvg-convert: {stderr.decode(errors='replace').strip() or e}") from e
+        return
+    fallback = svg_path.with_suffix(".png")
+    if fallback.exists():
+        shutil.copy2(fallback, png_path)
+        print(f"⚠ لا يوجد rsvg-convert: نُسخ {fallback.name} المحفوظ")
+        return
+    raise RuntimeError("لا يوجد rsvg-convert (dnf install librsvg2-tools) ولا og-image.png محفوظ: "
+                       f"تعذر إنشاء {png_path.name} الذي تشير إليه الصفحة")
+
+# ----------------------------------------------------------------------
+# الصفحات
+
+_STYLE = re.compile(r"<style[^>]*>(.*?)</style>", re.S)
+_INLINE_SCRIPT = re.compile(r"<script>(.*?)</script>", re.S)
+_STYLESHEET_LINK = re.compile(r'<link href="([^"]+)" rel="stylesheet">')
+_EXTERNAL_SCRIPT = re.compile(r'<script type="text/javascript" src="([^"]+)"></script>')
+
+def _async_stylesheet(href):
+    """ورقة أنماط لا تعطل الرسم الأول"""
+    return (f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+def build_page(source, assets_dir, fold_sections=FOLD_SECTIONS):
+    """صفحة واحدة: CSS حرج مضمّن + الباقي في ملف، و JS في ملف مؤجل"""
+    html = source.read_text(encoding="utf-8")
+    stem = "site" if source.name == "quran_program_announcement.html" else source.stem
+
+    styles = _STYLE.findall(html)
+    css = minify_css("".join(styles))
+    inline_css = critical_css(css, _fold_names(html, fold_sections))
+    html = _STYLE.sub("", html, count=len(styles))
+    if len(inline_css) >= FULL_INLINE_RATIO * len(css):
+        # الصفحة كلها ظاهرة تقريباً (الملصق): طلب إضافي لا يستحق
+        inline_css, deferred = css, ""
+    else:
+        deferred = _async_stylesheet("assets/" + write_asset(assets_dir, stem, ".css", css))
+    html = html.replace("</head>", f"<style>{inline_css}</style>{deferred}</head>", 1)
+
+    # الخطوط الخارجية أيضاً بلا تعطيل (display=swap يعرض الخط البديل حتى تصل)
+    html = _STYLESHEET_LINK.sub(lambda m: _async_stylesheet(m.group(1)), html)
+
+    scripts = _INLINE_SCRIPT.findall(html)
+    if scripts:
+        js_name = write_asset(assets_dir, stem, ".js", minify_js("\n".join(scripts)))
+        html = _INLINE_SCRIPT.sub("", html)
+        # defer يحفظ ترتيب التنفيذ (المكتبة ثم كود الصفحة) بعد اكتمال تحليل الصفحة
+        html = _EXTERNAL_SCRIPT.sub(r'<script defer src="\1"></script>', html)
+        html = html.replace("</body>", f'<script defer src="assets/{js_name}"></script></body>', 1)
+
+    return minify_html(html), len(inline_css), len(css)
+
+def build(fold_sections=FOLD_SECTIONS, precompress=True):
+    """بناء الموقع كاملاً في dist
+
+    precompress: كتابة نسخ .br و .gz لخادم يرسل الملفات المضغوطة مسبقاً (nginx gzip_static/brotli_static
+    مثلاً)؛ Vercel و npx serve يضغطان أثناء الإرسال ويتجاهلانها، فتُعطَّل عند النشر هناك."""
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    assets_dir = DIST_DIR / "assets"
+    assets_dir.mkdir(parents=True)
+
+    for source_name, output_name in PAGES.items():
+        html, critical_bytes, css_bytes = build_page(SITE_DIR / source_name, assets_dir, fold_sections)
+        (DIST_DIR / output_name).write_text(html, encoding="utf-8")
+        print(f"✓ {output_name}: CSS حرج {critical_bytes:,} من {css_bytes:,} بايت")
+
+    shutil.copy2(SITE_DIR / "og-image.svg", DIST_DIR / "og-image.svg")
+    render_og_image(SITE_DIR / "og-image.svg", DIST_DIR / "og-image.png")
+
+    if not brotli:
+        print("⚠ مكتبة brotli غير مثبتة (pip install brotli): نسخ gzip فقط")
+    print(f"\n{'الملف':<45}{'الأصلي':>10}{'gzip':>10}{'br':>10}")
+    for path in sorted(DIST_DIR.rglob("*")):
+        if path.suffix in COMPRESSIBLE:
+            sizes = compress_file(path, precompress)
+            print(f"{str(path.relative_to(DIST_DIR)):<45}{sizes['identity']:>10,}"
+                  f"{sizes['gzip']:>10,}{sizes.get('br', 0):>10,}")
+    return DIST_DIR
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="بناء موقع الإعلان للنشر")
+    parser.add_argument("--fold-sections", type=int, default=FOLD_SECTIONS,
+                        help="عدد الأقسام بعد الترويسة التي يُضمَّن CSS الخاص بها")
+    parser.add_argument("--no-precompress", action="store_true",
+                        help="دون نسخ .br و .gz (للاستضافة التي تضغط بنفسها مثل Vercel)")
+    args = parser.parse_args()
+    try:
+        build(args.fold_sections, precompress=not args.no_precompress)
+    except RuntimeError as e:
+        print(f"✗ فشل البناء: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,15 @@
 #!/bin/bash
-# سكريبت للتحقق من حالة المعالجة
+# سكريبت للتحقق من حالة المعالجة (يقرأ ملف الحالة الذي تكتبه سكريبتات المعالجة دون مسح المجلدات)
+# للمراقبة المستمرة: شغّل المعالجة مع --metrics-port 9100 واقرأ http://127.0.0.1:9100/metrics
 
-cd /Users/ahmedkraiz/Desktop/Text
+cd "$(dirname "$0")"
 
-echo "=== حالة المعالجة ==="
-echo ""
+python3 progress.py "${1:-${PROGRESS_STATUS_FILE:-processing_status.json}}"
+status=$?
 
-# التحقق من العملية
-if pgrep -f "process_all_audio.py" > /dev/null; then
-    echo "✓ العملية تعمل حالياً"
-    ps aux | grep -i "process_all_audio\|whisper" | grep -v grep | head -2
-else
-    echo "⚠ لا توجد عملية نشطة"
+# مهام خدمة التحويل ومراقب المجلد (watch_folder.py) من جدولها مباشرة
+if [ -f .transcript_cache/service.sqlite3 ]; then
+    echo
+    python3 transcription_service.py status
 fi
-
-echo ""
-echo "=== الملفات المعالجة ==="
-if [ -d "ملخصات_الصوتيات/transcripts" ]; then
-    count=$(ls -1 "ملخصات_الصوتيات/transcripts"/*.txt 2>/dev/null | wc -l)
-    echo "عدد الملفات المعالجة: $count"
-    ls -lh "ملخصات_الصوتيات/transcripts"/*.txt 2>/dev/null | tail -5
-else
-    echo "المجلد غير موجود بعد"
-fi
-
-echo ""
-echo "=== الملفات المتبقية ==="
-total=$(ls -1 audio_files/*.{mp3,m4a} 2>/dev/null | wc -l)
-processed=$(ls -1 "ملخصات_الصوتيات/transcripts"/*.txt 2>/dev/null | wc -l)
-remaining=$((total - processed))
-echo "المتبقي: $remaining من $total"
-
+exit $status
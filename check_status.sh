@@ -1,7 +1,7 @@
 #!/bin/bash
 # سكريبت للتحقق من حالة التحويل
 
-cd /Users/ahmedkraiz/Desktop/Text
+cd "$(dirname "$0")"
 
 if [ -f audio_files/audio_transcript.txt ]; then
     echo "✓ تم الانتهاء من التحويل!"
@@ -4,72 +4,195 @@
 """
 
 import os
-from pathlib import Path
 import re
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import extractive_summarizer
+import profiling
+import semantic_index
+import text_correction
+
+# نهاية الجملة (علامات الترقيم اللاتينية والعربية)
+SENTENCE_END = re.compile(r'[.!?؟،]\s+')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?؟،])\s+')  # مثل SENTENCE_END مع إبقاء علامة النهاية في الجملة
+
+# أنماط العناوين المحتملة (جمل تبدأ بأرقام أو كلمات مثل "أولاً"، "ثانياً"، إلخ)
+# مجمّعة في تعبير واحد: المجموعة t<i> تحمل نص العنوان للنمط رقم i
+HEADING_PATTERNS = [
+    r'أول[اًا]?\s*[:.]?\s*(?P<t0>.+?)[.!?؟]',
+    r'ثان[ياًا]?\s*[:.]?\s*(?P<t1>.+?)[.!?؟]',
+    r'ثالث[اًا]?\s*[:.]?\s*(?P<t2>.+?)[.!?؟]',
+    r'رابع[اًا]?\s*[:.]?\s*(?P<t3>.+?)[.!?؟]',
+    r'خامس[اًا]?\s*[:.]?\s*(?P<t4>.+?)[.!?؟]',
+    r'\d+[\.)]\s*(?P<t5>.+?)[.!?؟]',
+]
+HEADING_RE = re.compile('|'.join(HEADING_PATTERNS), re.IGNORECASE)
+
+# بصمة النص المصدر وإصدار الملخِّص المسجلان في آخر ملف الملخص
+SOURCE_HASH_RE = re.compile(r'<!-- source_sha256: ([0-9a-f]{64})(?: summary_version: (\d+))? -->')
+
+# يُرفع عند كل تغيير في مخرجات التلخيص، فتُعاد الملخصات المبنية بإصدار أقدم ولو لم يتغير النص
+# (3: التصحيح الإملائي والتلخيص الاستخراجي TF-IDF/TextRank، 4: ترقيم لاتيني بجوار العربية فقط،
+#  5: وحدات التلخيص من جمل مرور القراءة الواحد، 6: العناوين تنتهي بعلامة الاستفهام العربية أيضاً)
+SUMMARY_VERSION = 6
+
+BLOCK_CHARS = 1 << 20        # حجم القراءة من الملف
+MAX_SENTENCE_WORDS = extractive_summarizer.MAX_UNIT_WORDS  # النصوص بلا ترقيم تُقطع بطول وحدة التلخيص
 
 def extract_key_points(text, min_length=50):
     """استخراج النقاط الرئيسية من النص"""
     # تقسيم النص إلى جمل
-    sentences = re.split(r'[.!?]\s+', text)
+    sentences = SENTENCE_END.split(text)
     
     # تصفية الجمل القصيرة جداً
     meaningful_sentences = [s.strip() for s in sentences if len(s.strip()) >= min_length]
     
     return meaningful_sentences
 
-def create_smart_summary(transcript_file, title):
-    """إنشاء ملخص ذكي من ملف النص"""
+def _next_cut(buffer):
+    """آخر موضع آمن للمعالجة: بعد آخر نهاية جملة، وإلا بعد آخر مسافة"""
+    last_end = None
+    for last_end in re.finditer(r'[.!?؟،]\s', buffer):
+        pass
+    if last_end:
+        return last_end.end()
+    for i in range(len(buffer) - 1, -1, -1):
+        if buffer[i].isspace():
+            return i + 1
+    return len(buffer)
+
+def _scan_blocks(transcript_file):
+    """كتل نص المحاضرة (النص، البداية، النهاية): من مقاطعها الموقّتة إن وُجدت، وإلا من الملف بلا توقيت"""
+    segments = extractive_summarizer.timed_segments(transcript_file)
+    if segments is not None:
+        for segment in segments:
+            yield segment["text"], segment["start"], segment["end"]
+        return
     with open(transcript_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-    
-    # تنظيف النص
-    text = text.strip()
-    
-    # إحصائيات
-    word_count = len(text.split())
-    char_count = len(text)
-    
-    # استخراج النقاط الرئيسية
-    key_points = extract_key_points(text)
-    
-    # أول 300 كلمة كملخص أولي
-    words = text.split()
-    preview = ' '.join(words[:300])
-    
-    # آخر 200 كلمة (الخلاصة)
-    conclusion = ' '.join(words[-200:]) if len(words) > 200 else text
-    
-    # البحث عن عناوين محتملة في النص
-    # (جمل تبدأ بأرقام أو كلمات مثل "أولاً"، "ثانياً"، إلخ)
-    headings = []
-    heading_patterns = [
-        r'أول[اًا]?\s*[:.]?\s*(.+?)[.!?]',
-        r'ثان[ياًا]?\s*[:.]?\s*(.+?)[.!?]',
-        r'ثالث[اًا]?\s*[:.]?\s*(.+?)[.!?]',
-        r'رابع[اًا]?\s*[:.]?\s*(.+?)[.!?]',
-        r'خامس[اًا]?\s*[:.]?\s*(.+?)[.!?]',
-        r'(\d+)[\.)]\s*(.+?)[.!?]',
-    ]
-    
-    for pattern in heading_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        headings.extend([m if isinstance(m, str) else m[1] for m in matches[:5]])
+        for block in iter(lambda: f.read(BLOCK_CHARS), ''):
+            yield block, None, None
+
+def scan_transcript(transcript_file, preview_words=300, conclusion_words=200, headings_per_pattern=5):
+    """مرور واحد على نص المحاضرة يجمع الإحصائيات والجمل بتوقيتها (مدخلات التلخيص الاستخراجي)
+    والعناوين والمقدمة والخلاصة"""
+    word_count = 0
+    char_count = 0
+    trailing_spaces = 0
+    preview = []
+    conclusion = deque(maxlen=conclusion_words)
+    sentences = []
+    headings = [[] for _ in HEADING_PATTERNS]
+    sentence = []
+    sentence_start = None
+
+    def finish_sentence(end):
+        nonlocal sentence
+        if sentence:
+            sentences.append({"start": sentence_start, "end": end, "text": ' '.join(sentence)})
+        sentence = []
+
+    def add_to_sentence(piece, start, end):
+        nonlocal sentence_start
+        for word in piece.split():
+            if not sentence:
+                sentence_start = start
+            sentence.append(word)
+            if len(sentence) >= MAX_SENTENCE_WORDS:
+                finish_sentence(end)
+
+    def process(chunk, start, end):
+        nonlocal word_count, char_count, trailing_spaces
+        chunk = text_correction.correct_text(chunk)
+        stripped = chunk.rstrip()
+        if stripped:
+            char_count += trailing_spaces
+            trailing_spaces = 0
+        char_count += len(stripped)
+        trailing_spaces += len(chunk) - len(stripped)
+
+        for word in chunk.split():
+            word_count += 1
+            if len(preview) < preview_words:
+                preview.append(word)
+            conclusion.append(word)
+
+        pieces = SENTENCE_SPLIT.split(chunk)
+        add_to_sentence(pieces[0], start, end)
+        for piece in pieces[1:]:
+            finish_sentence(end)
+            add_to_sentence(piece, start, end)
+
+        if any(len(found) < headings_per_pattern for found in headings):
+            for match in HEADING_RE.finditer(chunk):
+                found = headings[int(match.lastgroup[1:])]
+                if len(found) < headings_per_pattern:
+                    found.append(match.group(match.lastgroup))
+
+    buffer = ''
+    buffer_start = block_end = None
+    for block, start, end in _scan_blocks(transcript_file):
+        if not buffer:
+            # تجاهل المسافات في بداية الملف كما يفعل strip()
+            block = block.lstrip() if word_count == 0 else block
+            buffer_start = start
+        elif not buffer[-1].isspace() and not block[:1].isspace():
+            # أسطر ملف التوقيتات محذوفة المسافة الأولى
+            buffer += ' '
+        buffer += block
+        block_end = end
+        cut = _next_cut(buffer)
+        process(buffer[:cut], buffer_start, block_end)
+        buffer = buffer[cut:]
+        buffer_start = start
+    process(buffer, buffer_start, block_end)
+    finish_sentence(block_end)
+
+    all_headings = [heading for found in headings for heading in found]
+    return {
+        "word_count": word_count,
+        "character_count": char_count,
+        "preview": ' '.join(preview),
+        "conclusion": ' '.join(conclusion),
+        "sentences": sentences,
+        "headings": all_headings,
+    }
+
+@profiling.profiled()
+def create_smart_summary(transcript_file, title, extract=None):
+    """إنشاء ملخص ذكي من ملف النص (extract: ناتج التلخيص الاستخراجي إن حُسب مسبقاً للمجموعة)"""
+    scan = scan_transcript(transcript_file)
+    # وحدات التلخيص من جمل المرور نفسه بدل قراءة النص وتقسيمه مرة ثانية
+    extract = extract or extractive_summarizer.summarize_lecture(
+        transcript_file, units=extractive_summarizer.merge_units(scan["sentences"])
+    )
+    word_count = scan["word_count"]
     
     summary = {
         "title": title,
         "statistics": {
             "word_count": word_count,
-            "character_count": char_count,
+            "character_count": scan["character_count"],
             "estimated_duration_minutes": word_count / 150  # متوسط 150 كلمة في الدقيقة
         },
-        "preview": preview,
-        "conclusion": conclusion,
-        "key_points": key_points[:20],  # أول 20 نقطة رئيسية
-        "headings": headings[:10] if headings else None
+        "preview": ' '.join(p["text"] for p in extract["overview"]),  # أعلى الجمل وزناً بترتيبها
+        "conclusion": ' '.join(p["text"] for p in extract["conclusion"]),  # من الربع الأخير
+        "key_points": [p["text"] for p in extract["key_points"]],  # TextRank مع تخطي المكرر
+        "headings": scan["headings"][:10] if scan["headings"] else None,
+        "extractive": extract  # الجمل المختارة مع توقيتها ووزنها
     }
     
     return summary
 
+def _timestamp(point):
+    """[د:ث] قبل الجملة إن كان توقيتها معروفاً"""
+    start = point.get("start")
+    return f"[{int(start // 60)}:{int(start % 60):02d}] " if start is not None else ""
+
 def format_summary_markdown(summary):
     """تنسيق الملخص بصيغة Markdown"""
     md = f"""# {summary['title']}
@@ -83,7 +206,7 @@ def format_summary_markdown(summary):
 
 ## نظرة عامة
 
-{summary['preview']}...
+{summary['preview']}
 
 ---
 
@@ -91,8 +214,8 @@ def format_summary_markdown(summary):
 
 """
     
-    for i, point in enumerate(summary['key_points'][:15], 1):
-        md += f"{i}. {point}\n\n"
+    for i, point in enumerate(summary['extractive']['key_points'][:15], 1):
+        md += f"{i}. {_timestamp(point)}{point['text']}\n\n"
     
     if summary['headings']:
         md += "\n## العناوين الرئيسية\n\n"
@@ -114,9 +237,88 @@ def format_summary_markdown(summary):
     
     return md
 
+def transcript_hash(transcript_file):
+    """بصمة SHA-256 لمحتوى ملف النص"""
+    digest = hashlib.sha256()
+    with open(transcript_file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def recorded_marker(md_file):
+    """(البصمة، إصدار الملخِّص) المسجلان في ملخص موجود؛ None لما لم يُسجَّل"""
+    if not Path(md_file).exists():
+        return None, None
+    with open(md_file, "r", encoding="utf-8") as f:
+        match = SOURCE_HASH_RE.search(f.read())
+    if not match:
+        return None, None
+    return match.group(1), int(match.group(2)) if match.group(2) else None
+
+def summary_files(transcript_file, summaries_path):
+    """ملفا الملخص (Markdown و JSON) لملف نصي"""
+    title = Path(transcript_file).stem.replace("_transcript", "")
+    return Path(summaries_path) / f"{title}_summary.md", Path(summaries_path) / f"{title}_summary.json"
+
+def _read_summary_json(json_file):
+    """ملخص JSON موجود، أو None إن لم يوجد أو لم يكن بصيغته"""
+    try:
+        with open(json_file, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if isinstance(summary, dict) else None
+
+def recorded_json_marker(json_file):
+    """(البصمة، إصدار الملخِّص) في ملف JSON للملخص؛ None لما لم يُسجَّل أو إن لم يكن بصيغته"""
+    summary = _read_summary_json(json_file)
+    if summary is None:
+        return None, None
+    return summary.get("source_sha256"), summary.get("summary_version")
+
+def _is_current(md_file, json_file, source_hash):
+    """الملفان كلاهما مبنيان من هذا النص بالإصدار الحالي (ملف كتبه سكريبت آخر بنفس الاسم لا يُحسب)"""
+    marker = (source_hash, SUMMARY_VERSION)
+    return recorded_marker(md_file) == marker and recorded_json_marker(json_file) == marker
+
+def is_summary_current(transcript_file, summaries_path):
+    """هل الملخص موجود ومبني من النص الحالي بالإصدار الحالي من الملخِّص؟"""
+    return _is_current(*summary_files(transcript_file, summaries_path), transcript_hash(transcript_file))
+
+def summarize_transcript(transcript_file, summaries_path, force=False, extract=None):
+    """إنشاء ملخص Markdown و JSON لملف نصي واحد (None إذا كان الملخص محدّثاً)"""
+    title = Path(transcript_file).stem.replace("_transcript", "")
+    md_file, json_file = summary_files(transcript_file, summaries_path)
+    
+    source_hash = transcript_hash(transcript_file)
+    if not force and _is_current(md_file, json_file, source_hash):
+        return None
+    
+    summary = create_smart_summary(transcript_file, title, extract)
+    summary["source_sha256"] = source_hash
+    summary["summary_version"] = SUMMARY_VERSION
+    # المحاضرات ذات الصلة يحسبها الفهرس الدلالي وحده: تُنقل من الملخص السابق حتى بنائه التالي
+    related = (_read_summary_json(json_file) or {}).get("related_lectures")
+    if related:
+        summary["related_lectures"] = related
+    
+    with open(md_file, "w", encoding="utf-8") as f:
+        f.write(format_summary_markdown(summary))
+        f.write(f"\n<!-- source_sha256: {source_hash} summary_version: {SUMMARY_VERSION} -->\n")
+        if related:
+            # بنفس موضع write_related_sections وصيغته، فلا يعيد كتابة الملف في تشغيله التالي
+            f.write("\n" + semantic_index.format_related_block(related))
+    
+    # نسخة قابلة للقراءة آلياً حتى لا يحتاج أحد لتحليل Markdown
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    
+    return md_file
+
 def process_transcripts(transcripts_dir="ملخصات_الصوتيات/transcripts", 
-                       summaries_dir="ملخصات_الصوتيات/summaries"):
-    """معالجة جميع ملفات النصوص وإنشاء ملخصات"""
+                       summaries_dir="ملخصات_الصوتيات/summaries",
+                       workers=None, force=False):
+    """معالجة جميع ملفات النصوص وإنشاء ملخصات (المتغيرة فقط، بالتوازي)"""
     transcripts_path = Path(transcripts_dir)
     summaries_path = Path(summaries_dir)
     
@@ -134,29 +336,38 @@ def process_transcripts(transcripts_dir="ملخصات_الصوتيات/transcrip
     
     print(f"تم العثور على {len(transcript_files)} ملف نصي")
     
-    for transcript_file in transcript_files:
-        try:
-            title = transcript_file.stem.replace("_transcript", "")
-            print(f"\nجارٍ إنشاء ملخص لـ: {title}")
-            
-            # إنشاء الملخص
-            summary = create_smart_summary(transcript_file, title)
-            
-            # حفظ بصيغة Markdown
-            md_file = summaries_path / f"{title}_summary.md"
-            md_content = format_summary_markdown(summary)
-            
-            with open(md_file, "w", encoding="utf-8") as f:
-                f.write(md_content)
-            
-            print(f"✓ تم حفظ الملخص في: {md_file}")
-            
-        except Exception as e:
-            print(f"✗ خطأ في معالجة {transcript_file.name}: {e}")
-            continue
-    
-    print(f"\n✓ تمت معالجة {len(transcript_files)} ملف")
+    # IDF مشترك يُحدَّث للمتغير فقط، ثم كل الملخصات الناقصة في مصفوفة واحدة قبل توزيع الكتابة
+    stale = [f for f in transcript_files if force or not is_summary_current(f, summaries_path)]
+    idf_cache = extractive_summarizer.update_idf_cache(
+        transcript_files, extractive_summarizer.idf_cache_path(transcripts_path)
+    )
+    extracts = extractive_summarizer.summarize_corpus(
+        {f: extractive_summarizer.lecture_units(f) for f in stale}, idf_cache
+    )
+    
+    updated = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(summarize_transcript, transcript_file, summaries_path, force,
+                        extracts[transcript_file]): transcript_file
+            for transcript_file in stale
+        }
+        for future in as_completed(futures):
+            transcript_file = futures[future]
+            try:
+                md_file = future.result()
+            except Exception as e:
+                print(f"✗ خطأ في معالجة {transcript_file.name}: {e}")
+                continue
+            if md_file:
+                updated += 1
+                print(f"✓ تم حفظ الملخص في: {md_file}")
+    
+    print(f"\n✓ تم تحديث {updated} ملخص، و {len(transcript_files) - updated} دون تغيير")
 
 if __name__ == "__main__":
-    process_transcripts()
-
+    parser = argparse.ArgumentParser(description="إنشاء ملخصات من النصوص المحولة")
+    parser.add_argument("--workers", type=int, default=None, help="عدد العمليات (افتراضياً عدد الأنوية)")
+    parser.add_argument("--force", action="store_true", help="إعادة إنشاء كل الملخصات")
+    args = parser.parse_args()
+    process_transcripts(workers=args.workers, force=args.force)
@@ -4,67 +4,274 @@ Script to download all audio tracks from a SoundCloud playlist.
 """
 
 import os
-import subprocess
 import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-def download_playlist(playlist_url: str, output_dir: str = "audio_files"):
+DEFAULT_ARCHIVE = "download_archive.txt"
+
+_files_lock = threading.Lock()  # download threads record their files concurrently
+
+def list_tracks(playlist_url: str) -> list:
+    """
+    List the tracks of a playlist without downloading them.
+
+    A URL that is not a playlist (e.g. a direct link to an audio file)
+    is returned as a single track.
+    """
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({"extract_flat": "in_playlist", "quiet": True}) as ydl:
+        info = ydl.extract_info(playlist_url, download=False)
+    entries = info.get("entries")
+    if entries is None:
+        return [{"url": playlist_url, "id": info.get("id"), "ie_key": info.get("extractor_key")}]
+    return [
+        {"url": entry["url"], "id": entry.get("id"), "ie_key": entry.get("ie_key")}
+        for entry in entries if entry and entry.get("url")
+    ]
+
+def load_archive(archive_file: str) -> set:
+    """Read the yt-dlp download archive ("<extractor> <id>" per line)."""
+    path = Path(archive_file)
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+def archive_id(track: dict):
+    """Archive line for a flat playlist entry, if enough is known to build it."""
+    if track.get("id") and track.get("ie_key"):
+        return f"{track['ie_key'].lower()} {track['id']}"
+    return None
+
+def track_files_path(archive_file: str) -> Path:
+    """Sidecar of the archive mapping each downloaded track URL to its local file."""
+    return Path(archive_file).with_suffix(".files.json")
+
+def load_track_files(archive_file: str) -> dict:
+    """{track URL: {"archive": archive line, "path": local file}} for downloaded tracks."""
+    path = track_files_path(archive_file)
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def record_track_file(archive_file: str, track_url: str, archive_line: str, filename: str):
+    """Remember where a downloaded track was saved (atomic rewrite of the sidecar)."""
+    path = track_files_path(archive_file)
+    with _files_lock:
+        files = load_track_files(archive_file)
+        files[track_url] = {"archive": archive_line, "path": str(filename)}
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(files, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+def split_archived(tracks: list, archive_file: str = DEFAULT_ARCHIVE) -> tuple:
+    """
+    Split playlist tracks into URLs still to download and local files of archived ones.
+
+    A track counts as archived when its archive line is known, either from
+    the flat playlist entry or from the sidecar written at download time
+    (generic extractors do not report ids in flat playlists). Archived
+    tracks whose file is missing, or that were archived before the sidecar
+    existed, have no local file and are only counted.
+
+    Returns:
+        (pending URLs, existing local files of archived tracks, number archived)
+    """
+    archived = load_archive(archive_file)
+    files = load_track_files(archive_file)
+    pending, local, skipped = [], [], 0
+    for track in tracks:
+        known = files.get(track["url"], {})
+        if (archive_id(track) or known.get("archive")) not in archived:
+            pending.append(track["url"])
+            continue
+        skipped += 1
+        if known.get("path") and Path(known["path"]).exists():
+            local.append(Path(known["path"]))
+    return pending, local, skipped
+
+def _ydl_options(output_path: Path, archive_file: str, stats: dict, native: bool = False) -> dict:
+    """
+    yt-dlp options for a single track download.
+
+    With native=True the source container (opus/m4a) is kept as-is instead
+    of being re-encoded to mp3.
+    """
+    def on_progress(d):
+        if d["status"] == "finished":
+            stats["bytes"] = d.get("total_bytes") or d.get("downloaded_bytes") or 0
+            stats["filename"] = d.get("filename")
+            info = d.get("info_dict") or {}
+            if info.get("extractor_key") and info.get("id"):
+                # Same line yt-dlp writes to the download archive
+                stats["archive"] = f"{info['extractor_key'].lower()} {info['id']}"
+
+    def on_postprocess(d):
+        if d["status"] == "finished":
+            stats["filename"] = d["info_dict"].get("filepath", stats.get("filename"))
+
+    postprocessors = [] if native else [{
+        "key": "FFmpegExtractAudio",  # Extract audio only
+        "preferredcodec": "mp3",      # Convert to mp3
+        "preferredquality": "0",      # Best quality
+    }]
+
+    return {
+        "format": "bestaudio/best",
+        "outtmpl": str(output_path / "%(title)s.%(ext)s"),
+        "postprocessors": postprocessors,
+        "download_archive": archive_file,  # Never request finished tracks again
+        "continuedl": True,                # Resume partial .part files
+        "retries": 0,                      # Retries are handled per track below
+        "quiet": True,
+        "noprogress": True,
+        "progress_hooks": [on_progress],
+        "postprocessor_hooks": [on_postprocess],
+    }
+
+def download_track(track_url: str, output_dir: str = "audio_files",
+                   archive_file: str = DEFAULT_ARCHIVE,
+                   retries: int = 3, backoff: float = 2.0, native: bool = False) -> dict:
+    """
+    Download a single track with retry and exponential backoff.
+
+    In native mode the file is kept in its source container and decoded
+    once to 16 kHz mono PCM next to it (see pcm_cache).
+
+    Returns:
+        dict with "url", "ok", "path", "bytes", "seconds" and "throughput"
+        (bytes per second). "path" is None when the track was skipped
+        because it is already in the archive.
+    """
+    import yt_dlp
+
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+
+    for attempt in range(retries + 1):
+        stats = {}
+        started = time.perf_counter()
+        try:
+            with yt_dlp.YoutubeDL(_ydl_options(output_path, archive_file, stats, native)) as ydl:
+                ydl.download([track_url])
+            seconds = time.perf_counter() - started
+            if native and stats.get("filename"):
+                import pcm_cache
+                pcm_cache.decode_to_pcm(stats["filename"])
+            if stats.get("filename") and stats.get("archive"):
+                record_track_file(archive_file, track_url, stats["archive"], stats["filename"])
+            size = stats.get("bytes", 0)
+            return {
+                "url": track_url,
+                "ok": True,
+                "path": Path(stats["filename"]) if stats.get("filename") else None,
+                "bytes": size,
+                "seconds": seconds,
+                "throughput": size / seconds if seconds > 0 else 0.0,
+            }
+        except yt_dlp.utils.DownloadError as e:
+            if attempt == retries:
+                print(f"✗ Giving up on {track_url}: {e}")
+                return {"url": track_url, "ok": False, "path": None,
+                        "bytes": 0, "seconds": time.perf_counter() - started, "throughput": 0.0}
+            delay = backoff * (2 ** attempt)
+            print(f"  Retry {attempt + 1}/{retries} for {track_url} in {delay:.0f}s")
+            time.sleep(delay)
+
+def download_tracks(track_urls: list, output_dir: str = "audio_files",
+                    concurrency: int = 4, archive_file: str = DEFAULT_ARCHIVE,
+                    retries: int = 3, native: bool = False) -> list:
+    """
+    Download several tracks concurrently and report per-track throughput.
+
+    Accepts plain URLs, so it works equally against SoundCloud and a local
+    HTTP server serving fixture audio files.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda url: download_track(url, output_dir, archive_file, retries, native=native),
+            track_urls
+        ))
+
+    for result in results:
+        if result["ok"] and result["path"]:
+            print(f"  ✓ {result['path'].name}: {result['bytes'] / 1e6:.1f} MB "
+                  f"in {result['seconds']:.1f}s ({result['throughput'] / 1e6:.2f} MB/s)")
+        elif result["ok"]:
+            print(f"  - Already downloaded: {result['url']}")
+    return results
+
+def download_playlist(playlist_url: str, output_dir: str = "audio_files",
+                      concurrency: int = 4, archive_file: str = DEFAULT_ARCHIVE,
+                      retries: int = 3, native: bool = False):
     """
     Download all tracks from a SoundCloud playlist using yt-dlp.
-    
+
     Args:
         playlist_url: URL of the SoundCloud playlist
         output_dir: Directory to save downloaded files
+        concurrency: Number of tracks downloaded at the same time
+        archive_file: yt-dlp download archive; tracks listed there are skipped
+        retries: Per-track retries (with exponential backoff)
+        native: Keep the source audio container and cache 16 kHz PCM
     """
-    # Create output directory if it doesn't exist
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
-    
-    # Prepare yt-dlp command
-    # -x: extract audio only
-    # --audio-format mp3: convert to mp3
-    # --audio-quality 0: best quality
-    # -o: output template
-    # --no-playlist-reverse: don't reverse playlist order
-    cmd = [
-        "yt-dlp",
-        "-x",  # Extract audio only
-        "--audio-format", "mp3",  # Convert to mp3
-        "--audio-quality", "0",  # Best quality
-        "-o", str(output_path / "%(title)s.%(ext)s"),  # Output filename template
-        "--no-playlist-reverse",  # Keep original order
-        playlist_url
-    ]
-    
+
     print(f"Downloading playlist from: {playlist_url}")
     print(f"Output directory: {output_path.absolute()}")
-    print("\nStarting download...\n")
-    
+
     try:
-        # Run yt-dlp
-        result = subprocess.run(cmd, check=True, capture_output=False)
-        print("\n✓ Download completed successfully!")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n✗ Error downloading playlist: {e}")
-        return False
-    except FileNotFoundError:
+        tracks = list_tracks(playlist_url)
+    except ImportError:
         print("\n✗ Error: yt-dlp not found. Please install it using:")
         print("  pip install yt-dlp")
         return False
+    except Exception as e:
+        print(f"\n✗ Error listing playlist: {e}")
+        return False
+
+    # Skip archived tracks before any network request is made for them
+    pending, _, skipped = split_archived(tracks, archive_file)
+    print(f"{len(tracks)} tracks, {skipped} already downloaded")
+    print("\nStarting download...\n")
+
+    started = time.perf_counter()
+    results = download_tracks(pending, output_dir, concurrency, archive_file, retries, native)
+    elapsed = time.perf_counter() - started
+
+    failed = [r for r in results if not r["ok"]]
+    total_bytes = sum(r["bytes"] for r in results)
+    print(f"\n{total_bytes / 1e6:.1f} MB in {elapsed:.1f}s")
+    if failed:
+        print(f"✗ {len(failed)} track(s) failed")
+        return False
+    print("\n✓ Download completed successfully!")
+    return True
 
 if __name__ == "__main__":
-    playlist_url = "https://soundcloud.com/msjdaboahmed/sets/bvkdzu92ldq7?utm_source=clipboard&utm_medium=text&utm_campaign=social_sharing"
-    
-    # Allow custom URL via command line argument
-    if len(sys.argv) > 1:
-        playlist_url = sys.argv[1]
-    
-    # Allow custom output directory via command line argument
-    output_dir = "audio_files"
-    if len(sys.argv) > 2:
-        output_dir = sys.argv[2]
-    
-    success = download_playlist(playlist_url, output_dir)
-    sys.exit(0 if success else 1)
+    parser = argparse.ArgumentParser(description="Download a SoundCloud playlist")
+    parser.add_argument(
+        "playlist_url", nargs="?",
+        default="https://soundcloud.com/msjdaboahmed/sets/bvkdzu92ldq7?utm_source=clipboard&utm_medium=text&utm_campaign=social_sharing"
+    )
+    parser.add_argument("output_dir", nargs="?", default="audio_files")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--native", action="store_true",
+                        help="keep opus/m4a as downloaded and cache 16 kHz PCM instead of re-encoding to mp3")
+    args = parser.parse_args()
 
+    success = download_playlist(args.playlist_url, args.output_dir,
+                                args.concurrency, args.archive, args.retries, args.native)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+تلخيص استخراجي: وزن الجمل بمصفوفات TF-IDF متفرقة وترتيبها بـ TextRank على رسم التشابه
+
+IDF مشترك بين كل المحاضرات ومحفوظ في ملف؛ المحاضرة الجديدة أو المتغيرة تُضاف إليه وحدها.
+كل المحاضرات المطلوبة تُوزن في مصفوفة واحدة، و TextRank يعمل عليها دفعة واحدة (مصفوفة قطرية كتلية).
+
+مثال (الجمل الأعلى وزناً لكل محاضرة):
+    python extractive_summarizer.py
+"""
+
+import re
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+import arabic_text
+import segment_store
+import subtitles
+
+IDF_CACHE_NAME = "idf_cache.json"   # بجانب مجلد النصوص، فلكل مجموعة محاضرات ملفها
+
+MIN_UNIT_WORDS = 15      # تُدمج المقاطع المتتالية حتى هذا الطول (النصوص شبه خالية من الترقيم)
+MAX_UNIT_WORDS = 60
+DAMPING = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+REDUNDANCY = 0.5         # لا تُختار جملة يزيد تشابهها مع جملة مختارة عن هذا الحد
+KEY_POINTS = 15
+OVERVIEW_SENTENCES = 5
+CONCLUSION_SENTENCES = 3
+CONCLUSION_TAIL = 0.25   # الخلاصة من الربع الأخير من المحاضرة
+
+_UNIT_END = re.compile(r'[.!?؟،]$')
+
+def _stem_path(transcript_file):
+    transcript_file = Path(transcript_file)
+    return transcript_file.with_name(transcript_file.name[:-len("_transcript.txt")])
+
+def timed_segments(transcript_file):
+    """مقاطع المحاضرة بتوقيتها من المخزن أو ملف التوقيتات، و None إن لم يُحفظ لها توقيت"""
+    stem_path = _stem_path(transcript_file)
+    timestamps = stem_path.with_name(stem_path.name + "_transcript_timestamps.txt")
+    if segment_store.has_segments(stem_path) or timestamps.exists():
+        return subtitles.lecture_segments(stem_path)
+    return None
+
+def lecture_units(transcript_file):
+    """وحدات التلخيص (البداية، النهاية، النص): مقاطع متتالية مدموجة، أو نوافذ كلمات بلا توقيت"""
+    segments = timed_segments(transcript_file)
+    if segments is None:
+        with open(transcript_file, encoding="utf-8") as f:
+            tokens = f.read().split()
+        segments = ({"start": None, "end": None, "text": " ".join(tokens[i:i + MIN_UNIT_WORDS])}
+                    for i in range(0, len(tokens), MIN_UNIT_WORDS))
+
+    return merge_units(segments)
+
+def merge_units(pieces):
+    """دمج قطع متتالية (مقاطع أو جمل) في وحدات بين MIN_UNIT_WORDS و MAX_UNIT_WORDS كلمة تنتهي عند نهاية جملة"""
+    units = []
+    start, texts, words = None, [], 0
+    for piece in pieces:
+        text = piece["text"].strip()
+        if not text:
+            continue
+        if not texts:
+            start = piece["start"]
+        texts.append(text)
+        words += len(text.split())
+        if words >= MAX_UNIT_WORDS or (words >= MIN_UNIT_WORDS and _UNIT_END.search(text)):
+            units.append((start, piece["end"], " ".join(texts)))
+            texts, words = [], 0
+    if texts:
+        units.append((start, piece["end"], " ".join(texts)))
+    return units
+
+# ----------------------------------------------------------------------
+# IDF المشترك
+
+def idf_cache_path(transcripts_dir):
+    """ملف الـ IDF لمجموعة النصوص في transcripts_dir (الافتراضي: ملخصات_الصوتيات/idf_cache.json)"""
+    return Path(transcripts_dir).parent / IDF_CACHE_NAME
+
+def load_idf_cache(path):
+    if Path(path).exists():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"sentences": 0, "df": {}, "lectures": {}}
+
+def _add_lecture_df(cache, name, entry, sign):
+    cache["sentences"] += sign * entry["sentences"]
+    df = cache["df"]
+    for term, count in entry["df"].items():
+        df[term] = df.get(term, 0) + sign * count
+        if not df[term]:
+            del df[term]
+
+def update_idf_cache(transcript_files, path, units=None):
+    """تحديث تكرارات المستندات للمحاضرات الجديدة أو المتغيرة فقط، وحذف المحاضرات المختفية
+    (units: {الاسم: وحدات} محسوبة مسبقاً فلا يُعاد قراءة ملفها)"""
+    from transcript_cache import atomic_write_text
+    cache = load_idf_cache(path)
+    lectures = cache["lectures"]
+    names = {}
+    changed = 0
+    for transcript_file in transcript_files:
+        name = _stem_path(transcript_file).name
+        names[name] = transcript_file
+        stat = Path(transcript_file).stat()
+        version = [stat.st_size, stat.st_mtime_ns]
+        if lectures.get(name, {}).get("version") == version:
+            continue
+        if name in lectures:
+            _add_lecture_df(cache, name, lectures[name], -1)
+        df = {}
+        lecture = units[name] if units and name in units else lecture_units(transcript_file)
+        for _, _, text in lecture:
+            for term in set(arabic_text.tokenize(text)):
+                df[term] = df.get(term, 0) + 1
+        lectures[name] = {"version": version, "sentences": len(lecture), "df": df}
+        _add_lecture_df(cache, name, lectures[name], +1)
+        changed += 1
+
+    for name in list(lectures.keys() - names.keys()):
+        _add_lecture_df(cache, name, lectures.pop(name), -1)
+        changed += 1
+
+    if changed:
+        atomic_write_text(path, json.dumps(cache, ensure_ascii=False))
+    return cache
+
+# ----------------------------------------------------------------------
+# المصفوفات و TextRank
+
+def tfidf_matrix(texts, cache):
+    """مصفوفة CSR (الجمل × المفردات) بوزن TF لوغاريتمي × IDF، كل صف بطول 1"""
+    vocabulary = {}
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        for term in arabic_text.tokenize(text):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+    counts = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                               shape=(len(texts), len(vocabulary)))
+    counts.sum_duplicates()
+
+    df = cache["df"]
+    df_vector = np.array([df.get(term, 0) for term in vocabulary], dtype=np.float32)
+    idf = np.log((1 + cache["sentences"]) / (1 + df_vector)) + 1
+    counts.data = (1 + np.log(counts.data)) * idf[counts.indices]
+
+    norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ counts
+
+def textrank(blocks):
+    """TextRank لكل كتلة تشابه في آن واحد: تكرار القوة على مصفوفة انتقال قطرية كتلية"""
+    transitions = []
+    teleport = []
+    for similarity in blocks:
+        weights = similarity.copy()
+        np.fill_diagonal(weights, 0)
+        row_sums = weights.sum(axis=1, keepdims=True)
+        n = len(weights)
+        # جملة بلا جيران تنتقل بالتساوي لكل الجمل
+        weights = np.where(row_sums > 0, weights / np.where(row_sums > 0, row_sums, 1), 1 / n)
+        transitions.append(sparse.csr_matrix(weights.T))
+        teleport.append(np.full(n, 1 / n))
+    matrix = sparse.block_diag(transitions, format="csr")
+    teleport = np.concatenate(teleport)
+
+    scores = teleport.copy()
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) * teleport + DAMPING * (matrix @ scores)
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+def _select(order, similarity, count, allowed=None):
+    """أعلى الجمل وزناً مع تخطي المكرر منها، بالترتيب الزمني"""
+    chosen = []
+    for i in order:
+        if len(chosen) == count:
+            break
+        if allowed is not None and not allowed[i]:
+            continue
+        if chosen and similarity[i, chosen].max() > REDUNDANCY:
+            continue
+        chosen.append(i)
+    return sorted(chosen)
+
+def summarize_corpus(lectures, cache):
+    """{الاسم: وحدات} → {الاسم: ملخص استخراجي} بمصفوفة TF-IDF واحدة و TextRank واحد"""
+    summaries = {name: extractive_fields([], np.zeros(0), np.zeros((0, 0))) for name in lectures}
+    names = [name for name, units in lectures.items() if units]
+    if not names:
+        return summaries
+    matrix = tfidf_matrix([text for name in names for _, _, text in lectures[name]], cache)
+
+    bounds = np.cumsum([0] + [len(lectures[name]) for name in names])
+    blocks = [(matrix[a:b] @ matrix[a:b].T).toarray() for a, b in zip(bounds[:-1], bounds[1:])]
+    scores = textrank(blocks)
+    for name, a, b, similarity in zip(names, bounds[:-1], bounds[1:], blocks):
+        summaries[name] = extractive_fields(lectures[name], scores[a:b] * (b - a), similarity)
+    return summaries
+
+def extractive_fields(units, scores, similarity):
+    """النقاط الرئيسية والنظرة العامة والخلاصة من أوزان جمل محاضرة واحدة"""
+    order = np.argsort(-scores, kind="stable")
+    tail = np.arange(len(units)) >= len(units) * (1 - CONCLUSION_TAIL)
+
+    def pick(indices):
+        return [{"start": units[i][0], "end": units[i][1], "text": units[i][2],
+                 "score": round(float(scores[i]), 4)} for i in indices]
+
+    return {
+        "key_points": pick(_select(order, similarity, KEY_POINTS)),
+        "overview": pick(_select(order, similarity, OVERVIEW_SENTENCES)),
+        "conclusion": pick(_select(order, similarity, CONCLUSION_SENTENCES, tail)),
+    }
+
+def summarize_lecture(transcript_file, cache=None, cache_path=None, units=None):
+    """ملخص استخراجي لمحاضرة واحدة بالـ IDF المشترك لمجلدها (يُحدَّث لها إن لزم)؛
+    units: وحدات المحاضرة إن جُمعت أثناء قراءة سابقة للملف"""
+    name = _stem_path(transcript_file).name
+    units = lecture_units(transcript_file) if units is None else units
+    cache_path = cache_path or idf_cache_path(Path(transcript_file).parent)
+    cache = cache or update_idf_cache([transcript_file] + _other_transcripts(transcript_file), cache_path,
+                                      {name: units})
+    return summarize_corpus({name: units}, cache)[name]
+
+def _other_transcripts(transcript_file):
+    transcript_file = Path(transcript_file)
+    return [f for f in transcript_file.parent.glob("*_transcript.txt") if f != transcript_file]
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="تلخيص استخراجي TF-IDF/TextRank لكل المحاضرات")
+    parser.add_argument("--transcripts-dir", default="ملخصات_الصوتيات/transcripts")
+    parser.add_argument("--top", type=int, default=3)
+    args = parser.parse_args()
+
+    transcript_files = sorted(Path(args.transcripts_dir).glob("*_transcript.txt"))
+    cache = update_idf_cache(transcript_files, idf_cache_path(args.transcripts_dir))
+    lectures = {_stem_path(f).name: lecture_units(f) for f in transcript_files}
+    for name, summary in summarize_corpus(lectures, cache).items():
+        print(f"\n# {name}")
+        for point in sorted(summary["key_points"], key=lambda p: -p["score"])[:args.top]:
+            start = point["start"]
+            when = f"[{int(start // 60)}:{int(start % 60):02d}] " if start is not None else ""
+            print(f"  {when}{point['text'][:150]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+تحويل متدرج: نموذج سريع على كل الملف، ثم إعادة فك المقاطع غير الواثقة فقط بنموذج أكبر
+
+المقطع يُصعَّد إذا انخفض avg_logprob، أو ارتفعت نسبة الضغط (تكرار)، أو ارتفع احتمال عدم الكلام
+مع وجود نص (هلوسة محتملة). المقاطع المصعّدة المتقاربة تُدمج، وتُضم كلها في إشارة واحدة تُفك
+باستدعاء واحد للنموذج الكبير (فتتقاسم نوافذ الثلاثين ثانية)، ثم تُعاد التوقيتات وتُستبدل بها
+مقاطع النموذج السريع. إحصاءات كل محاضرة تُحفظ بجانب نصها في {stem}_cascade.json.
+
+مع process_audio_improved.py --cascade MODEL يدخل الخيار في مفتاح ذاكرة النصوص، فالمحاضرات
+المحولة سابقاً بالنموذج السريع وحده (ومنها النصوص السابقة لسجل المهام) لا تُتخطى بل تُحوَّل بالتدرج.
+
+أمثلة:
+    python model_cascade.py audio_files/lecture.mp3 --fast base --strong medium
+    python model_cascade.py report
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+import speech_segmentation
+import transcription_backends
+
+DEFAULT_FAST_MODEL = "base"
+DEFAULT_STRONG_MODEL = os.environ.get("CASCADE_MODEL", "medium")
+DEFAULT_TRANSCRIPTS_DIR = "ملخصات_الصوتيات/transcripts"
+
+LOGPROB_THRESHOLD = -0.7      # أدنى من هذا: النموذج السريع غير واثق
+COMPRESSION_THRESHOLD = 2.2   # أعلى من هذا: نص مكرر
+NO_SPEECH_THRESHOLD = 0.5     # أعلى من هذا مع وجود نص: هلوسة محتملة على صمت أو ضوضاء
+PAD_SECONDS = 0.3             # هامش حول المقطع المصعّد دون تجاوز المقطعين المجاورين
+MERGE_GAP_SECONDS = 1.0       # مقاطع مصعّدة أقرب من هذا تُفك معاً
+SLICE_GAP_SECONDS = 1.0       # صمت بين المقاطع المضمومة حتى لا يعبر مقطع واحد حدين
+
+def escalation_reasons(segment):
+    """أسباب تصعيد المقطع (قائمة فارغة إن كان واثقاً)"""
+    reasons = []
+    if segment.get("avg_logprob", 0.0) < LOGPROB_THRESHOLD:
+        reasons.append("logprob")
+    if segment.get("compression_ratio", 0.0) > COMPRESSION_THRESHOLD:
+        reasons.append("compression")
+    if segment.get("no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD and segment["text"].strip():
+        reasons.append("no_speech")
+    return reasons
+
+def escalation_regions(segments, duration):
+    """مناطق [(البداية، النهاية)] تُعاد بالنموذج الكبير، وعدد المقاطع لكل سبب"""
+    regions = []
+    reasons = {"logprob": 0, "compression": 0, "no_speech": 0}
+    for i, segment in enumerate(segments):
+        segment_reasons = escalation_reasons(segment)
+        if not segment_reasons:
+            continue
+        for reason in segment_reasons:
+            reasons[reason] += 1
+        low = segments[i - 1]["end"] if i > 0 else 0.0
+        high = segments[i + 1]["start"] if i + 1 < len(segments) else duration
+        start = max(segment["start"] - PAD_SECONDS, min(low, segment["start"]), 0.0)
+        end = min(segment["end"] + PAD_SECONDS, max(high, segment["end"]), duration)
+        if regions and start - regions[-1][1] <= MERGE_GAP_SECONDS:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return regions, reasons
+
+def _region_index(times, regions):
+    """فهرس المنطقة التي يقع فيها كل زمن (-1 خارج كل المناطق)"""
+    if not regions:
+        return np.full(len(times), -1)
+    bounds = np.array(regions)
+    index = np.searchsorted(bounds[:, 0], times, side="right") - 1
+    inside = (index >= 0) & (times <= bounds[np.maximum(index, 0), 1])
+    return np.where(inside, index, -1)
+
+def splice(fast_segments, strong_segments, regions):
+    """مقاطع النموذج السريع خارج المناطق + مقاطع النموذج الكبير داخلها، بالترتيب الزمني"""
+    middles = np.array([(s["start"] + s["end"]) / 2 for s in fast_segments])
+    kept = [s for s, region in zip(fast_segments, _region_index(middles, regions)) if region < 0]
+
+    starts = np.array([s["start"] for s in strong_segments])
+    for segment, region in zip(strong_segments, _region_index(starts, regions)):
+        if region >= 0:
+            # مقطع عبر فاصل الضم ينتهي عند نهاية منطقته حتى لا يغطي مقاطع محفوظة
+            segment["end"] = min(segment["end"], regions[region][1])
+        segment["escalated"] = True
+    segments = sorted(kept + strong_segments, key=lambda s: s["start"])
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+    return segments
+
+def cascade_transcribe(samples, fast_model=DEFAULT_FAST_MODEL, strong_model=DEFAULT_STRONG_MODEL,
+                       backend="whisper", **transcribe_options):
+    """تحويل متدرج لعينات 16 kHz؛ النتيجة بصيغة Whisper مع إحصاءات التصعيد في "cascade"
+    (النموذج الكبير لا يُحمَّل إن لم يُصعَّد أي مقطع)"""
+    duration = len(samples) / speech_segmentation.SAMPLE_RATE
+    started = time.perf_counter()
+    result = transcription_backends.get_backend(backend, fast_model).transcribe(samples, **transcribe_options)
+    fast_seconds = time.perf_counter() - started
+
+    segments = result["segments"]
+    regions, reasons = escalation_regions(segments, duration)
+    middles = np.array([(s["start"] + s["end"]) / 2 for s in segments])
+    escalated = int((_region_index(middles, regions) >= 0).sum())
+
+    strong_seconds = 0.0
+    if regions:
+        started = time.perf_counter()
+        audio, timeline = speech_segmentation.compact(samples, regions, gap_seconds=SLICE_GAP_SECONDS)
+        # المناطق غير متصلة، فسياق منطقة سابقة لا يفيد التالية وقد ينقل إليها هلوستها
+        strong = transcription_backends.get_backend(backend, strong_model).transcribe(
+            audio, **dict(transcribe_options, condition_on_previous_text=False))
+        speech_segmentation.remap_result(strong, timeline)
+        result["segments"] = splice(segments, strong["segments"], regions)
+        result["text"] = "".join(s["text"] for s in result["segments"])
+        strong_seconds = time.perf_counter() - started
+
+    escalated_seconds = sum(end - start for start, end in regions)
+    result["cascade"] = {
+        "fast_model": fast_model,
+        "strong_model": strong_model,
+        "audio_seconds": round(duration, 2),
+        "segments": len(segments),
+        "escalated_segments": escalated,
+        "escalated_regions": len(regions),
+        "escalated_seconds": round(escalated_seconds, 2),
+        "escalated_ratio": round(escalated_seconds / duration, 4) if duration else 0.0,
+        "reasons": reasons,
+        "fast_seconds": round(fast_seconds, 2),
+        "strong_seconds": round(strong_seconds, 2),
+    }
+    return result
+
+def format_stats(stats):
+    """سطر واحد بإحصاءات التصعيد لمحاضرة"""
+    return (f"📈 تصعيد {stats['escalated_segments']}/{stats['segments']} مقطع "
+            f"({stats['escalated_seconds']:.0f} ث = {stats['escalated_ratio']:.0%} من الصوت) إلى "
+            f"{stats['strong_model']}؛ الزمن {stats['fast_seconds']:.0f} + {stats['strong_seconds']:.0f} ث")
+
+def stats_path(stem_path):
+    stem_path = Path(stem_path)
+    return stem_path.with_name(f"{stem_path.name}_cascade.json")
+
+def write_stats(stats, stem_path):
+    """حفظ إحصاءات التصعيد بجانب نص المحاضرة"""
+    from transcript_cache import atomic_write_text
+    atomic_write_text(stats_path(stem_path), json.dumps(stats, ensure_ascii=False, indent=2))
+
+def report(transcripts_dir=DEFAULT_TRANSCRIPTS_DIR):
+    """جدول التصعيد لكل المحاضرات المحولة بالتدرج"""
+    files = sorted(Path(transcripts_dir).glob("*_cascade.json"))
+    if not files:
+        print("لا توجد محاضرات محولة بالتدرج")
+        return
+    audio = escalated = fast = strong = 0.0
+    print(f"{'المحاضرة':<45}{'المقاطع':>10}{'الصوت المصعّد':>16}{'الزمن (ث)':>14}")
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            stats = json.load(f)
+        name = path.name[:-len("_cascade.json")]
+        print(f"{name[-45:]:<45}{stats['escalated_segments']:>5}/{stats['segments']:<4}"
+              f"{stats['escalated_seconds']:>9.0f} ({stats['escalated_ratio']:>4.0%})"
+              f"{stats['fast_seconds']:>7.0f}+{stats['strong_seconds']:<6.0f}")
+        audio += stats["audio_seconds"]
+        escalated += stats["escalated_seconds"]
+        fast += stats["fast_seconds"]
+        strong += stats["strong_seconds"]
+    print(f"\nالمجموع: {escalated / 60:.1f} من {audio / 60:.1f} دقيقة صُعّدت ({escalated / max(audio, 1e-9):.0%})، "
+          f"زمن النموذج الكبير {strong / max(fast + strong, 1e-9):.0%} من الإجمالي")
+
+def main():
+    """الدالة الرئيسية"""
+    import whisper
+    if sys.argv[1:2] == ["report"]:
+        parser = argparse.ArgumentParser(description="إحصاءات التصعيد لكل المحاضرات")
+        parser.add_argument("--transcripts-dir", default=DEFAULT_TRANSCRIPTS_DIR)
+        report(parser.parse_args(sys.argv[2:]).transcripts_dir)
+        return
+
+    parser = argparse.ArgumentParser(description="تحويل متدرج: نموذج سريع ثم نموذج أكبر للمقاطع غير الواثقة")
+    parser.add_argument("audio_files", nargs="+")
+    parser.add_argument("--fast", default=DEFAULT_FAST_MODEL)
+    parser.add_argument("--strong", default=DEFAULT_STRONG_MODEL)
+    parser.add_argument("--backend", choices=transcription_backends.BACKENDS,
+                        default=transcription_backends.DEFAULT_BACKEND)
+    parser.add_argument("--language", default="ar")
+    parser.add_argument("--output", help="حفظ النتائج والإحصاءات بصيغة JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for audio_file in args.audio_files:
+        print(f"\n📁 {audio_file}")
+        result = cascade_transcribe(whisper.load_audio(str(audio_file)), args.fast, args.strong,
+                                    args.backend, language=args.language, task="transcribe", verbose=None)
+        print(format_stats(result["cascade"]))
+        results[str(audio_file)] = result
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ تم حفظ النتائج في: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+سجل مشترك لنماذج Whisper: يُحمَّل كل نموذج مرة واحدة ويُعاد استخدامه
+"""
+
+import os
+import gc
+import time
+from collections import OrderedDict
+
+import whisper
+
+import profiling
+
+# الحد الأقصى لذاكرة النماذج المحفوظة (بالميغابايت)
+DEFAULT_MEMORY_CAP_MB = int(os.environ.get("WHISPER_CACHE_MB", "4096"))
+
+# تحميل الأوزان عبر mmap بدلاً من نسخها كاملة إلى الذاكرة
+DEFAULT_MMAP = os.environ.get("WHISPER_MMAP", "0") == "1"
+
+_models = OrderedDict()  # (name, device, dtype) -> (model, size_mb)
+_stats = {"hits": 0, "misses": 0, "load_seconds": 0.0}
+_memory_cap_mb = DEFAULT_MEMORY_CAP_MB
+
+def set_memory_cap(cap_mb):
+    """تغيير الحد الأقصى لذاكرة النماذج وإخراج الزائد فوراً"""
+    global _memory_cap_mb
+    _memory_cap_mb = cap_mb
+    _evict()
+
+def _default_device():
+    """اختيار الجهاز تلقائياً"""
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _model_size_mb(model):
+    """حجم أوزان النموذج في الذاكرة"""
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    return total / (1024 * 1024)
+
+def _load_mmap(name, device):
+    """تحميل النموذج مع ربط ملف الأوزان بالذاكرة (mmap) دون نسخه كاملاً"""
+    import torch
+    import numpy as np
+    from whisper.model import AudioEncoder, ModelDimensions, TextDecoder, Whisper
+
+    if name in whisper._MODELS:
+        download_root = os.path.join(
+            os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+            "whisper"
+        )
+        checkpoint_path = whisper._download(whisper._MODELS[name], download_root, False)
+    else:
+        checkpoint_path = name
+
+    checkpoint = torch.load(checkpoint_path, map_location="cpu", mmap=True, weights_only=True)
+    dims = ModelDimensions(**checkpoint["dims"])
+    # الطبقات تُبنى على جهاز meta (بلا ذاكرة ولا تهيئة عشوائية)، ثم تُربط بها أوزان mmap مباشرة؛
+    # Whisper() العادي يحجز نسخة كاملة من الأوزان قبل استبدالها
+    model = Whisper.__new__(Whisper)
+    torch.nn.Module.__init__(model)
+    model.dims = dims
+    with torch.device("meta"):
+        model.encoder = AudioEncoder(dims.n_mels, dims.n_audio_ctx, dims.n_audio_state,
+                                     dims.n_audio_head, dims.n_audio_layer)
+        model.decoder = TextDecoder(dims.n_vocab, dims.n_text_ctx, dims.n_text_state,
+                                    dims.n_text_head, dims.n_text_layer)
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+
+    # المخازن غير المحفوظة في الملف تُحسب كما في Whisper.__init__ و TextDecoder.__init__
+    mask = torch.empty(dims.n_text_ctx, dims.n_text_ctx).fill_(-np.inf).triu_(1)
+    model.decoder.register_buffer("mask", mask, persistent=False)
+    all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+    all_heads[dims.n_text_layer // 2:] = True
+    model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+    return model.to(device)
+
+def _evict():
+    """إخراج أقدم النماذج استخداماً حتى نعود تحت الحد (مع إبقاء نموذج واحد على الأقل)"""
+    while len(_models) > 1 and sum(size for _, size in _models.values()) > _memory_cap_mb:
+        key, _ = _models.popitem(last=False)
+        print(f"🗑️  إخراج النموذج {key[0]} ({key[1]}, {key[2]}) من الذاكرة")
+    gc.collect()
+
+def get_model(name="base", device=None, dtype="float32", mmap=None):
+    """الحصول على نموذج Whisper من السجل أو تحميله عند أول طلب"""
+    device = device or _default_device()
+    mmap = DEFAULT_MMAP if mmap is None else mmap
+    key = (name, device, dtype)
+
+    if key in _models:
+        _models.move_to_end(key)
+        _stats["hits"] += 1
+        print(f"♻️  النموذج {name} محمّل مسبقاً (إصابات الذاكرة: {_stats['hits']})")
+        return _models[key][0]
+
+    print(f"🔄 جارٍ تحميل نموذج Whisper ({name}) على {device}...")
+    started = time.perf_counter()
+    with profiling.section("model_load", name):
+        if mmap:
+            model = _load_mmap(name, device)
+        else:
+            model = whisper.load_model(name, device=device)
+    if dtype == "float16":
+        model = model.half()
+    elapsed = time.perf_counter() - started
+
+    _stats["misses"] += 1
+    _stats["load_seconds"] += elapsed
+    _models[key] = (model, _model_size_mb(model))
+    print(f"✓ تم تحميل النموذج في {elapsed:.1f} ثانية")
+    _evict()
+    return model
+
+def cache_stats():
+    """إحصائيات السجل: الإصابات، مرات التحميل، وزمن التحميل الكلي"""
+    return {
+        **_stats,
+        "loaded": [key for key in _models],
+        "memory_mb": sum(size for _, size in _models.values()),
+    }
+
+def report():
+    """طباعة ملخص استخدام السجل"""
+    stats = cache_stats()
+    print(f"🧠 النماذج: {stats['misses']} تحميل ({stats['load_seconds']:.1f} ث)، "
+          f"{stats['hits']} إصابة، {stats['memory_mb']:.0f} MB في الذاكرة")
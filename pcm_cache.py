@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+فك ترميز الصوت مرة واحدة إلى PCM بتردد 16 kHz أحادي وحفظه بجانب الملف لإعادة استخدامه
+"""
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import profiling
+
+SAMPLE_RATE = 16000
+
+def pcm_path(audio_file):
+    """مسار ملف PCM (float32 خام) المقابل للملف الصوتي"""
+    audio_file = Path(audio_file)
+    return audio_file.with_name(audio_file.name + ".16k.f32")
+
+def has_pcm(audio_file):
+    """هل يوجد PCM محدّث (أحدث من الملف الصوتي)؟"""
+    path = pcm_path(audio_file)
+    return path.exists() and path.stat().st_mtime >= Path(audio_file).stat().st_mtime
+
+def decode_to_pcm(audio_file):
+    """فك ترميز واحد عبر ffmpeg إلى float32 أحادي 16 kHz (يُتخطى إذا كان محفوظاً)"""
+    path = pcm_path(audio_file)
+    if has_pcm(audio_file):
+        return path
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        with profiling.section("decode", Path(audio_file).name):
+            subprocess.run([
+                "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+                "-i", str(audio_file),
+                "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le",
+                tmp_path
+            ], check=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def load_pcm(audio_file):
+    """العينات كمصفوفة مربوطة بالذاكرة (تُفك أولاً إذا لم تكن محفوظة)"""
+    path = decode_to_pcm(audio_file)
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.float32)
+    # copy-on-write: قابلة للكتابة لـ torch دون تعديل الملف أو قراءته كاملاً مسبقاً
+    return np.memmap(path, dtype=np.float32, mode="c")
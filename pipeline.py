@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+خط معالجة متداخل: تحميل ← فك ترميز ← تحويل إلى نص ← تلخيص، بطوابير محدودة بين المراحل
+"""
+
+import time
+import queue
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import audio_scanner
+import create_smart_summaries
+import download_soundcloud_playlist
+import pcm_cache
+import process_audio_improved
+import semantic_index
+
+_DONE = object()  # علامة انتهاء المرحلة السابقة
+
+class _Stage:
+    """مرحلة تعمل بعدة خيوط تقرأ من طابور وتكتب نتائجها إلى الطابور التالي"""
+
+    def __init__(self, name, func, inbox, outbox, workers=1):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.busy_seconds = 0.0
+        self.items = 0
+        self._remaining = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def _loop(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                # إعادة العلامة ليراها باقي خيوط المرحلة
+                self.inbox.put(_DONE)
+                break
+            started = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                print(f"✗ [{self.name}] خطأ: {e}")
+                result = None
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - started
+                self.items += 1
+            # put يتوقف عند امتلاء الطابور التالي: هذا هو الضغط العكسي
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last and self.outbox is not None:
+            self.outbox.put(_DONE)
+
+def run_pipeline(playlist_url=None, audio_dir="audio_files",
+                 transcripts_dir="ملخصات_الصوتيات/transcripts",
+                 summaries_dir="ملخصات_الصوتيات/summaries",
+                 download_threads=3, decode_processes=2, queue_size=2, model="base", semantic=False):
+    """تشغيل كل المراحل بالتوازي حتى ينتهي آخر ملف"""
+    Path(audio_dir).mkdir(exist_ok=True)
+    Path(summaries_dir).mkdir(parents=True, exist_ok=True)
+
+    # الطوابير محدودة حتى لا يسبق التحميل التحويلَ بأكثر من بضعة ملفات
+    tracks = queue.Queue()
+    downloaded = queue.Queue(maxsize=queue_size)
+    decoded = queue.Queue(maxsize=queue_size)
+    transcribed = queue.Queue(maxsize=queue_size)
+
+    decode_pool = ProcessPoolExecutor(max_workers=decode_processes)
+
+    def download(track_url):
+        result = download_soundcloud_playlist.download_track(track_url, audio_dir)
+        if not result["ok"] or result["path"] is None:
+            return None
+        print(f"⬇️  تم التحميل: {result['path'].name} ({result['throughput'] / 1e6:.2f} MB/s)")
+        return result["path"]
+
+    def decode(audio_file):
+        if process_audio_improved.is_already_processed(audio_file, transcripts_dir, model):
+            # لا حاجة لفك الترميز، لكن التلخيص قد يكون ناقصاً
+            return audio_file, None
+        # فك ترميز واحد إلى PCM محفوظ؛ مرحلة التحويل تربطه بالذاكرة مباشرة
+        decode_pool.submit(pcm_cache.decode_to_pcm, audio_file).result()
+        return audio_file, pcm_cache.load_pcm(audio_file)
+
+    def transcribe(item):
+        audio_file, audio = item
+        if audio is not None:
+            ok = process_audio_improved.transcribe_single_file(
+                audio_file, model=model, transcripts_dir=transcripts_dir, audio=audio
+            )
+            if not ok:
+                return None
+        return Path(transcripts_dir) / f"{audio_file.stem}_transcript.txt"
+
+    def summarize(transcript_file):
+        md_file = create_smart_summaries.summarize_transcript(transcript_file, summaries_dir)
+        if md_file:
+            print(f"📝 تم حفظ الملخص: {md_file.name}")
+
+    stages = [
+        _Stage("تحويل", transcribe, decoded, transcribed, workers=1),
+        _Stage("فك الترميز", decode, downloaded, decoded, workers=decode_processes),
+        _Stage("تلخيص", summarize, transcribed, None, workers=1),
+    ]
+    if playlist_url:
+        stages.append(_Stage("تحميل", download, tracks, downloaded, workers=download_threads))
+
+    started = time.perf_counter()
+    for stage in stages:
+        stage.start()
+
+    if playlist_url:
+        pending, local, _ = download_soundcloud_playlist.split_archived(
+            download_soundcloud_playlist.list_tracks(playlist_url), download_soundcloud_playlist.DEFAULT_ARCHIVE
+        )
+        for track_url in pending:
+            tracks.put(track_url)
+        # المحمّل سابقاً يدخل فك الترميز مباشرة: التحويل المنقطع أو الفاشل يُستكمل، والمنجز يُتخطى هناك
+        # (قبل علامة الانتهاء، فلا ترسل مرحلة التحميل _DONE قبله)
+        for audio_file in local:
+            downloaded.put(audio_file)
+        tracks.put(_DONE)
+    else:
+        # بدون رابط: معالجة الملفات الموجودة محلياً
+        for audio_file in audio_scanner.iter_audio_files(audio_dir):
+            downloaded.put(audio_file)
+        downloaded.put(_DONE)
+
+    for stage in stages:
+        stage.join()
+    decode_pool.shutdown()
+
+    if semantic:
+        # بعد الملخصات: تضمين المحاضرات الجديدة فقط ثم تحديث أقسام المحاضرات ذات الصلة
+        index = semantic_index.update_index(transcripts_dir)
+        semantic_index.write_related_sections(index, summaries_dir)
+        index.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'='*70}")
+    print(f"⏱️  الزمن الكلي: {elapsed:.1f} ثانية")
+    for stage in stages:
+        print(f"  {stage.name}: {stage.items} عنصر، {stage.busy_seconds:.1f} ثانية عمل")
+    print(f"{'='*70}")
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="خط معالجة كامل من التحميل إلى الملخص")
+    parser.add_argument("playlist_url", nargs="?", help="رابط القائمة (بدونه تُعالج الملفات المحلية)")
+    parser.add_argument("--audio-dir", default="audio_files")
+    parser.add_argument("--download-threads", type=int, default=3)
+    parser.add_argument("--decode-processes", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=2,
+                        help="أقصى عدد ملفات تنتظر بين كل مرحلتين")
+    parser.add_argument("--semantic", action="store_true",
+                        help="تحديث الفهرس الدلالي والمحاضرات ذات الصلة في النهاية")
+    args = parser.parse_args()
+
+    run_pipeline(args.playlist_url, args.audio_dir,
+                 download_threads=args.download_threads,
+                 decode_processes=args.decode_processes,
+                 queue_size=args.queue_size,
+                 semantic=args.semantic)
+
+if __name__ == "__main__":
+    main()
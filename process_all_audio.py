@@ -9,20 +9,19 @@ from pathlib import Path
 import json
 from datetime import datetime
 
+import audio_scanner
+import create_smart_summaries
+import model_registry
+import profiling
+import progress
+import segment_store
+import subtitles
+import text_correction
+
+@profiling.profiled()
 def get_audio_files(audio_dir="audio_files"):
-    """الحصول على قائمة بجميع الملفات الصوتية"""
-    audio_extensions = ['.mp3', '.m4a', '.wav', '.opus', '.flac']
-    audio_files = []
-    
-    for file in Path(audio_dir).iterdir():
-        if file.suffix.lower() in audio_extensions and file.is_file():
-            # تجنب الملفات المكررة (مثل .m4a و .mp3 لنفس الملف)
-            base_name = file.stem
-            if not any(f.stem == base_name and f != file for f in Path(audio_dir).iterdir() 
-                      if f.suffix.lower() in audio_extensions):
-                audio_files.append(file)
-    
-    return sorted(audio_files)
+    """الحصول على قائمة بجميع الملفات الصوتية (بدون تكرار)"""
+    return list(audio_scanner.iter_audio_files(audio_dir))
 
 def transcribe_audio(audio_file, model="base", language="ar"):
     """تحويل الصوت إلى نص"""
@@ -31,18 +30,18 @@ def transcribe_audio(audio_file, model="base", language="ar"):
     print(f"{'='*60}")
     
     try:
-        # تحميل النموذج
-        print("جارٍ تحميل نموذج Whisper...")
-        model_obj = whisper.load_model(model)
+        # تحميل النموذج (مرة واحدة لكل الملفات)
+        model_obj = model_registry.get_model(model)
         
         # تحويل الصوت إلى نص
         print("جارٍ معالجة الملف الصوتي...")
-        result = model_obj.transcribe(
-            str(audio_file),
-            language=language,
-            task="transcribe",
-            verbose=True
-        )
+        with profiling.section("transcribe", audio_file.name):
+            result = model_obj.transcribe(
+                str(audio_file),
+                language=language,
+                task="transcribe",
+                verbose=True
+            )
         
         return result
         
@@ -51,46 +50,19 @@ def transcribe_audio(audio_file, model="base", language="ar"):
         return None
 
 def save_transcript(audio_file, result, output_dir="transcripts"):
-    """حفظ النص"""
+    """تصحيح المقاطع وحفظها في المخزن وتوليد النص وملف التوقيتات منه"""
     output_dir = Path(output_dir)
     output_dir.mkdir(exist_ok=True)
     
-    transcript_file = output_dir / f"{audio_file.stem}_transcript.txt"
-    
-    with open(transcript_file, "w", encoding="utf-8") as f:
-        f.write(result["text"])
+    segments = text_correction.correct_segments(result["segments"])
+    segment_store.save_segments(segments, output_dir / audio_file.stem)
+    transcript_file, transcript_timestamps = segment_store.write_text_files(output_dir / audio_file.stem)
+    subtitles.export_lecture(output_dir / audio_file.stem)
     
     print(f"✓ تم حفظ النص في: {transcript_file}")
     
-    # حفظ مع التوقيتات
-    transcript_timestamps = output_dir / f"{audio_file.stem}_transcript_timestamps.txt"
-    with open(transcript_timestamps, "w", encoding="utf-8") as f:
-        for segment in result["segments"]:
-            start = segment["start"]
-            end = segment["end"]
-            text = segment["text"]
-            f.write(f"[{int(start//60)}:{int(start%60):02d} - {int(end//60)}:{int(end%60):02d}] {text}\n")
-    
     return transcript_file
 
-def create_summary(transcript_text, title):
-    """إنشاء ملخص ذكي للنص"""
-    # هذا سيكون ملخص بسيط - يمكن تحسينه لاحقاً
-    words = transcript_text.split()
-    word_count = len(words)
-    
-    # أول 500 كلمة كملخص أولي
-    preview = ' '.join(words[:500])
-    
-    summary = {
-        "title": title,
-        "word_count": word_count,
-        "preview": preview,
-        "full_text": transcript_text
-    }
-    
-    return summary
-
 def process_all_files(audio_dir="audio_files", output_base="ملخصات_الصوتيات"):
     """معالجة جميع الملفات الصوتية"""
     audio_files = get_audio_files(audio_dir)
@@ -111,29 +83,33 @@ def process_all_files(audio_dir="audio_files", output_base="ملخصات_الص
     summaries_dir.mkdir(parents=True, exist_ok=True)
     
     results = []
+    tracker = progress.ProgressTracker(audio_files, "process_all_audio")
     
     for audio_file in audio_files:
+        tracker.start_file(audio_file)
+        result = None
         try:
             # تحويل إلى نص
-            result = transcribe_audio(audio_file, model="base", language="ar")
+            with tracker.stage("transcribe"):
+                result = transcribe_audio(audio_file, model="base", language="ar")
             
             if result:
                 # حفظ النص
-                transcript_file = save_transcript(audio_file, result, transcripts_dir)
-                
-                # إنشاء ملخص
-                summary = create_summary(result["text"], audio_file.stem)
+                with tracker.stage("write"):
+                    transcript_file = save_transcript(audio_file, result, transcripts_dir)
                 
-                # حفظ الملخص
-                summary_file = summaries_dir / f"{audio_file.stem}_summary.json"
-                with open(summary_file, "w", encoding="utf-8") as f:
-                    json.dump(summary, f, ensure_ascii=False, indent=2)
+                # إنشاء ملخص (نفس ملفي create_smart_summaries.py حتى لا يكتب أحدهما فوق الآخر بصيغة مختلفة)
+                with tracker.stage("summary"):
+                    create_smart_summaries.summarize_transcript(transcript_file, summaries_dir)
+                    summary_file, json_file = create_smart_summaries.summary_files(transcript_file, summaries_dir)
+                    with open(json_file, encoding="utf-8") as f:
+                        summary = json.load(f)
                 
                 results.append({
                     "file": audio_file.name,
                     "transcript": str(transcript_file),
                     "summary": str(summary_file),
-                    "word_count": summary["word_count"]
+                    "word_count": summary["statistics"]["word_count"]
                 })
                 
                 print(f"✓ تمت معالجة {audio_file.name} بنجاح!")
@@ -142,7 +118,10 @@ def process_all_files(audio_dir="audio_files", output_base="ملخصات_الص
                 
         except Exception as e:
             print(f"✗ خطأ في معالجة {audio_file.name}: {e}")
-            continue
+            result = None
+        finally:
+            audio_seconds = result["segments"][-1]["end"] if result and result["segments"] else 0.0
+            tracker.finish_file(audio_file, bool(result), audio_seconds)
     
     # حفظ تقرير بجميع النتائج
     report_file = Path(output_base) / "processing_report.json"
@@ -158,6 +137,8 @@ def process_all_files(audio_dir="audio_files", output_base="ملخصات_الص
     print(f"تمت معالجة {len(results)} من {len(audio_files)} ملف")
     print(f"التقارير محفوظة في: {output_base}")
     print(f"{'='*60}")
+    tracker.finish()
+    model_registry.report()
 
 if __name__ == "__main__":
     process_all_files()
@@ -4,97 +4,362 @@
 """
 
 import os
+import argparse
 import whisper
 from pathlib import Path
 import json
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import audio_scanner
+import model_cascade
+import model_registry
+import pcm_cache
+import profiling
+import progress
+import segment_store
+import speech_segmentation
+import streaming_transcribe
+import subtitles
+import text_correction
+import transcript_cache
+import transcription_backends
+
+@profiling.profiled()
 def get_audio_files(audio_dir="audio_files"):
     """الحصول على قائمة بجميع الملفات الصوتية (بدون تكرار)"""
-    audio_extensions = ['.mp3', '.m4a', '.wav', '.opus', '.flac']
-    audio_files = []
-    processed_names = set()
-    
-    for file in sorted(Path(audio_dir).iterdir()):
-        if file.suffix.lower() in audio_extensions and file.is_file():
-            base_name = file.stem
-            # تجنب الملفات المكررة (نأخذ .mp3 إذا كان موجوداً)
-            if base_name not in processed_names:
-                # إذا كان هناك .mp3 و .m4a لنفس الاسم، نأخذ .mp3 فقط
-                if file.suffix.lower() == '.m4a':
-                    mp3_version = file.parent / f"{base_name}.mp3"
-                    if mp3_version.exists():
-                        continue
-                
-                audio_files.append(file)
-                processed_names.add(base_name)
+    return list(audio_scanner.iter_audio_files(audio_dir))
+
+LEGACY_MODEL = "base"  # النموذج الذي حُوّلت به النصوص السابقة لسجل المهام
+
+def _decode_options(stream, backend="whisper", vad=False, cascade=None):
+    """خيارات فك الترميز التي تدخل في مفتاح ذاكرة التخزين"""
+    options = {"task": "transcribe", "stream": stream}
+    if backend != "whisper":
+        # مفاتيح openai-whisper تبقى كما كانت قبل إضافة الواجهات
+        options["backend"] = backend
+    if vad:
+        options["vad"] = True
+    if cascade:
+        options["cascade"] = cascade
+    return options
+
+def _output_paths(audio_file, transcripts_dir):
+    """مسارا ملف النص وملف التوقيتات لملف صوتي"""
+    transcripts_dir = Path(transcripts_dir)
+    return (transcripts_dir / f"{audio_file.stem}_transcript.txt",
+            transcripts_dir / f"{audio_file.stem}_transcript_timestamps.txt")
+
+def write_outputs(result, transcript_file, transcript_timestamps):
+    """تصحيح المقاطع وحفظها في المخزن ثم توليد النص والتوقيتات والترجمة (SRT/VTT) منه بشكل ذري"""
+    stem_path = transcript_file.with_name(transcript_file.name[:-len("_transcript.txt")])
+    segment_store.save_segments(text_correction.correct_segments(result["segments"]), stem_path)
+    segment_store.write_text_files(stem_path)
+    subtitles.export_lecture(stem_path)
+    if result.get("cascade"):
+        model_cascade.write_stats(result["cascade"], stem_path)
+
+def _transcribed_seconds(audio_file, transcripts_dir):
+    """مدة الصوت المحول حسب نهاية آخر مقطع في المخزن"""
+    stem_path = Path(transcripts_dir) / audio_file.stem
+    if not segment_store.has_segments(stem_path):
+        return 0.0
+    records = segment_store.load_segments(stem_path).records
+    return float(records["end"][-1]) if len(records) else 0.0
+
+def is_already_processed(audio_file, transcripts_dir, model="base", language="ar", stream=False,
+                         backend="whisper", vad=False, cascade=None):
+    """التحقق إذا كان الملف معالجاً بالفعل (مع استرجاع النص من ذاكرة التخزين إن أمكن)"""
+    transcript_file, transcript_timestamps = _output_paths(audio_file, transcripts_dir)
+    options = _decode_options(stream, backend, vad, cascade)
+    key = transcript_cache.job_key(audio_file, model, language, options)
+    status = transcript_cache.job_status(key)
+    
+    if status is None:
+        # نص قديم سابق للسجل لا يُعرف بأي خيارات حُوّل: يُعتمد للخيارات الافتراضية القديمة فقط،
+        # وغيرها (--cascade، --vad، نموذج آخر...) يُعيد التحويل
+        legacy = (model, language, options) == (LEGACY_MODEL, "ar", _decode_options(False))
+        return legacy and transcript_file.exists()
+    
+    if status == "done":
+        if transcript_file.exists() and transcript_timestamps.exists():
+            return True
+        # نفس المحتوى تحت اسم جديد أو مخرجات محذوفة: استرجاع دون إعادة التحويل
+        result = transcript_cache.load_result(key)
+        if result:
+            write_outputs(result, transcript_file, transcript_timestamps)
+            print(f"♻️  تم استرجاع النص من ذاكرة التخزين: {transcript_file.name}")
+            return True
     
-    return audio_files
+    # running: مهمة انقطعت، وأي نص موجود قد يكون مبتوراً
+    return False
 
-def is_already_processed(audio_file, transcripts_dir):
-    """التحقق إذا كان الملف معالجاً بالفعل"""
-    transcript_file = Path(transcripts_dir) / f"{audio_file.stem}_transcript.txt"
-    return transcript_file.exists()
+def _transcribe_resumable(model_obj, audio_file, key, transcript_file, language, on_segment=None):
+    """تحويل تدفقي يُسجّل كل دفعة مكتملة ويستأنف من آخرها بعد الانقطاع"""
+    chunks = transcript_cache.load_chunks(key)
+    done = transcript_cache.chunks_to_result(chunks)
+    resume_at = chunks[-1]["end"] if chunks else 0.0
+    if chunks:
+        print(f"↩️  استئناف من الثانية {resume_at:.0f} ({len(chunks)} دفعة مكتملة)")
+    
+    # ملفات جزئية لمتابعة التقدم مباشرة، تُستبدل بالنهائية عند الاكتمال
+    partial_text = transcript_file.with_name(transcript_file.name + ".partial")
+    partial_stamps = transcript_file.with_name(transcript_file.stem + "_timestamps.txt.partial")
+    with open(partial_text, "w", encoding="utf-8") as f:
+        f.write(done["text"])
+    with open(partial_stamps, "w", encoding="utf-8") as f:
+        for s in done["segments"]:
+            f.write(streaming_transcribe.format_segment_line(s["start"], s["end"], s["text"]))
+    
+    streaming_transcribe.transcribe_streaming(
+        model_obj, audio_file, partial_text, partial_stamps,
+        language=language,
+        start_seconds=resume_at,
+        append=True,
+        previous_text=done["text"],
+        on_segment=on_segment,
+        on_window=lambda start, end, text, segments: transcript_cache.save_chunk(
+            key, start, end, text, segments
+        )
+    )
+    
+    result = transcript_cache.chunks_to_result(transcript_cache.load_chunks(key))
+    partial_text.unlink()
+    partial_stamps.unlink()
+    return result
 
-def transcribe_single_file(audio_file, model="base", language="ar", transcripts_dir="ملخصات_الصوتيات/transcripts"):
-    """تحويل ملف صوتي واحد إلى نص"""
+def transcribe_single_file(audio_file, model="base", language="ar", transcripts_dir="ملخصات_الصوتيات/transcripts",
+                           stream=False, audio=None, pcm=False, backend="whisper", tracker=None, vad=False,
+                           cascade=None, on_segment=None):
+    """تحويل ملف صوتي واحد إلى نص (audio: عينات مفكوكة مسبقاً بدلاً من قراءة الملف، vad: الكلام فقط،
+    cascade: نموذج أكبر يُعيد فك المقاطع غير الواثقة، on_segment(start, end, text): لكل مقطع منجز)"""
     print(f"\n{'='*70}")
     print(f"📁 الملف: {audio_file.name}")
     size_mb = audio_file.stat().st_size / (1024 * 1024)
     print(f"📊 الحجم: {size_mb:.1f} MB")
     print(f"{'='*70}")
     
+    # التحويل التدفقي يتخطى النوافذ الصامتة بنفسه ويكتب نصه نافذة بعد نافذة
+    vad = vad and not stream
+    cascade = None if stream else cascade
+    
     # التحقق إذا كان معالجاً
-    if is_already_processed(audio_file, transcripts_dir):
+    if is_already_processed(audio_file, transcripts_dir, model, language, stream, backend, vad, cascade):
         print(f"✓ هذا الملف معالج بالفعل - تخطي")
         return True
     
     try:
-        # تحميل النموذج (مرة واحدة فقط)
-        if not hasattr(transcribe_single_file, 'model'):
-            print("🔄 جارٍ تحميل نموذج Whisper (base)...")
-            transcribe_single_file.model = whisper.load_model(model)
-            print("✓ تم تحميل النموذج")
+        # تحميل النموذج (مرة واحدة فقط لكل عملية عبر السجل المشترك)
+        with progress.stage(tracker, "load_model"):
+            model_obj = transcription_backends.get_backend(backend, model)
         
-        # تحويل الصوت إلى نص
-        print("🔄 جارٍ تحويل الصوت إلى نص...")
-        print("   (هذا قد يستغرق وقتاً حسب حجم الملف)")
+        if pcm:
+            # فك ترميز واحد محفوظ بجانب الملف يُعاد استخدامه في كل تشغيل لاحق
+            with progress.stage(tracker, "decode"):
+                pcm_cache.decode_to_pcm(audio_file)
+            if audio is None and not stream:
+                audio = pcm_cache.load_pcm(audio_file)
         
-        result = transcribe_single_file.model.transcribe(
-            str(audio_file),
-            language=language,
-            task="transcribe",
-            verbose=False  # تقليل الإخراج
-        )
-        
-        # حفظ النص
+        options = _decode_options(stream, backend, vad, cascade)
+        key = transcript_cache.job_key(audio_file, model, language, options)
+        transcript_cache.mark_running(key, audio_file, model, language, options)
+        transcript_file, transcript_timestamps = _output_paths(audio_file, transcripts_dir)
         Path(transcripts_dir).mkdir(parents=True, exist_ok=True)
-        transcript_file = Path(transcripts_dir) / f"{audio_file.stem}_transcript.txt"
         
-        with open(transcript_file, "w", encoding="utf-8") as f:
-            f.write(result["text"])
+        timeline = None
+        if vad:
+            # الصمت والضوضاء لا تصل إلى النموذج؛ التوقيتات تُعاد لزمن الملف بعد التحويل
+            with progress.stage(tracker, "vad"), profiling.section("vad", audio_file.name):
+                samples = whisper.load_audio(str(audio_file)) if audio is None else audio
+                regions = speech_segmentation.speech_regions(samples)
+                audio, timeline = speech_segmentation.compact(samples, regions)
+            duration = len(samples) / speech_segmentation.SAMPLE_RATE
+            speech_seconds = sum(end - start for start, end in regions)
+            print(f"🔇 الكلام {speech_seconds:.0f} من {duration:.0f} ثانية "
+                  f"({speech_seconds / max(duration, 1e-9):.0%}) في {len(regions)} مقطع")
+        
+        with progress.stage(tracker, "transcribe"), profiling.section("transcribe", audio_file.name):
+            if stream:
+                # تحويل تدفقي: ذاكرة محدودة ونص جزئي يظهر بعد كل نافذة
+                print("🔄 جارٍ التحويل التدفقي (نافذة بعد نافذة)...")
+                result = _transcribe_resumable(model_obj, audio_file, key, transcript_file, language, on_segment)
+            elif timeline is not None and not len(audio):
+                print("⚠ لا يوجد كلام في الملف")
+                result = {"text": "", "segments": [], "language": language}
+            elif cascade:
+                print(f"🔄 جارٍ التحويل المتدرج ({model} ثم {cascade} للمقاطع غير الواثقة)...")
+                samples = whisper.load_audio(str(audio_file)) if audio is None else audio
+                result = model_cascade.cascade_transcribe(samples, model, cascade, backend, language=language,
+                                                          task="transcribe", verbose=False)
+                if timeline is not None:
+                    speech_segmentation.remap_result(result, timeline)
+                print(model_cascade.format_stats(result["cascade"]))
+            else:
+                # تحويل الصوت إلى نص
+                print("🔄 جارٍ تحويل الصوت إلى نص...")
+                print("   (هذا قد يستغرق وقتاً حسب حجم الملف)")
+                
+                result = model_obj.transcribe(
+                    str(audio_file) if audio is None else audio,
+                    language=language,
+                    task="transcribe",
+                    verbose=False  # تقليل الإخراج
+                )
+                if timeline is not None:
+                    speech_segmentation.remap_result(result, timeline)
+        
+        if on_segment and not stream:
+            # المسار التدفقي أبلغ عن مقاطعه نافذة بعد نافذة؛ هنا تظهر كلها بعد اكتمال التحويل
+            for segment in result["segments"]:
+                on_segment(segment["start"], segment["end"], segment["text"])
+        
+        # حفظ النتيجة في ذاكرة التخزين أولاً ثم كتابة المخرجات بشكل ذري
+        with progress.stage(tracker, "write"):
+            transcript_cache.store_result(key, result)
+            write_outputs(result, transcript_file, transcript_timestamps)
         
         word_count = len(result["text"].split())
         print(f"✓ تم الحفظ: {transcript_file.name}")
         print(f"  عدد الكلمات: {word_count:,}")
         
-        # حفظ مع التوقيتات
-        transcript_timestamps = Path(transcripts_dir) / f"{audio_file.stem}_transcript_timestamps.txt"
-        with open(transcript_timestamps, "w", encoding="utf-8") as f:
-            for segment in result["segments"]:
-                start = segment["start"]
-                end = segment["end"]
-                text = segment["text"]
-                f.write(f"[{int(start//60)}:{int(start%60):02d} - {int(end//60)}:{int(end%60):02d}] {text}\n")
-        
         return True
         
     except Exception as e:
         print(f"✗ خطأ في معالجة {audio_file.name}: {e}")
         return False
 
+def _init_worker(model, torch_threads, backend="whisper"):
+    """تهيئة عملية العامل: توزيع الخيوط وتحميل النموذج مرة واحدة لكل عملية"""
+    if backend == "whisper":
+        import torch
+        torch.set_num_threads(torch_threads)
+    # كل تحميل لاحق في العامل (التحويل، النموذج الكبير في التدرج) يستعمل نفس الحصة ونفس مفتاح الذاكرة
+    transcription_backends.set_cpu_threads(torch_threads)
+    transcription_backends.get_backend(backend, model)
+
+def transcribe_parallel(audio_files, transcripts_dir, workers, model="base", stream=False, pcm=False,
+                        backend="whisper", tracker=None, vad=False, cascade=None):
+    """تحويل عدة ملفات بالتوازي عبر مجموعة عمليات، الأطول أولاً"""
+    # الملفات المعالجة تُحسب ناجحة كما في المسار التسلسلي
+    pending = [f for f in audio_files
+               if not is_already_processed(f, transcripts_dir, model, stream=stream, backend=backend,
+                                       vad=vad and not stream, cascade=None if stream else cascade)]
+    successful = len(audio_files) - len(pending)
+    failed = 0
+    if not pending:
+        return successful, failed
+    
+    # جدولة الأطول أولاً (حسب الحجم) حتى لا يبقى ملف طويل وحده في النهاية
+    pending.sort(key=lambda f: f.stat().st_size, reverse=True)
+    workers = min(workers, len(pending))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"\n⚙️  {workers} عمليات × {torch_threads} خيوط لكل عملية")
+    
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(model, torch_threads, backend)) as pool:
+        futures = {
+            pool.submit(transcribe_single_file, f, model, "ar", transcripts_dir, stream, None, pcm, backend,
+                        None, vad, cascade): f
+            for f in pending
+        }
+        # المجموعة تنفذ المهام بترتيب إرسالها: أول workers ملف تبدأ الآن، والتالي عند انتهاء أي منها
+        if tracker:
+            for f in pending[:workers]:
+                tracker.start_file(f)
+        next_start = workers
+        for done, future in enumerate(as_completed(futures), 1):
+            audio_file = futures[future]
+            try:
+                ok = future.result()
+            except Exception as e:
+                print(f"✗ خطأ في معالجة {audio_file.name}: {e}")
+                ok = False
+            if ok:
+                successful += 1
+            else:
+                failed += 1
+            if tracker:
+                tracker.finish_file(audio_file, ok, _transcribed_seconds(audio_file, transcripts_dir))
+                if next_start < len(pending):
+                    tracker.start_file(pending[next_start])
+                    next_start += 1
+            print(f"\n[{done}/{len(pending)}] انتهى: {audio_file.name}")
+    
+    return successful, failed
+
+def transcribe_batched(audio_files, transcripts_dir, model="base", language="ar",
+                       batch_seconds=transcription_backends.DEFAULT_BATCH_SECONDS, tracker=None):
+    """تحويل عدة ملفات عبر faster-whisper: مقاطع عدة ملفات قصيرة تُملأ بها نفس دفعات الاستدلال"""
+    backend = "faster-whisper"
+    pending = [f for f in audio_files
+               if not is_already_processed(f, transcripts_dir, model, language, backend=backend)]
+    successful = len(audio_files) - len(pending)
+    failed = 0
+    if not pending:
+        return successful, failed
+    
+    with progress.stage(tracker, "load_model"):
+        model_obj = transcription_backends.get_backend(backend, model)
+    options = _decode_options(False, backend)
+    Path(transcripts_dir).mkdir(parents=True, exist_ok=True)
+    
+    for group in transcription_backends.batch_groups(pending, batch_seconds):
+        print(f"\n🔄 دفعة مجمعة من {len(group)} ملف: {', '.join(f.name for f in group)}")
+        keys = []
+        for audio_file in group:
+            key = transcript_cache.job_key(audio_file, model, language, options)
+            transcript_cache.mark_running(key, audio_file, model, language, options)
+            keys.append(key)
+            if tracker:
+                tracker.start_file(audio_file)
+        try:
+            with progress.stage(tracker, "transcribe"):
+                results = model_obj.transcribe_many([str(f) for f in group], language=language)
+        except Exception as e:
+            print(f"✗ خطأ في معالجة الدفعة: {e}")
+            failed += len(group)
+            if tracker:
+                for audio_file in group:
+                    tracker.finish_file(audio_file, False)
+            continue
+        for audio_file, key, result in zip(group, keys, results):
+            with progress.stage(tracker, "write"):
+                transcript_cache.store_result(key, result)
+                transcript_file, transcript_timestamps = _output_paths(audio_file, transcripts_dir)
+                write_outputs(result, transcript_file, transcript_timestamps)
+            print(f"✓ تم الحفظ: {transcript_file.name} ({len(result['text'].split()):,} كلمة)")
+            successful += 1
+            if tracker:
+                tracker.finish_file(audio_file, True, _transcribed_seconds(audio_file, transcripts_dir))
+    
+    return successful, failed
+
 def main():
     """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="تحويل الملفات الصوتية إلى نصوص")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="عدد العمليات المتوازية (1 = تسلسلي)")
+    parser.add_argument("--stream", action="store_true",
+                        help="تحويل تدفقي على نوافذ مع تخطي الصمت وكتابة تدريجية")
+    parser.add_argument("--pcm-cache", action="store_true",
+                        help="حفظ PCM بتردد 16 kHz بجانب كل ملف وإعادة استخدامه")
+    parser.add_argument("--backend", choices=transcription_backends.BACKENDS,
+                        default=transcription_backends.DEFAULT_BACKEND,
+                        help="واجهة التحويل: openai-whisper أو faster-whisper (int8 على المعالج)")
+    parser.add_argument("--batch-seconds", type=float, default=transcription_backends.DEFAULT_BATCH_SECONDS,
+                        help="أقصى مدة صوت تُجمع من عدة ملفات في استدعاء واحد (faster-whisper)")
+    parser.add_argument("--vad", action="store_true",
+                        help="تقطيع الكلام قبل التحويل: الصمت والضوضاء لا تُرسل إلى النموذج")
+    parser.add_argument("--cascade", metavar="MODEL",
+                        help="تحويل متدرج: base على كل الملف ثم MODEL (مثلاً medium) للمقاطع غير الواثقة فقط؛ "
+                             "المحاضرات المحولة سابقاً دون تدرج تُحوَّل من جديد")
+    parser.add_argument("--status-file", default=progress.DEFAULT_STATUS_FILE,
+                        help="ملف JSON لحالة التقدم (يُحدّث ذرياً عند كل ملف)")
+    parser.add_argument("--metrics-port", type=int, default=progress.DEFAULT_METRICS_PORT,
+                        help="منفذ نقطة /metrics المحلية بصيغة Prometheus (0 = بدون)")
+    args = parser.parse_args()
+    
     audio_dir = "audio_files"
     transcripts_dir = "ملخصات_الصوتيات/transcripts"
     
@@ -113,30 +378,70 @@ def main():
     audio_files = [f for f in audio_files if f.stem != "audio"]
     
     print(f"\n📋 تم العثور على {len(audio_files)} ملف صوتي:")
+    already_processed = set()
     for i, f in enumerate(audio_files, 1):
         size_mb = f.stat().st_size / (1024 * 1024)
-        status = "✓" if is_already_processed(f, transcripts_dir) else "⏳"
+        if is_already_processed(f, transcripts_dir, stream=args.stream, backend=args.backend,
+                                vad=args.vad and not args.stream,
+                                cascade=None if args.stream else args.cascade):
+            already_processed.add(f)
+        status = "✓" if f in already_processed else "⏳"
         print(f"  {status} {i}. {f.name} ({size_mb:.1f} MB)")
     
+    tracker = progress.ProgressTracker(audio_files, "process_audio_improved",
+                                       args.status_file, args.metrics_port)
+    for f in already_processed:
+        tracker.finish_file(f, True, skipped=True)
+    
     # معالجة كل ملف
     successful = 0
     failed = 0
     
-    for i, audio_file in enumerate(audio_files, 1):
-        print(f"\n[{i}/{len(audio_files)}] معالجة الملف {i} من {len(audio_files)}")
-        
-        if transcribe_single_file(audio_file, transcripts_dir=transcripts_dir):
-            successful += 1
-        else:
-            failed += 1
+    if args.workers > 1:
+        successful, failed = transcribe_parallel(audio_files, transcripts_dir, args.workers,
+                                                 stream=args.stream, pcm=args.pcm_cache, backend=args.backend,
+                                                 tracker=tracker, vad=args.vad, cascade=args.cascade)
+    elif args.backend == "faster-whisper" and not args.stream and not args.cascade:
+        if args.vad:
+            print("ℹ️  المسار المجمّع لـ faster-whisper يقطّع الكلام بـ VAD الخاص به")
+        if args.pcm_cache:
+            with tracker.stage("decode"):
+                for audio_file in audio_files:
+                    pcm_cache.decode_to_pcm(audio_file)
+        successful, failed = transcribe_batched(audio_files, transcripts_dir, batch_seconds=args.batch_seconds,
+                                                tracker=tracker)
+    else:
+        for i, audio_file in enumerate(audio_files, 1):
+            print(f"\n[{i}/{len(audio_files)}] معالجة الملف {i} من {len(audio_files)}")
+            
+            if audio_file in already_processed:
+                print(f"✓ {audio_file.name} معالج بالفعل - تخطي")
+                successful += 1
+                continue
+            tracker.start_file(audio_file)
+            ok = transcribe_single_file(audio_file, transcripts_dir=transcripts_dir, stream=args.stream,
+                                        pcm=args.pcm_cache, backend=args.backend, tracker=tracker,
+                                        vad=args.vad, cascade=args.cascade)
+            tracker.finish_file(audio_file, ok, _transcribed_seconds(audio_file, transcripts_dir) if ok else 0.0)
+            if ok:
+                successful += 1
+            else:
+                failed += 1
     
     # تقرير نهائي
     print(f"\n{'='*70}")
     print("📊 التقرير النهائي:")
     print(f"  ✓ نجحت: {successful}")
     print(f"  ✗ فشلت: {failed}")
+    rtf = tracker.snapshot()["rtf"]
+    if rtf is not None:
+        print(f"  ⏱️  معامل الزمن الحقيقي: {rtf:.3f}" + (" (الكلام فقط)" if args.vad else ""))
+    if args.cascade and not args.stream:
+        print("  📈 إحصاءات التصعيد لكل محاضرة: python model_cascade.py report")
     print(f"  📁 الملفات محفوظة في: {transcripts_dir}")
     print(f"{'='*70}")
+    tracker.finish()
+    model_registry.report()
     
     print("\n💡 الخطوة التالية: تشغيل create_smart_summaries.py لإنشاء الملخصات")
 
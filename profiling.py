@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+أدوات قياس للمسارات الساخنة: مؤقتات، ذاكرة tracemalloc، وملفات cProfile لكل ملف
+
+تُفعّل بمتغيرات البيئة ولا تكلف شيئاً عند التعطيل (المزخرف يعيد الدالة نفسها):
+    PROFILE_HOOKS=1         مؤقتات لكل قسم + تقرير عند الخروج
+    PROFILE_TRACEMALLOC=1   ذروة الذاكرة المخصصة داخل كل قسم
+    PROFILE_CPROFILE=1      ملف .prof (pstats) لكل استدعاء خارجي، يُفتح بـ snakeviz أو pstats
+    PROFILE_DIR=profiles    مجلد الملفات الناتجة
+
+مثال:
+    PROFILE_HOOKS=1 PROFILE_CPROFILE=1 python process_audio_improved.py
+    python profiling.py profiles/summary-1234.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+import contextlib
+from pathlib import Path
+
+ENABLED = os.environ.get("PROFILE_HOOKS", "0") == "1"
+TRACEMALLOC = ENABLED and os.environ.get("PROFILE_TRACEMALLOC", "0") == "1"
+CPROFILE = ENABLED and os.environ.get("PROFILE_CPROFILE", "0") == "1"
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "profiles"))
+
+_NULL = contextlib.nullcontext()
+_timers = {}        # القسم -> {"count", "total", "max", "peak_alloc"}
+_lock = threading.Lock()
+_local = threading.local()
+_dumps = 0
+_dumped_pid = None
+
+def _record(name, seconds, peak_alloc):
+    with _lock:
+        timer = _timers.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "peak_alloc": 0})
+        timer["count"] += 1
+        timer["total"] += seconds
+        timer["max"] = max(timer["max"], seconds)
+        timer["peak_alloc"] = max(timer["peak_alloc"], peak_alloc)
+
+def _safe_name(text):
+    return re.sub(r"[^\w.-]+", "_", text)[:80]
+
+@contextlib.contextmanager
+def _section(name, label):
+    global _dumps
+    import tracemalloc
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+
+    if TRACEMALLOC:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        start_current, _ = tracemalloc.get_traced_memory()
+        if depth == 0:
+            # الأقسام الداخلية ترث ذروة القسم الخارجي (تقدير أعلى) بدل إفساد قياسه
+            tracemalloc.reset_peak()
+
+    profiler = None
+    if CPROFILE and depth == 0:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # أداة قياس أخرى مفعلة (خيط آخر مثلاً)
+            profiler = None
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        peak_alloc = 0
+        if TRACEMALLOC:
+            _, peak = tracemalloc.get_traced_memory()
+            peak_alloc = max(0, peak - start_current)
+        if profiler:
+            profiler.disable()
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            with _lock:
+                _dumps += 1
+                number = _dumps
+            parts = [name, label, str(os.getpid()), str(number)]
+            profiler.dump_stats(PROFILE_DIR / (_safe_name("-".join(p for p in parts if p)) + ".prof"))
+        _local.depth = depth
+        _record(name, seconds, peak_alloc)
+
+def section(name, label=None):
+    """قياس كتلة كود: with profiling.section("transcribe", audio_file.name): ..."""
+    if not ENABLED:
+        return _NULL
+    return _section(name, label)
+
+def profiled(name=None):
+    """مزخرف يقيس كل استدعاء للدالة (يعيد الدالة كما هي عند التعطيل)"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        section_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _section(section_name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def stats():
+    """نسخة من المؤقتات المجمعة"""
+    with _lock:
+        return {name: dict(timer) for name, timer in _timers.items()}
+
+def report(file=None):
+    """طباعة جدول الأقسام مرتبة حسب الزمن الكلي"""
+    file = file or sys.stderr
+    timers = stats()
+    if not timers:
+        return
+    print("\n⏱️  القياس (الأطول أولاً):", file=file)
+    print(f"  {'القسم':<28}{'العدد':>7}{'الكلي (ث)':>12}{'المتوسط':>10}{'الأقصى':>10}{'ذاكرة MB':>10}", file=file)
+    for name, timer in sorted(timers.items(), key=lambda item: -item[1]["total"]):
+        print(f"  {name:<28}{timer['count']:>7}{timer['total']:>12.3f}"
+              f"{timer['total'] / timer['count']:>10.3f}{timer['max']:>10.3f}"
+              f"{timer['peak_alloc'] / (1024 * 1024):>10.1f}", file=file)
+
+def _dump_summary():
+    global _dumped_pid
+    timers = stats()
+    if not timers or _dumped_pid == os.getpid():
+        return
+    _dumped_pid = os.getpid()
+    from transcript_cache import atomic_write_text
+    path = PROFILE_DIR / f"summary-{os.getpid()}.json"
+    atomic_write_text(path, json.dumps({"pid": os.getpid(), "argv": sys.argv, "sections": timers},
+                                       ensure_ascii=False, indent=2))
+    report()
+    print(f"  📄 {path}", file=sys.stderr)
+
+def _register_exit_hooks(_=None):
+    import multiprocessing.util
+    atexit.register(_dump_summary)
+    # عمليات العمال تخرج بـ os._exit دون atexit، لكن multiprocessing يشغّل مُنهياته عند الخروج
+    multiprocessing.util.Finalize(None, _dump_summary, exitpriority=1)
+
+if ENABLED:
+    import multiprocessing.util
+    _register_exit_hooks()
+    # multiprocessing يمسح المُنهيات في العملية الابنة، فتُسجّل من جديد بعد الاستنساخ
+    multiprocessing.util.register_after_fork(_local, _register_exit_hooks)
+    # العملية الابنة تبدأ بعدادات فارغة بدل نسخة من عدادات الأب
+    os.register_at_fork(after_in_child=_timers.clear)
+
+if __name__ == "__main__":
+    # عرض ملف ملخص محفوظ: python profiling.py profiles/summary-<pid>.json
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            _timers.update(json.load(f)["sections"])
+        print(path)
+        report(sys.stdout)
+        _timers.clear()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+تقدم المعالجة بشكل منظم: ملف حالة JSON يُكتب ذرياً عند كل حدث، ونقطة /metrics بصيغة Prometheus
+
+لا مسح للمجلدات ولا استطلاع دوري: الأرقام تُحدّث فقط عند بدء ملف أو انتهائه.
+
+عرض الحالة:
+    python progress.py [ملف الحالة]
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import contextlib
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_STATUS_FILE = os.environ.get("PROGRESS_STATUS_FILE", "processing_status.json")
+DEFAULT_METRICS_PORT = int(os.environ.get("PROGRESS_METRICS_PORT", "0"))
+
+def _rss_mb(who):
+    """الذاكرة القصوى بالميغابايت (لينكس بالكيلوبايت، macOS بالبايت)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class ProgressTracker:
+    """عدّادات التقدم لدفعة ملفات، تُنشر في ملف الحالة ونقطة /metrics"""
+
+    def __init__(self, audio_files, script, status_file=DEFAULT_STATUS_FILE, metrics_port=DEFAULT_METRICS_PORT):
+        self.script = script
+        self.status_file = status_file
+        self.sizes = {str(f): Path(f).stat().st_size for f in audio_files}
+        self.total_bytes = sum(self.sizes.values())
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes_processed = 0
+        self.bytes_skipped = 0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+        self.current = {}   # الملفات قيد المعالجة -> وقت البدء
+        self.stages = {}    # المرحلة -> [الثواني، العدد]
+        self.state = "running"
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._server = None
+        if metrics_port:
+            self.serve_metrics(metrics_port)
+        self.write()
+
+    def start_file(self, audio_file):
+        """بدء معالجة ملف"""
+        with self._lock:
+            self.current[str(audio_file)] = time.time()
+        self.write()
+
+    def finish_file(self, audio_file, ok, audio_seconds=0.0, skipped=False):
+        """انتهاء ملف: نجح أو فشل أو تُخطي لأنه معالج مسبقاً"""
+        key = str(audio_file)
+        with self._lock:
+            started = self.current.pop(key, None)
+            size = self.sizes.get(key, 0)
+            if skipped:
+                self.skipped += 1
+                self.bytes_skipped += size
+            else:
+                if ok:
+                    self.done += 1
+                    self.audio_seconds += audio_seconds
+                else:
+                    self.failed += 1
+                self.bytes_processed += size
+                if started is not None:
+                    self.processing_seconds += time.time() - started
+        self.write()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """قياس زمن مرحلة (تحميل النموذج، التحويل، الكتابة...)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                seconds, count = self.stages.get(name, (0.0, 0))
+                self.stages[name] = (seconds + time.perf_counter() - started, count + 1)
+
+    def snapshot(self):
+        """الحالة الحالية كقاموس"""
+        with self._lock:
+            now = time.time()
+            elapsed = now - self.started_at
+            finished = self.done + self.failed + self.skipped
+            remaining_bytes = self.total_bytes - self.bytes_processed - self.bytes_skipped
+            # الوقت المتبقي بمعدل البايتات المعالجة فعلاً (الملفات المتخطاة لا تُحتسب)
+            eta = (elapsed / self.bytes_processed * remaining_bytes
+                   if self.bytes_processed and self.state == "running" else None)
+            return {
+                "script": self.script,
+                "pid": os.getpid(),
+                "state": self.state,
+                "started_at": self.started_at,
+                "updated_at": now,
+                "elapsed_seconds": elapsed,
+                "files": {
+                    "total": len(self.sizes),
+                    "done": self.done,
+                    "failed": self.failed,
+                    "skipped": self.skipped,
+                    "remaining": len(self.sizes) - finished,
+                },
+                "current_files": [
+                    {"file": Path(f).name, "running_seconds": now - t} for f, t in self.current.items()
+                ],
+                "audio_seconds_processed": self.audio_seconds,
+                "rtf": self.processing_seconds / self.audio_seconds if self.audio_seconds else None,
+                "eta_seconds": eta,
+                "peak_rss_mb": _rss_mb(resource.RUSAGE_SELF),
+                "children_peak_rss_mb": _rss_mb(resource.RUSAGE_CHILDREN),
+                "stages": {
+                    name: {"seconds": seconds, "count": count} for name, (seconds, count) in self.stages.items()
+                },
+            }
+
+    def write(self):
+        """كتابة ملف الحالة ذرياً"""
+        from transcript_cache import atomic_write_text
+        if self.status_file:
+            atomic_write_text(self.status_file, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+
+    def finish(self):
+        """تعليم الدفعة كمنتهية وإيقاف خادم /metrics"""
+        with self._lock:
+            self.state = "finished"
+        self.write()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def render_metrics(self):
+        """نص /metrics بصيغة Prometheus"""
+        status = self.snapshot()
+        lines = [
+            "# TYPE transcribe_files gauge",
+            *(f'transcribe_files{{state="{state}"}} {count}'
+              for state, count in status["files"].items() if state != "total"),
+            "# TYPE transcribe_audio_seconds_total counter",
+            f"transcribe_audio_seconds_total {status['audio_seconds_processed']:.3f}",
+            "# TYPE transcribe_rtf gauge",
+            f"transcribe_rtf {status['rtf'] if status['rtf'] is not None else 'NaN'}",
+            "# TYPE transcribe_eta_seconds gauge",
+            f"transcribe_eta_seconds {status['eta_seconds'] if status['eta_seconds'] is not None else 'NaN'}",
+            "# TYPE transcribe_peak_rss_bytes gauge",
+            f"transcribe_peak_rss_bytes {int(status['peak_rss_mb'] * 1024 * 1024)}",
+            "# TYPE transcribe_stage_seconds_total counter",
+            *(f'transcribe_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.3f}'
+              for name, stage in status["stages"].items()),
+            "# TYPE transcribe_current_file gauge",
+            *(f'transcribe_current_file{{file="{current["file"]}"}} 1'
+              for current in status["current_files"]),
+            "# TYPE transcribe_started_timestamp_seconds gauge",
+            f"transcribe_started_timestamp_seconds {status['started_at']:.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port, host="127.0.0.1"):
+        """تشغيل خادم /metrics محلي في خيط خلفي"""
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracker.render_metrics(), "text/plain; version=0.0.4"
+                elif self.path == "/status":
+                    body, content_type = json.dumps(tracker.snapshot(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"📈 المقاييس على http://{host}:{self._server.server_port}/metrics")
+
+def stage(tracker, name):
+    """tracker.stage(name) أو سياق فارغ إذا لم يكن هناك متتبع"""
+    return tracker.stage(name) if tracker else contextlib.nullcontext()
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "—"
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def print_status(status_file=DEFAULT_STATUS_FILE):
+    """طباعة ملف الحالة بشكل مقروء"""
+    if not Path(status_file).exists():
+        print(f"⚠ لا يوجد ملف حالة ({status_file}) - لم تبدأ أي معالجة بعد")
+        return False
+    with open(status_file, encoding="utf-8") as f:
+        status = json.load(f)
+
+    print("=== حالة المعالجة ===\n")
+    if status["state"] == "finished":
+        print(f"✓ انتهت المعالجة ({status['script']})")
+    elif _pid_alive(status["pid"]):
+        print(f"✓ العملية تعمل حالياً ({status['script']}, pid {status['pid']})")
+    else:
+        print(f"⚠ العملية توقفت قبل الانتهاء ({status['script']}, pid {status['pid']})")
+
+    files = status["files"]
+    print(f"\nالملفات: {files['done']} منجز، {files['skipped']} معالج مسبقاً، "
+          f"{files['failed']} فشل، {files['remaining']} متبقٍ من {files['total']}")
+    for current in status["current_files"]:
+        print(f"  ⏳ {current['file']} (منذ {_format_seconds(current['running_seconds'])})")
+    print(f"الصوت المعالج: {_format_seconds(status['audio_seconds_processed'])}")
+    if status["rtf"] is not None:
+        print(f"معامل الزمن الحقيقي: {status['rtf']:.2f}")
+    print(f"الوقت المنقضي: {_format_seconds(status['elapsed_seconds'])}، "
+          f"المتبقي تقديرياً: {_format_seconds(status['eta_seconds'])}")
+    print(f"الذاكرة القصوى: {status['peak_rss_mb']:.0f} MB")
+    if status["stages"]:
+        print("\nالمراحل:")
+        for name, stage_stats in status["stages"].items():
+            print(f"  {name}: {stage_stats['seconds']:.1f} ث ({stage_stats['count']} مرة)")
+    updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(status["updated_at"]))
+    print(f"\nآخر تحديث: {updated}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if print_status(*sys.argv[1:2]) else 1)
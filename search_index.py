@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+فهرس بحث نصي (SQLite FTS5) لكل المحاضرات مع توقيت كل نتيجة
+
+أمثلة:
+    python search_index.py build
+    python search_index.py query "الخشوع في الصلاة"
+"""
+
+import sys
+import sqlite3
+import argparse
+from pathlib import Path
+
+import arabic_text
+import segment_store
+import text_correction
+
+DEFAULT_TRANSCRIPTS_DIR = "ملخصات_الصوتيات/transcripts"
+DEFAULT_INDEX = "ملخصات_الصوتيات/search_index.sqlite3"
+
+def _connect(index_path):
+    """فتح الفهرس وإنشاء الجداول عند الحاجة"""
+    conn = sqlite3.connect(index_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS lectures (
+            id INTEGER PRIMARY KEY, name TEXT UNIQUE, source TEXT, size INTEGER, mtime_ns INTEGER
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+            norm, lecture_id UNINDEXED, start UNINDEXED, end UNINDEXED, text UNINDEXED,
+            tokenize = 'unicode61'
+        );
+    """)
+    return conn
+
+def _lecture_sources(transcripts_dir):
+    """مصدر مقاطع كل محاضرة: مخزن المقاطع إن وُجد، وإلا ملف التوقيتات"""
+    sources = {}
+    for path in Path(transcripts_dir).glob("*_transcript_timestamps.txt"):
+        sources[path.name[:-len("_transcript_timestamps.txt")]] = path
+    for path in Path(transcripts_dir).glob("*_segments.npy"):
+        sources[path.name[:-len("_segments.npy")]] = path
+    return sources
+
+def _read_segments(source):
+    """مقاطع المحاضرة من مصدرها (ملفات التوقيتات القديمة تُصحح عند القراءة)"""
+    if source.name.endswith("_segments.npy"):
+        stem_path = source.with_name(source.name[:-len("_segments.npy")])
+        return list(segment_store.load_segments(stem_path))
+    return text_correction.correct_segments(segment_store.read_timestamps_file(source))
+
+def build_index(transcripts_dir=DEFAULT_TRANSCRIPTS_DIR, index_path=DEFAULT_INDEX):
+    """بناء الفهرس أو تحديثه: لا يُعاد إلا ما تغير من المحاضرات"""
+    conn = _connect(index_path)
+    known = {
+        name: (lecture_id, source, size, mtime_ns)
+        for lecture_id, name, source, size, mtime_ns in conn.execute("SELECT * FROM lectures")
+    }
+    sources = _lecture_sources(transcripts_dir)
+    updated = 0
+
+    with conn:
+        # محاضرات حُذفت ملفاتها
+        for name in known.keys() - sources.keys():
+            conn.execute("DELETE FROM segments WHERE lecture_id = ?", (known[name][0],))
+            conn.execute("DELETE FROM lectures WHERE id = ?", (known[name][0],))
+
+        for name, source in sorted(sources.items()):
+            stat = source.stat()
+            if name in known and known[name][1:] == (str(source), stat.st_size, stat.st_mtime_ns):
+                continue
+            if name in known:
+                conn.execute("DELETE FROM segments WHERE lecture_id = ?", (known[name][0],))
+            conn.execute(
+                "INSERT OR REPLACE INTO lectures (id, name, source, size, mtime_ns) VALUES "
+                "((SELECT id FROM lectures WHERE name = ?), ?, ?, ?, ?)",
+                (name, name, str(source), stat.st_size, stat.st_mtime_ns)
+            )
+            lecture_id = conn.execute("SELECT id FROM lectures WHERE name = ?", (name,)).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO segments (norm, lecture_id, start, end, text) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (arabic_text.search_form(s["text"]), lecture_id, s["start"], s["end"], s["text"].strip())
+                    for s in _read_segments(source)
+                )
+            )
+            updated += 1
+            print(f"✓ فُهرست: {name}")
+
+    conn.execute("INSERT INTO segments(segments) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+    print(f"\n✓ تم تحديث {updated} محاضرة، والفهرس يضم {len(sources)} محاضرة")
+    return updated
+
+def search(query, index_path=DEFAULT_INDEX, limit=20):
+    """البحث في الفهرس: كل كلمات الاستعلام مطلوبة، والنتائج مرتبة بالصلة"""
+    terms = arabic_text.tokenize(query)
+    if not terms:
+        return []
+    match = " ".join(f'"{term}"' for term in terms)
+    conn = _connect(index_path)
+    rows = conn.execute(
+        """
+        SELECT lectures.name, segments.start, segments.end, segments.text
+        FROM segments JOIN lectures ON lectures.id = segments.lecture_id
+        WHERE segments MATCH ?
+        ORDER BY bm25(segments)
+        LIMIT ?
+        """,
+        (f"norm : ({match})", limit)
+    ).fetchall()
+    conn.close()
+    return [
+        {"lecture": name, "start": start, "end": end, "text": text}
+        for name, start, end, text in rows
+    ]
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="فهرس البحث في نصوص المحاضرات")
+    parser.add_argument("--index", default=DEFAULT_INDEX)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="بناء الفهرس أو تحديثه")
+    build.add_argument("--transcripts-dir", default=DEFAULT_TRANSCRIPTS_DIR)
+    query = sub.add_parser("query", help="البحث")
+    query.add_argument("text")
+    query.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.transcripts_dir, args.index)
+        return
+
+    hits = search(args.text, args.index, args.limit)
+    if not hits:
+        print("لا توجد نتائج")
+        sys.exit(1)
+    for hit in hits:
+        start = hit["start"]
+        print(f"[{int(start//60)}:{int(start%60):02d}] {hit['lecture']}: {hit['text']}")
+
+if __name__ == "__main__":
+    main()
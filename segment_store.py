@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+مخزن مقاطع عمودي لكل محاضرة: مصفوفة NumPy مهيكلة + نص UTF-8 مفهرس بالإزاحات + رموز النموذج
+
+الملفات بجانب النصوص:
+    <stem>_segments.npy     سجل لكل مقطع (التوقيتات، الاحتمالات، إزاحات النص والرموز)
+    <stem>_segments.utf8    نصوص المقاطع متتالية
+    <stem>_tokens.npy       رموز Whisper لكل المقاطع متتالية (int32)
+
+كلها تُقرأ بـ mmap دون نسخ، وملفات .txt و _timestamps.txt تُولد منها عند الطلب.
+"""
+
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import profiling
+
+SEGMENT_DTYPE = np.dtype([
+    ("start", "<f8"),
+    ("end", "<f8"),
+    ("avg_logprob", "<f4"),
+    ("no_speech_prob", "<f4"),
+    ("compression_ratio", "<f4"),
+    ("temperature", "<f4"),
+    ("text_offset", "<u8"),
+    ("text_length", "<u4"),
+    ("token_offset", "<u8"),
+    ("token_count", "<u4"),
+])
+
+_TIMESTAMP_LINE = re.compile(r"\[(\d+):(\d+) - (\d+):(\d+)\] (.*)")
+
+# حقول المقطع التي تُحفظ (ما عدا النص والرموز)
+SEGMENT_FIELDS = ("start", "end", "avg_logprob", "no_speech_prob", "compression_ratio", "temperature")
+
+def compact_segment(segment):
+    """نسخة من مقطع Whisper بالحقول المحفوظة فقط (صالحة لـ JSON)"""
+    compact = {field: float(segment[field]) for field in SEGMENT_FIELDS if field in segment}
+    compact["text"] = segment["text"]
+    if "tokens" in segment:
+        compact["tokens"] = [int(t) for t in segment["tokens"]]
+    return compact
+
+def store_paths(stem_path):
+    """مسارات ملفات المخزن لبادئة مثل transcripts/<stem>"""
+    stem_path = Path(stem_path)
+    return (stem_path.with_name(stem_path.name + "_segments.npy"),
+            stem_path.with_name(stem_path.name + "_segments.utf8"),
+            stem_path.with_name(stem_path.name + "_tokens.npy"))
+
+def _atomic_save(path, write):
+    """كتابة ملف عبر ملف مؤقت ثم إعادة تسمية"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+@profiling.profiled()
+def save_segments(segments, stem_path):
+    """حفظ قائمة مقاطع Whisper في المخزن"""
+    records_path, text_path, tokens_path = store_paths(stem_path)
+    records_path.parent.mkdir(parents=True, exist_ok=True)
+
+    records = np.zeros(len(segments), dtype=SEGMENT_DTYPE)
+    texts = []
+    tokens = []
+    text_offset = 0
+    token_offset = 0
+    for i, segment in enumerate(segments):
+        encoded = segment["text"].encode("utf-8")
+        segment_tokens = segment.get("tokens") or []
+        record = records[i]
+        for field in SEGMENT_FIELDS:
+            record[field] = segment.get(field, np.nan)
+        record["text_offset"] = text_offset
+        record["text_length"] = len(encoded)
+        record["token_offset"] = token_offset
+        record["token_count"] = len(segment_tokens)
+        texts.append(encoded)
+        tokens.extend(segment_tokens)
+        text_offset += len(encoded)
+        token_offset += len(segment_tokens)
+
+    _atomic_save(text_path, lambda f: f.write(b"".join(texts)))
+    _atomic_save(tokens_path, lambda f: np.save(f, np.asarray(tokens, dtype=np.int32)))
+    # السجلات آخراً: وجودها يعني أن المخزن مكتمل
+    _atomic_save(records_path, lambda f: np.save(f, records))
+
+def read_timestamps_file(timestamps_file):
+    """قراءة ملف توقيتات قديم ([m:ss - m:ss] نص) كقائمة مقاطع"""
+    segments = []
+    with open(timestamps_file, encoding="utf-8") as f:
+        for line in f:
+            match = _TIMESTAMP_LINE.match(line)
+            if match:
+                start_m, start_s, end_m, end_s, text = match.groups()
+                segments.append({
+                    "start": int(start_m) * 60 + int(start_s),
+                    "end": int(end_m) * 60 + int(end_s),
+                    "text": text,
+                })
+    return segments
+
+def has_segments(stem_path):
+    """هل يوجد مخزن مقاطع لهذه المحاضرة؟"""
+    return store_paths(stem_path)[0].exists()
+
+class SegmentStore:
+    """قراءة المخزن عبر mmap: التحميل لا يقرأ إلا الترويسات"""
+
+    def __init__(self, stem_path):
+        records_path, text_path, tokens_path = store_paths(stem_path)
+        self.records = np.load(records_path, mmap_mode="r")
+        self.tokens_array = np.load(tokens_path, mmap_mode="r")
+        self._text = (np.memmap(text_path, dtype=np.uint8, mode="r")
+                      if text_path.stat().st_size else np.zeros(0, dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.records)
+
+    def text(self, i):
+        """نص المقطع رقم i"""
+        record = self.records[i]
+        start = int(record["text_offset"])
+        return bytes(self._text[start:start + int(record["text_length"])]).decode("utf-8")
+
+    def tokens(self, i):
+        """رموز المقطع رقم i"""
+        record = self.records[i]
+        start = int(record["token_offset"])
+        return self.tokens_array[start:start + int(record["token_count"])]
+
+    def segment(self, i):
+        """المقطع رقم i بصيغة Whisper"""
+        record = self.records[i]
+        segment = {field: float(record[field]) for field in SEGMENT_FIELDS}
+        segment["text"] = self.text(i)
+        segment["tokens"] = self.tokens(i).tolist()
+        return segment
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.segment(i)
+
+def load_segments(stem_path):
+    """فتح مخزن المقاطع لمحاضرة"""
+    return SegmentStore(stem_path)
+
+def render_transcript(store):
+    """النص الكامل كما في ملف _transcript.txt"""
+    return "".join(store.text(i) for i in range(len(store)))
+
+def render_timestamps(store):
+    """أسطر ملف _transcript_timestamps.txt"""
+    from streaming_transcribe import format_segment_line
+    for i in range(len(store)):
+        record = store.records[i]
+        yield format_segment_line(float(record["start"]), float(record["end"]), store.text(i))
+
+@profiling.profiled()
+def write_text_files(stem_path):
+    """توليد ملفي النص والتوقيتات من المخزن"""
+    from transcript_cache import atomic_write_text
+    stem_path = Path(stem_path)
+    store = load_segments(stem_path)
+    transcript_file = stem_path.with_name(stem_path.name + "_transcript.txt")
+    timestamps_file = stem_path.with_name(stem_path.name + "_transcript_timestamps.txt")
+    atomic_write_text(transcript_file, render_transcript(store))
+    atomic_write_text(timestamps_file, "".join(render_timestamps(store)))
+    return transcript_file, timestamps_file
+
+if __name__ == "__main__":
+    # توليد ملفات النص من المخزن: python segment_store.py transcripts/<stem> ...
+    for stem in sys.argv[1:]:
+        for path in write_text_files(stem):
+            print(f"✓ {path}")
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+فهرس دلالي للمحاضرات: تضمين مقاطع النصوص بنموذج محلي على المعالج، مصفوفة float16 مربوطة بالذاكرة،
+بحث top-k (مسطح أو IVF)، وقسم "محاضرات ذات صلة" في كل ملخص
+
+يعمل دون إنترنت: النموذج يُحمّل من ذاكرة sentence-transformers المحلية أو من مسار (SEMANTIC_MODEL).
+المحاضرة الجديدة تُضمَّن وحدها وتُلحق بآخر المصفوفة، والمتغيرة تُعلَّم القديمة منها كمحذوفة.
+
+أمثلة:
+    python semantic_index.py build
+    python semantic_index.py query "كيف نحافظ على الخشوع" -k 5
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MODEL = os.environ.get("SEMANTIC_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+DEFAULT_INDEX_DIR = "ملخصات_الصوتيات/semantic_index"
+DEFAULT_TRANSCRIPTS_DIR = "ملخصات_الصوتيات/transcripts"
+DEFAULT_SUMMARIES_DIR = "ملخصات_الصوتيات/summaries"
+
+CHUNK_WORDS = 120        # حجم المقطع المضمَّن بالكلمات تقريباً
+ENCODE_BATCH = 64        # عدد المقاطع في استدعاء تضمين واحد
+BLOCK_ROWS = 65536       # صفوف المصفوفة المقروءة في كل خطوة بحث
+IVF_MIN_ROWS = 20000     # أقل عدد صفوف لاستخدام IVF بدل البحث المسطح
+IVF_NPROBE = 8           # عدد القوائم المفحوصة في كل استعلام
+RELATED_COUNT = 5
+
+RELATED_START = "<!-- related_lectures:start -->"
+RELATED_END = "<!-- related_lectures:end -->"
+
+_encoders = {}
+
+def get_encoder(model=DEFAULT_MODEL):
+    """نموذج sentence-transformers محلي على المعالج (يُحمّل مرة واحدة، دون تنزيل)"""
+    if model not in _encoders:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        from sentence_transformers import SentenceTransformer
+        print(f"🔄 جارٍ تحميل نموذج التضمين ({model})...")
+        _encoders[model] = SentenceTransformer(model, device="cpu")
+    return _encoders[model]
+
+def encode(texts, model=DEFAULT_MODEL):
+    """تضمين دفعات كبيرة من النصوص إلى متجهات مطبّعة float16"""
+    vectors = get_encoder(model).encode(texts, batch_size=ENCODE_BATCH, normalize_embeddings=True,
+                                        convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float16)
+
+def chunk_segments(segments, chunk_words=CHUNK_WORDS):
+    """تجميع المقاطع المتتالية في قطع بحجم chunk_words تقريباً مع توقيتها"""
+    chunk, words = [], 0
+    for segment in segments:
+        chunk.append(segment)
+        words += len(segment["text"].split())
+        if words >= chunk_words:
+            yield chunk[0]["start"], chunk[-1]["end"], " ".join(s["text"].strip() for s in chunk)
+            chunk, words = [], 0
+    if chunk:
+        yield chunk[0]["start"], chunk[-1]["end"], " ".join(s["text"].strip() for s in chunk)
+
+class SemanticIndex:
+    """المصفوفة (vectors.f16) وقوائم IVF (lists.i32) وبيانات المقاطع (chunks.sqlite3) في مجلد واحد"""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, model=DEFAULT_MODEL):
+        self.dir = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.vectors_path = self.dir / "vectors.f16"
+        self.lists_path = self.dir / "lists.i32"
+        self.centroids_path = self.dir / "centroids.npy"
+        self.conn = sqlite3.connect(self.dir / "chunks.sqlite3")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS lectures (
+                name TEXT PRIMARY KEY, source TEXT, size INTEGER, mtime_ns INTEGER,
+                first_row INTEGER, n_rows INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY, lecture TEXT, start REAL, end REAL, text TEXT, active INTEGER
+            );
+        """)
+        if self._meta("model") not in (None, model):
+            # نموذج مختلف يعني فضاء متجهات مختلفاً: إعادة البناء من الصفر
+            print(f"⚠ تغير نموذج التضمين ({self._meta('model')} → {model}): إعادة بناء الفهرس")
+            self.reset()
+        self._set_meta("model", model)
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    def reset(self):
+        """حذف كل المتجهات والبيانات"""
+        with self.conn:
+            self.conn.execute("DELETE FROM lectures")
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM meta")
+        for path in (self.vectors_path, self.lists_path, self.centroids_path):
+            path.unlink(missing_ok=True)
+
+    @property
+    def dim(self):
+        value = self._meta("dim")
+        return int(value) if value else None
+
+    @property
+    def rows(self):
+        if not self.dim or not self.vectors_path.exists():
+            return 0
+        return self.vectors_path.stat().st_size // (2 * self.dim)
+
+    def vectors(self):
+        """المصفوفة كاملة عبر mmap للقراءة فقط"""
+        if not self.rows:
+            return np.zeros((0, self.dim or 0), dtype=np.float16)
+        return np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(self.rows, self.dim))
+
+    def active_mask(self):
+        mask = np.zeros(self.rows, dtype=bool)
+        for first_row, n_rows in self.conn.execute("SELECT first_row, n_rows FROM lectures"):
+            mask[first_row:first_row + n_rows] = True
+        return mask
+
+    # ------------------------------------------------------------------
+    # الإضافة
+
+    def add_lecture(self, name, source, segments):
+        """تضمين مقاطع محاضرة وإلحاقها بآخر المصفوفة (القديمة منها تُعلَّم كمحذوفة)"""
+        chunks = list(chunk_segments(segments))
+        if not chunks:
+            return 0
+        vectors = encode([text for _, _, text in chunks], self.model)
+        if self.dim is None:
+            self._set_meta("dim", vectors.shape[1])
+
+        first_row = self.rows
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors).tobytes())
+        if self.centroids_path.exists():
+            self._append_lists(vectors)
+
+        stat = Path(source).stat()
+        with self.conn:
+            self.conn.execute("UPDATE chunks SET active = 0 WHERE lecture = ?", (name,))
+            self.conn.execute("INSERT OR REPLACE INTO lectures VALUES (?, ?, ?, ?, ?, ?)",
+                              (name, str(source), stat.st_size, stat.st_mtime_ns, first_row, len(chunks)))
+            self.conn.executemany(
+                "INSERT INTO chunks VALUES (?, ?, ?, ?, ?, 1)",
+                ((first_row + i, name, start, end, text) for i, (start, end, text) in enumerate(chunks))
+            )
+        return len(chunks)
+
+    def compact(self):
+        """إعادة كتابة المصفوفة بالصفوف الفعالة فقط (بعد تراكم المحذوف من المحاضرات المتغيرة)"""
+        vectors = self.vectors()
+        lectures = self.conn.execute("SELECT name, first_row, n_rows FROM lectures ORDER BY first_row").fetchall()
+        tmp_path = self.vectors_path.with_suffix(".tmp")
+        row = 0
+        with open(tmp_path, "wb") as f, self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE active = 0")
+            for name, first_row, n_rows in lectures:
+                f.write(np.ascontiguousarray(vectors[first_row:first_row + n_rows]).tobytes())
+                self.conn.execute("UPDATE lectures SET first_row = ? WHERE name = ?", (row, name))
+                # أرقام سالبة مؤقتة حتى لا تتصادم الصفوف أثناء الإزاحة
+                self.conn.execute("UPDATE chunks SET row = -1 - (row - ?) WHERE lecture = ?", (first_row - row, name))
+                row += n_rows
+            self.conn.execute("UPDATE chunks SET row = -1 - row")
+        del vectors
+        os.replace(tmp_path, self.vectors_path)
+        if self.centroids_path.exists():
+            self.train_ivf()
+        print(f"✓ ضغط الفهرس: {row:,} صف فعال")
+
+    def remove_lecture(self, name):
+        with self.conn:
+            self.conn.execute("UPDATE chunks SET active = 0 WHERE lecture = ?", (name,))
+            self.conn.execute("DELETE FROM lectures WHERE name = ?", (name,))
+
+    def is_current(self, name, source):
+        stat = Path(source).stat()
+        row = self.conn.execute("SELECT source, size, mtime_ns FROM lectures WHERE name = ?", (name,)).fetchone()
+        return row == (str(source), stat.st_size, stat.st_mtime_ns)
+
+    # ------------------------------------------------------------------
+    # IVF
+
+    def train_ivf(self, nlist=None, iterations=10, sample=50000, seed=0):
+        """k-means كروي على عينة من الصفوف ثم توزيع كل الصفوف على القوائم"""
+        vectors = self.vectors()
+        nlist = nlist or max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(len(vectors), min(sample, len(vectors)), replace=False))
+        data = np.asarray(vectors[sample_rows], dtype=np.float32)
+        centroids = data[rng.choice(len(data), nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for k in range(nlist):
+                members = data[assign == k]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[k] = centroid / (np.linalg.norm(centroid) or 1.0)
+        np.save(self.centroids_path, centroids)
+        self.lists_path.unlink(missing_ok=True)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            self._append_lists(vectors[start:start + BLOCK_ROWS])
+        self._set_meta("ivf_rows", len(vectors))
+        print(f"✓ IVF: {nlist} قائمة على {len(vectors):,} صف")
+
+    def _append_lists(self, vectors):
+        centroids = np.load(self.centroids_path)
+        lists = np.argmax(np.asarray(vectors, dtype=np.float32) @ centroids.T, axis=1).astype(np.int32)
+        with open(self.lists_path, "ab") as f:
+            f.write(lists.tobytes())
+
+    def maybe_train_ivf(self):
+        """تدريب IVF عند تجاوز IVF_MIN_ROWS، وإعادته كلما تضاعف عدد الصفوف"""
+        trained = int(self._meta("ivf_rows") or 0)
+        if self.rows >= IVF_MIN_ROWS and self.rows >= 2 * trained:
+            self.train_ivf()
+
+    # ------------------------------------------------------------------
+    # البحث
+
+    def search_vector(self, query, k=10, nprobe=IVF_NPROBE):
+        """أفضل k صفوف (الرقم، التشابه) لمتجه استعلام مطبّع"""
+        query = np.asarray(query, dtype=np.float32)
+        vectors = self.vectors()
+        active = self.active_mask()
+        if self.centroids_path.exists():
+            centroids = np.load(self.centroids_path)
+            probe = np.argsort(-(centroids @ query))[:nprobe]
+            lists = np.fromfile(self.lists_path, dtype=np.int32)
+            active &= np.isin(lists, probe)
+            candidates = np.flatnonzero(active)
+            scores = np.asarray(vectors[candidates], dtype=np.float32) @ query
+            best = np.argsort(-scores)[:k]
+            return list(zip(candidates[best].tolist(), scores[best].tolist()))
+
+        rows, scores = [], []
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block_scores = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32) @ query
+            block_scores[~active[start:start + BLOCK_ROWS]] = -np.inf
+            top = np.argsort(-block_scores)[:k]
+            rows.extend((start + top).tolist())
+            scores.extend(block_scores[top].tolist())
+        best = np.argsort(-np.array(scores))[:k] if scores else []
+        return [(rows[i], scores[i]) for i in best if np.isfinite(scores[i])]
+
+    def search(self, text, k=10):
+        """أقرب k مقاطع دلالياً لنص الاستعلام"""
+        if not self.rows:
+            return []
+        query = encode([text], self.model)[0]
+        hits = []
+        for row, score in self.search_vector(query, k):
+            lecture, start, end, chunk = self.conn.execute(
+                "SELECT lecture, start, end, text FROM chunks WHERE row = ?", (row,)
+            ).fetchone()
+            hits.append({"lecture": lecture, "start": start, "end": end, "text": chunk, "score": score})
+        return hits
+
+    def lecture_vectors(self):
+        """متجه لكل محاضرة: متوسط متجهات مقاطعها مطبّعاً"""
+        vectors = self.vectors()
+        names, centroids = [], []
+        for name, first_row, n_rows in self.conn.execute(
+                "SELECT name, first_row, n_rows FROM lectures ORDER BY name"):
+            centroid = np.asarray(vectors[first_row:first_row + n_rows], dtype=np.float32).mean(axis=0)
+            names.append(name)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+        return names, np.array(centroids, dtype=np.float32)
+
+    def related_lectures(self, count=RELATED_COUNT):
+        """لكل محاضرة: أقرب count محاضرات مع درجة التشابه"""
+        names, centroids = self.lecture_vectors()
+        if len(names) < 2:
+            return {name: [] for name in names}
+        similarity = centroids @ centroids.T
+        np.fill_diagonal(similarity, -np.inf)
+        related = {}
+        for i, name in enumerate(names):
+            best = np.argsort(-similarity[i])[:count]
+            related[name] = [(names[j], float(similarity[i, j])) for j in best]
+        return related
+
+    def close(self):
+        self.conn.close()
+
+def update_index(transcripts_dir=DEFAULT_TRANSCRIPTS_DIR, index_dir=DEFAULT_INDEX_DIR, model=DEFAULT_MODEL):
+    """تضمين المحاضرات الجديدة أو المتغيرة فقط"""
+    from search_index import _lecture_sources, _read_segments
+    index = SemanticIndex(index_dir, model)
+    sources = _lecture_sources(transcripts_dir)
+    known = {name for (name,) in index.conn.execute("SELECT name FROM lectures")}
+    for name in known - sources.keys():
+        index.remove_lecture(name)
+
+    added = 0
+    for name, source in sorted(sources.items()):
+        if index.is_current(name, source):
+            continue
+        chunks = index.add_lecture(name, source, _read_segments(source))
+        added += 1
+        print(f"✓ تضمين: {name} ({chunks} مقطع)")
+    if index.rows > 2 * int(index.active_mask().sum()):
+        index.compact()
+    index.maybe_train_ivf()
+    print(f"\n✓ تم تضمين {added} محاضرة، والفهرس يضم {len(sources)} محاضرة ({index.rows:,} صف)")
+    return index
+
+def format_related_block(related):
+    """قسم "محاضرات ذات صلة" بين علامتيه من قائمة {title, score} (كما تُحفظ في JSON الملخص)"""
+    lines = [RELATED_START, "", "## محاضرات ذات صلة", ""]
+    lines += [f"- [{item['title']}](<{item['title']}_summary.md>) ({item['score']:.2f})" for item in related]
+    lines += ["", RELATED_END]
+    return "\n".join(lines) + "\n"
+
+def write_related_sections(index, summaries_dir=DEFAULT_SUMMARIES_DIR, count=RELATED_COUNT):
+    """إضافة قسم "محاضرات ذات صلة" لكل ملخص Markdown و JSON (يُستبدل عند كل تشغيل)"""
+    import json
+    import re
+    from transcript_cache import atomic_write_text
+
+    block_re = re.compile(re.escape(RELATED_START) + ".*?" + re.escape(RELATED_END) + "\n?", re.S)
+    updated = 0
+    for name, related in index.related_lectures(count).items():
+        md_file = Path(summaries_dir) / f"{name}_summary.md"
+        if not md_file.exists():
+            continue
+        related = [{"title": other, "score": score} for other, score in related]
+        block = format_related_block(related)
+
+        with open(md_file, encoding="utf-8") as f:
+            md = f.read()
+        new_md = block_re.sub("", md).rstrip("\n") + "\n\n" + block
+        if new_md != md:
+            atomic_write_text(md_file, new_md)
+            updated += 1
+
+        json_file = md_file.with_suffix(".json")
+        if json_file.exists():
+            with open(json_file, encoding="utf-8") as f:
+                summary = json.load(f)
+            summary["related_lectures"] = related
+            atomic_write_text(json_file, json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"✓ تم تحديث قسم المحاضرات ذات الصلة في {updated} ملخص")
+    return updated
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="الفهرس الدلالي للمحاضرات")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="تضمين الجديد وتحديث أقسام المحاضرات ذات الصلة")
+    build.add_argument("--transcripts-dir", default=DEFAULT_TRANSCRIPTS_DIR)
+    build.add_argument("--summaries-dir", default=DEFAULT_SUMMARIES_DIR)
+    query = sub.add_parser("query", help="بحث دلالي")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = update_index(args.transcripts_dir, args.index_dir, args.model)
+        write_related_sections(index, args.summaries_dir)
+        index.close()
+        return
+
+    index = SemanticIndex(args.index_dir, args.model)
+    hits = index.search(args.text, args.k)
+    index.close()
+    if not hits:
+        print("لا توجد نتائج")
+        sys.exit(1)
+    for hit in hits:
+        start = hit["start"]
+        print(f"[{hit['score']:.2f}] [{int(start//60)}:{int(start%60):02d}] {hit['lecture']}: {hit['text'][:120]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+تقطيع الكلام قبل التحويل: طاقة الإطارات وخصائص الطيف محسوبة دفعة واحدة بـ NumPy على إشارة 16 kHz،
+ثم يُرسل الكلام فقط إلى النموذج وتُعاد التوقيتات إلى زمن الملف الأصلي
+
+الصمت الطويل وضوضاء القاعة (تصفيق، همهمة) لا تصل إلى Whisper، فلا يُهدر عليها وقت الفك ولا تولد
+نصوصاً وهمية. الفواصل الطويلة بين المقاطع الكلامية هي أيضاً أقرب تقدير لتبدل المتحدث.
+
+مثال (نسبة الكلام في كل ملف وزمن التقطيع):
+    python speech_segmentation.py audio_files/*.mp3
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02       # إطارات غير متداخلة (320 عينة)
+BLOCK_FRAMES = 3000        # إطارات كل دفعة FFT (دقيقة صوت) حتى تبقى الذاكرة محدودة
+SPEECH_BAND = (80, 4000)   # نطاق الكلام بالهرتز (مع الطبقة الأساسية للأصوات الرجالية)
+NOISE_PERCENTILE = 10      # أرضية الضوضاء: هذه النسبة المئوية من طاقة الإطارات
+ENERGY_MARGIN_DB = 12.0    # الكلام يعلو أرضية الضوضاء بهذا القدر على الأقل
+MIN_ENERGY_DB = -55.0      # وأعلى من هذا الحد المطلق
+MIN_BAND_RATIO = 0.6       # نسبة طاقة نطاق الكلام إلى الطاقة الكلية
+MAX_FLATNESS = 0.45        # التسطح الطيفي: الضوضاء والتصفيق قريبان من 1، الكلام منخفض
+MIN_SILENCE_SECONDS = 0.6  # فجوات أقصر من هذا تُدمج في الكلام
+MIN_SPEECH_SECONDS = 0.3   # مقاطع كلام أقصر من هذا تُهمل
+PAD_SECONDS = 0.2          # هامش حول كل مقطع كلامي
+GAP_SECONDS = 0.3          # صمت يُدرج بين المقاطع المدمجة حتى لا تلتصق الكلمات
+
+def frame_features(samples):
+    """(الطاقة dB، نسبة نطاق الكلام، التسطح الطيفي) لكل إطار"""
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(samples) // frame
+    frames = np.asarray(samples[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    band_ratio = np.empty(n_frames, dtype=np.float32)
+    flatness = np.empty(n_frames, dtype=np.float32)
+    freqs = np.fft.rfftfreq(frame, 1 / SAMPLE_RATE)
+    in_band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+    window = np.hanning(frame).astype(np.float32)
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        energy_db[start:start + BLOCK_FRAMES] = 10 * np.log10(np.mean(block ** 2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(block * window, axis=1)) ** 2 + 1e-12
+        total = power.sum(axis=1)
+        band_ratio[start:start + BLOCK_FRAMES] = power[:, in_band].sum(axis=1) / total
+        flatness[start:start + BLOCK_FRAMES] = np.exp(np.mean(np.log(power), axis=1)) / (total / power.shape[1])
+    return energy_db, band_ratio, flatness
+
+def _runs(mask):
+    """(البداية، النهاية) لكل تتابع True في مصفوفة منطقية"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def speech_mask(samples):
+    """قناع كلام لكل إطار بعد سد الفجوات القصيرة وحذف المقاطع القصيرة"""
+    energy_db, band_ratio, flatness = frame_features(samples)
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy_db, NOISE_PERCENTILE)
+    mask = ((energy_db > max(noise_floor + ENERGY_MARGIN_DB, MIN_ENERGY_DB))
+            & (band_ratio > MIN_BAND_RATIO) & (flatness < MAX_FLATNESS))
+
+    # سد فجوات الصمت القصيرة بين الكلمات
+    starts, ends = _runs(~mask)
+    short = (ends - starts) < MIN_SILENCE_SECONDS / FRAME_SECONDS
+    inner = (starts > 0) & (ends < len(mask))
+    for start, end in zip(starts[short & inner], ends[short & inner]):
+        mask[start:end] = True
+
+    # حذف نبضات الكلام القصيرة (طرقات، سعال)
+    starts, ends = _runs(mask)
+    for start, end in zip(starts, ends):
+        if end - start < MIN_SPEECH_SECONDS / FRAME_SECONDS:
+            mask[start:end] = False
+    return mask
+
+def speech_regions(samples, pad_seconds=PAD_SECONDS):
+    """مقاطع الكلام [(البداية، النهاية)] بالثواني مع هامش، بعد دمج المتداخل"""
+    mask = speech_mask(samples)
+    starts, ends = _runs(mask)
+    duration = len(samples) / SAMPLE_RATE
+    regions = []
+    for start, end in zip(starts * FRAME_SECONDS - pad_seconds, ends * FRAME_SECONDS + pad_seconds):
+        start, end = max(0.0, float(start)), min(duration, float(end))
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+def compact(samples, regions, gap_seconds=GAP_SECONDS):
+    """ضم مقاطع الكلام في إشارة واحدة، وجدول (بداية في الإشارة المضمومة، بداية أصلية، المدة)"""
+    gap = np.zeros(int(gap_seconds * SAMPLE_RATE), dtype=np.float32)
+    pieces, timeline = [], []
+    position = 0
+    for start, end in regions:
+        piece = samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        timeline.append((position / SAMPLE_RATE, start, len(piece) / SAMPLE_RATE))
+        pieces += [piece, gap]
+        position += len(piece) + len(gap)
+    if not pieces:
+        return np.zeros(0, dtype=np.float32), np.zeros((0, 3))
+    return np.concatenate(pieces[:-1]).astype(np.float32), np.array(timeline)
+
+def remap_times(times, timeline):
+    """تحويل أزمنة الإشارة المضمومة إلى أزمنة الملف الأصلي (متجهياً)"""
+    times = np.asarray(times, dtype=np.float64)
+    if not len(timeline):
+        return times
+    index = np.clip(np.searchsorted(timeline[:, 0], times, side="right") - 1, 0, len(timeline) - 1)
+    # زمن يقع في الصمت المُدرج يُثبَّت عند نهاية المقطع السابق
+    within = np.clip(times - timeline[index, 0], 0, timeline[index, 2])
+    return timeline[index, 1] + within
+
+def remap_result(result, timeline):
+    """إعادة توقيتات نتيجة Whisper (المقاطع والكلمات) إلى زمن الملف الأصلي"""
+    segments = result["segments"]
+    if not segments:
+        return result
+    starts = remap_times([s["start"] for s in segments], timeline)
+    ends = remap_times([s["end"] for s in segments], timeline)
+    for segment, start, end in zip(segments, starts, ends):
+        segment["start"], segment["end"] = float(start), float(max(start, end))
+        words = segment.get("words")
+        if words:
+            word_starts = remap_times([w["start"] for w in words], timeline)
+            word_ends = remap_times([w["end"] for w in words], timeline)
+            for word, word_start, word_end in zip(words, word_starts, word_ends):
+                word["start"], word["end"] = float(word_start), float(max(word_start, word_end))
+    return result
+
+def transcribe_speech(model, samples, **transcribe_options):
+    """تحويل الكلام فقط ثم إعادة التوقيتات؛ يعيد (النتيجة، مدة الكلام بالثواني)"""
+    regions = speech_regions(samples)
+    speech_audio, timeline = compact(samples, regions)
+    speech_seconds = sum(end - start for start, end in regions)
+    if not len(speech_audio):
+        return {"text": "", "segments": [], "language": transcribe_options.get("language")}, 0.0
+    result = model.transcribe(speech_audio, **transcribe_options)
+    return remap_result(result, timeline), speech_seconds
+
+def main():
+    """الدالة الرئيسية"""
+    import whisper
+    parser = argparse.ArgumentParser(description="نسبة الكلام في الملفات الصوتية")
+    parser.add_argument("audio_files", nargs="+")
+    args = parser.parse_args()
+
+    total_audio = total_speech = total_seconds = 0.0
+    for audio_file in args.audio_files:
+        samples = whisper.load_audio(audio_file)
+        started = time.perf_counter()
+        regions = speech_regions(samples)
+        elapsed = time.perf_counter() - started
+        duration = len(samples) / SAMPLE_RATE
+        speech = sum(end - start for start, end in regions)
+        total_audio += duration
+        total_speech += speech
+        total_seconds += elapsed
+        print(f"{audio_file}: {speech:.0f}/{duration:.0f} ث كلام ({speech / max(duration, 1e-9):.0%})، "
+              f"{len(regions)} مقطع، التقطيع {elapsed * 1000:.0f} ms")
+    if total_audio:
+        print(f"\nالمجموع: {total_speech / total_audio:.0%} كلام، "
+              f"التقطيع بمعامل زمن حقيقي {total_seconds / total_audio:.5f}")
+
+if __name__ == "__main__":
+    sys.exit(main())
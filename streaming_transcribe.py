@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+تحويل تدفقي للمحاضرات الطويلة: فك ترميز على نوافذ ثابتة، تخطي الصمت، وكتابة تدريجية
+"""
+
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+import pcm_cache
+import profiling
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30      # طول نافذة فك الترميز (نافذة Whisper الأصلية)
+FRAME_SECONDS = 0.03     # طول إطار حساب الطاقة
+SILENCE_DB = -45.0       # الإطارات الأهدأ من هذا تعتبر صمتاً
+MIN_SPEECH_RATIO = 0.05  # أقل نسبة إطارات كلامية لاعتبار النافذة كلاماً
+STDERR_TAIL_BYTES = 2000 # ما يُحفظ من مخرجات ffmpeg للخطأ
+
+def _iter_pcm_windows(audio_file, window_seconds, start_seconds):
+    """نوافذ من PCM محفوظ مسبقاً (بدون أي فك ترميز)"""
+    pcm = pcm_cache.load_pcm(audio_file)
+    window = int(window_seconds * SAMPLE_RATE)
+    for i in range(int(start_seconds * SAMPLE_RATE), len(pcm), window):
+        yield i / SAMPLE_RATE, np.array(pcm[i:i + window])
+
+def iter_audio_windows(audio_file, window_seconds=WINDOW_SECONDS, start_seconds=0.0):
+    """فك ترميز الملف عبر ffmpeg وإرجاع نوافذ ثابتة الطول (بداية النافذة، العينات)"""
+    if pcm_cache.has_pcm(audio_file):
+        yield from _iter_pcm_windows(audio_file, window_seconds, start_seconds)
+        return
+    
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+        "-ss", str(start_seconds),
+        "-i", str(audio_file),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-"
+    ]
+    # stderr في ملف مؤقت لا أنبوب: لا يمتلئ فيوقف ffmpeg، ويبقى ذيله لرسالة الخطأ
+    stderr = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+    window_bytes = int(window_seconds * SAMPLE_RATE) * 2
+    offset = start_seconds
+    try:
+        while True:
+            data = proc.stdout.read(window_bytes)
+            if not data:
+                break
+            samples = np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+            yield offset, samples
+            offset += len(samples) / SAMPLE_RATE
+        proc.wait()
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            # المستهلك توقف مبكراً عن قصد
+            proc.kill()
+            proc.wait()
+        stderr.seek(0)
+        error_tail = stderr.read()[-STDERR_TAIL_BYTES:].decode("utf-8", "replace").strip()
+        stderr.close()
+    # ملف مفقود أو تالف أو مبتور: لا نعيد نوافذ ناقصة كأنها الملف كاملاً
+    if proc.returncode != 0:
+        raise RuntimeError(f"فشل فك ترميز {audio_file} عبر ffmpeg (رمز {proc.returncode}): {error_tail}")
+
+def speech_ratio(samples, silence_db=SILENCE_DB):
+    """نسبة الإطارات التي تتجاوز طاقتها عتبة الصمت"""
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return 0.0
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    return float(np.mean(20 * np.log10(rms) > silence_db))
+
+def format_segment_line(start, end, text):
+    """سطر بصيغة ملف التوقيتات المعتادة"""
+    return f"[{int(start//60)}:{int(start%60):02d} - {int(end//60)}:{int(end%60):02d}] {text}\n"
+
+def iter_speech_windows(audio_file, window_seconds=WINDOW_SECONDS, start_seconds=0.0):
+    """النوافذ الكلامية (البداية، العينات) مع تخطي النوافذ الصامتة"""
+    for offset, samples in iter_audio_windows(audio_file, window_seconds, start_seconds):
+        if speech_ratio(samples) >= MIN_SPEECH_RATIO:
+            yield offset, samples
+
+def transcribe_streaming(model, audio_file, transcript_file, timestamps_file,
+                         language="ar", on_segment=None,
+                         start_seconds=0.0, on_window=None, append=False, previous_text=""):
+    """تحويل الملف نافذة بعد نافذة (استدعاء واحد للنموذج لكل نافذة كلامية) مع كتابة النص
+    والتوقيتات فور انتهاء كل نافذة"""
+    word_count = 0
+    mode = "a" if append else "w"
+    with open(transcript_file, mode, encoding="utf-8") as text_out, \
+         open(timestamps_file, mode, encoding="utf-8") as stamps_out:
+        for window_start, samples in iter_speech_windows(audio_file, start_seconds=start_seconds):
+            with profiling.section("transcribe_window"):
+                result = model.transcribe(
+                    samples,
+                    language=language,
+                    task="transcribe",
+                    verbose=None,
+                    # تمرير ذيل النافذة السابقة للحفاظ على السياق عبر الحدود
+                    initial_prompt=previous_text[-200:] or None
+                )
+            segments = []
+            for segment in result["segments"]:
+                start = window_start + segment["start"]
+                end = window_start + segment["end"]
+                segments.append({**segment, "start": start, "end": end})
+                stamps_out.write(format_segment_line(start, end, segment["text"]))
+                if on_segment:
+                    on_segment(start, end, segment["text"])
+            text_out.write(result["text"])
+            text_out.flush()
+            stamps_out.flush()
+            if on_window:
+                on_window(window_start, window_start + len(samples) / SAMPLE_RATE, result["text"], segments)
+            word_count += len(result["text"].split())
+            previous_text = result["text"]
+            print(f"   ⏱️  {Path(audio_file).name}: حتى {window_start + len(samples) / SAMPLE_RATE:.0f} ث")
+    return word_count
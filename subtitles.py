@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+تصدير الترجمة (SRT و WebVTT) من مقاطع Whisper أو مخزن المقاطع بمرور واحد وبدقة الميلي ثانية
+
+المولدات تعالج مقطعاً بعد مقطع، فلا تُحمّل مقاطع المحاضرة كلها في الذاكرة.
+
+أمثلة:
+    python subtitles.py                                   # كل المحاضرات في مجلد النصوص
+    python subtitles.py ملخصات_الصوتيات/transcripts/<stem> --format vtt --max-chars 70
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import segment_store
+import text_correction
+
+MAX_LINE_CHARS = 42     # أقصى عدد أحرف في السطر
+MAX_LINES = 2           # أقصى عدد أسطر في الترجمة الواحدة
+MIN_CUE_SECONDS = 0.5   # أقصر مدة عرض
+
+# علامة الاتجاه من اليمين لليسار: تُبقي الترقيم في طرفه الصحيح داخل المشغلات
+RLM = "\u200f"
+_RTL_CHAR = re.compile(r"[\u0590-\u08ff\ufb1d-\ufdff\ufe70-\ufefc]")
+
+def format_timestamp(seconds, separator=","):
+    """HH:MM:SS,mmm (SRT) أو HH:MM:SS.mmm (WebVTT)"""
+    millis = max(0, round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def _rtl_line(line):
+    """إحاطة السطر العربي بعلامتي RLM"""
+    return f"{RLM}{line}{RLM}" if _RTL_CHAR.search(line) else line
+
+def wrap_lines(text, line_chars=MAX_LINE_CHARS):
+    """تقسيم النص إلى أسطر عند حدود الكلمات دون تجاوز line_chars"""
+    lines = []
+    current = ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > line_chars:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+def _iter_raw_cues(segments, max_chars, line_chars):
+    """(البداية، النهاية، الأسطر) لكل ترجمة دون حد أدنى للمدة"""
+    line_chars = min(line_chars, max_chars)
+    lines_per_cue = max(1, max_chars // line_chars)
+    for segment in segments:
+        lines = wrap_lines(segment["text"], line_chars)
+        if not lines:
+            continue
+        start, end = float(segment["start"]), float(segment["end"])
+        cues = [lines[i:i + lines_per_cue] for i in range(0, len(lines), lines_per_cue)]
+        total_chars = sum(len(line) for line in lines)
+        elapsed_chars = 0
+        for cue_lines in cues:
+            cue_chars = sum(len(line) for line in cue_lines)
+            cue_start = start + (end - start) * elapsed_chars / total_chars
+            elapsed_chars += cue_chars
+            cue_end = start + (end - start) * elapsed_chars / total_chars
+            yield cue_start, cue_end, cue_lines
+
+def iter_cues(segments, max_chars=MAX_LINE_CHARS * MAX_LINES, line_chars=MAX_LINE_CHARS):
+    """(البداية، النهاية، الأسطر) لكل ترجمة؛ المقطع الطويل يُقسم ويوزع زمنه بنسبة الأحرف
+
+    الترجمة القصيرة تمتد حتى MIN_CUE_SECONDS دون أن تتجاوز بداية التالية (داخل المقطع وعبر
+    المقاطع)، فتبقى الترجمات غير متداخلة؛ تُؤخر ترجمة واحدة فقط لمعرفة بداية التالية."""
+    previous = None
+    for cue in _iter_raw_cues(segments, max_chars, line_chars):
+        if previous:
+            start, end, lines = previous
+            yield start, max(start, min(max(end, start + MIN_CUE_SECONDS), cue[0])), lines
+        previous = cue
+    if previous:
+        start, end, lines = previous
+        yield start, max(end, start + MIN_CUE_SECONDS), lines
+
+def iter_srt(segments, **cue_options):
+    """نص ملف SRT ترجمة بعد ترجمة"""
+    for number, (start, end, lines) in enumerate(iter_cues(segments, **cue_options), 1):
+        body = "\n".join(_rtl_line(line) for line in lines)
+        yield f"{number}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{body}\n\n"
+
+def iter_vtt(segments, **cue_options):
+    """نص ملف WebVTT ترجمة بعد ترجمة"""
+    yield "WEBVTT\n\n"
+    for start, end, lines in iter_cues(segments, **cue_options):
+        body = "\n".join(_rtl_line(line) for line in lines)
+        yield f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{body}\n\n"
+
+FORMATS = {"srt": iter_srt, "vtt": iter_vtt}
+
+def write_subtitles(segments, path, fmt="srt", **cue_options):
+    """كتابة ملف ترجمة تدفقياً إلى ملف مؤقت ثم إعادة تسميته"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for chunk in FORMATS[fmt](segments, **cue_options):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def lecture_segments(stem_path):
+    """مقاطع المحاضرة من المخزن (بالميلي ثانية)، وإلا من ملف التوقيتات القديم (بالثانية)"""
+    stem_path = Path(stem_path)
+    if segment_store.has_segments(stem_path):
+        store = segment_store.load_segments(stem_path)
+        # قراءة كسولة: نص وتوقيت كل مقطع عند الحاجة فقط
+        return ({"start": float(store.records[i]["start"]), "end": float(store.records[i]["end"]),
+                 "text": store.text(i)} for i in range(len(store)))
+    timestamps = stem_path.with_name(stem_path.name + "_transcript_timestamps.txt")
+    return text_correction.correct_segments(segment_store.read_timestamps_file(timestamps))
+
+def export_lecture(stem_path, formats=("srt", "vtt"), **cue_options):
+    """توليد ملفات الترجمة بجانب نصوص المحاضرة"""
+    stem_path = Path(stem_path)
+    return [
+        write_subtitles(lecture_segments(stem_path), stem_path.with_name(f"{stem_path.name}.{fmt}"),
+                        fmt, **cue_options)
+        for fmt in formats
+    ]
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="تصدير ترجمة SRT/WebVTT للمحاضرات")
+    parser.add_argument("stems", nargs="*",
+                        help="بادئات المحاضرات (transcripts/<stem>)، افتراضياً كل المحاضرات")
+    parser.add_argument("--transcripts-dir", default="ملخصات_الصوتيات/transcripts")
+    parser.add_argument("--format", nargs="+", choices=sorted(FORMATS), default=["srt", "vtt"])
+    parser.add_argument("--max-chars", type=int, default=MAX_LINE_CHARS * MAX_LINES,
+                        help="أقصى عدد أحرف في الترجمة الواحدة")
+    parser.add_argument("--line-chars", type=int, default=MAX_LINE_CHARS)
+    args = parser.parse_args()
+
+    stems = args.stems or sorted({
+        str(path)[:-len(suffix)]
+        for suffix in ("_segments.npy", "_transcript_timestamps.txt")
+        for path in Path(args.transcripts_dir).glob(f"*{suffix}")
+    })
+    if not stems:
+        print("لم يتم العثور على محاضرات!")
+        sys.exit(1)
+    for stem in stems:
+        for path in export_lecture(stem, args.format, max_chars=args.max_chars, line_chars=args.line_chars):
+            print(f"✓ {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Offline tests for the concurrent yt-dlp downloader: a tiny RSS "playlist" of
+WAV fixtures is served from a local HTTP server that supports Range requests
+and can fail a path a given number of times.
+"""
+
+import io
+import sys
+import wave
+import shutil
+import functools
+import threading
+from pathlib import Path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("yt_dlp")
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+
+import download_soundcloud_playlist as dl
+
+TRACKS = ("track1", "track2", "track3")
+
+def _wav_bytes(frequency, seconds=1.0, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"".join(
+            int(8000 * ((i * frequency // rate) % 2 * 2 - 1)).to_bytes(2, "little", signed=True)
+            for i in range(int(seconds * rate))
+        ))
+    return buffer.getvalue()
+
+class _Handler(SimpleHTTPRequestHandler):
+    """Static files with single-range support, a request log and scripted failures."""
+
+    def __init__(self, *args, server_state, **kwargs):
+        self.state = server_state
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        path = self.path.split("#")[0].split("?")[0]
+        with self.state["lock"]:
+            self.state["requests"].append((path, self.headers.get("Range")))
+            failures = self.state["fail"].get(path, 0)
+            if failures:
+                self.state["fail"][path] = failures - 1
+        if failures:
+            self.send_error(503)
+            return
+        range_header = self.headers.get("Range")
+        file = Path(self.directory) / path.lstrip("/")
+        if not range_header or not file.is_file():
+            super().do_GET()
+            return
+        data = file.read_bytes()
+        start = int(range_header.split("=")[1].split("-")[0])
+        self.send_response(206)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "srv"
+    root.mkdir()
+    for i, name in enumerate(TRACKS, 1):
+        (root / f"{name}.wav").write_bytes(_wav_bytes(200 * i))
+    state = {"requests": [], "fail": {}, "lock": threading.Lock()}
+    handler = functools.partial(_Handler, server_state=state, directory=str(root))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    base = f"http://127.0.0.1:{httpd.server_port}"
+    items = "".join(
+        f'<item><title>{name}</title><guid>{name}</guid>'
+        f'<enclosure url="{base}/{name}.wav" type="audio/wav"/></item>'
+        for name in TRACKS
+    )
+    (root / "feed.xml").write_text(
+        f'<?xml version="1.0"?><rss version="2.0"><channel><title>fixture</title>{items}</channel></rss>',
+        encoding="utf-8")
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield {"base": base, "root": root, "state": state}
+    httpd.shutdown()
+    httpd.server_close()
+
+def _track_requests(state):
+    return [path for path, _ in state["requests"] if path.endswith(".wav")]
+
+def test_archive_skips_downloaded_tracks_and_maps_their_files(server, tmp_path):
+    out, archive = tmp_path / "audio", str(tmp_path / "archive.txt")
+    feed = f"{server['base']}/feed.xml"
+    assert dl.download_playlist(feed, str(out), concurrency=3, archive_file=archive, native=True)
+    assert sorted(p.name for p in out.glob("*.wav")) == [f"{name}.wav" for name in TRACKS]
+    assert len(dl.load_archive(archive)) == len(TRACKS)
+
+    before = len(_track_requests(server["state"]))
+    assert dl.download_playlist(feed, str(out), concurrency=3, archive_file=archive, native=True)
+    assert len(_track_requests(server["state"])) == before
+
+    # The pipeline feeds archived tracks' files back to decoding
+    pending, local, skipped = dl.split_archived(dl.list_tracks(feed), archive)
+    assert pending == [] and skipped == len(TRACKS)
+    assert sorted(p.name for p in local) == [f"{name}.wav" for name in TRACKS]
+
+    (out / "track2.wav").unlink()
+    _, local, skipped = dl.split_archived(dl.list_tracks(feed), archive)
+    assert skipped == len(TRACKS) and "track2.wav" not in {p.name for p in local}
+
+def test_retries_after_server_errors(server, tmp_path):
+    server["state"]["fail"]["/track3.wav"] = 2
+    result = dl.download_track(f"{server['base']}/track3.wav", str(tmp_path / "audio"),
+                               str(tmp_path / "archive.txt"), retries=3, backoff=0.01, native=True)
+    assert result["ok"]
+    assert result["path"].read_bytes() == (server["root"] / "track3.wav").read_bytes()
+
+def test_gives_up_after_retries(server, tmp_path):
+    server["state"]["fail"]["/track1.wav"] = 10
+    result = dl.download_track(f"{server['base']}/track1.wav", str(tmp_path / "audio"),
+                               str(tmp_path / "archive.txt"), retries=1, backoff=0.01, native=True)
+    assert not result["ok"] and result["path"] is None
+    assert dl.load_archive(str(tmp_path / "archive.txt")) == set()
+
+def test_resumes_partial_download(server, tmp_path):
+    out = tmp_path / "audio"
+    out.mkdir()
+    source = (server["root"] / "track2.wav").read_bytes()
+    half = len(source) // 2
+    (out / "track2.wav.part").write_bytes(source[:half])
+
+    result = dl.download_track(f"{server['base']}/track2.wav", str(out),
+                               str(tmp_path / "archive.txt"), native=True)
+    assert result["ok"]
+    assert result["path"].read_bytes() == source
+    assert ("/track2.wav", f"bytes={half}-") in server["state"]["requests"]
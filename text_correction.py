@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+تصحيح لاحق لنصوص Whisper العربية: جدول تحويل للحروف ثم قاموس عبارات بمرور واحد (Aho–Corasick)
+
+يعمل على دفعات من المقاطع: تُجمع نصوص الدفعة في سلسلة واحدة وتُصحح بمرور واحد ثم تُقسم من جديد.
+
+مثال (تصحيح ملفات نصوص موجودة):
+    python text_correction.py ملخصات_الصوتيات/transcripts
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# حروف فارسية/أردية شائعة في مخرجات Whisper، ومحارف غير مرئية
+CHAR_TABLE = str.maketrans({
+    "\u06cc": "ي", "\u06a9": "ك", "\u06c1": "ه", "\u06c0": "ه",
+    "\u0640": None,                                     # التطويل
+    "\u200b": None, "\u200c": None, "\u200d": None, "\ufeff": None,
+})
+
+# علامات الترقيم اللاتينية تُعرّب فقط بجوار حرف عربي، فلا تتغير الأرقام (1,000) ولا النصوص اللاتينية
+_ARABIC_LETTER = "\u0621-\u064a\u0671-\u06d3"
+_LATIN_PUNCTUATION = re.compile(rf"(?<=[{_ARABIC_LETTER}])\s*[,?;]+|[,?;]+(?=\s*[{_ARABIC_LETTER}])")
+_PUNCTUATION_TABLE = str.maketrans({",": "،", "?": "؟", ";": "؛"})
+
+# أخطاء متكررة في النصوص المحولة (تُطابق ككلمات كاملة، والأطول يُفضّل)
+PHRASE_CORRECTIONS = {
+    "الحمد الهرب العالمين": "الحمد لله رب العالمين",
+    "الحمد لله الهرب العالمين": "الحمد لله رب العالمين",
+    "الحمد لله رمب العالمين": "الحمد لله رب العالمين",
+    "الحمد الله رب": "الحمد لله رب",
+    "الحمد لا رب": "الحمد لله رب",
+    "صلى الله عليه وسلمة": "صلى الله عليه وسلم",
+    "الله الله عليه وسلم": "صلى الله عليه وسلم",
+    "صبحانه وتعالى": "سبحانه وتعالى",
+    "صبحانه": "سبحانه",
+    "صبحان الله": "سبحان الله",
+    "وصبحان": "وسبحان",
+    "وصبحانه": "وسبحانه",
+    "ان شاء الله": "إن شاء الله",
+}
+
+# فاصل بين نصوص الدفعة: لا يظهر في النص ولا يطابقه أي نمط
+_SEPARATOR = "\x00"
+
+class PhraseAutomaton:
+    """آلة Aho–Corasick لاستبدال عدة عبارات في مرور واحد على النص"""
+
+    def __init__(self, replacements):
+        self.goto = [{}]
+        self.fail = [0]
+        # لكل حالة: الأنماط المنتهية فيها (الطول، البديل)، الأطول أولاً
+        self.outputs = [[]]
+        for pattern, replacement in replacements.items():
+            state = 0
+            for ch in pattern:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.outputs[state] = [(len(pattern), replacement)]
+
+        # روابط الفشل بترتيب العرض، وكل حالة ترث مخرجات حالة فشلها
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0) if state else 0
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def matches(self, text):
+        """كل المطابقات (البداية، النهاية، البديل) التي تقع على حدود الكلمات"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        found = []
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not outputs[state] or (i + 1 < len(text) and text[i + 1].isalnum()):
+                continue
+            for length, replacement in outputs[state]:
+                start = i + 1 - length
+                if start == 0 or not text[start - 1].isalnum():
+                    found.append((start, i + 1, replacement))
+                    break
+        return found
+
+    def replace(self, text):
+        """استبدال المطابقات: الأبكر أولاً ثم الأطول، دون تداخل"""
+        found = self.matches(text)
+        if not found:
+            return text
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        pieces = []
+        position = 0
+        for start, end, replacement in found:
+            if start < position:
+                continue
+            pieces.append(text[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+_AUTOMATON = PhraseAutomaton(PHRASE_CORRECTIONS)
+
+def correct_text(text):
+    """تصحيح نص واحد"""
+    text = _LATIN_PUNCTUATION.sub(lambda m: m.group().translate(_PUNCTUATION_TABLE), text.translate(CHAR_TABLE))
+    return _AUTOMATON.replace(text)
+
+def correct_texts(texts):
+    """تصحيح دفعة من النصوص بمرور واحد على سلسلة مجمعة"""
+    texts = list(texts)
+    if not texts:
+        return []
+    return correct_text(_SEPARATOR.join(texts)).split(_SEPARATOR)
+
+def correct_segments(segments):
+    """نسخ من مقاطع Whisper بنصوص مصححة"""
+    texts = correct_texts(segment["text"] for segment in segments)
+    return [{**segment, "text": text} for segment, text in zip(segments, texts)]
+
+def correct_result(result):
+    """نتيجة Whisper بنص ومقاطع مصححة (النص الكامل يُعاد بناؤه من المقاطع)"""
+    segments = correct_segments(result["segments"])
+    text = "".join(segment["text"] for segment in segments) if segments else correct_text(result["text"])
+    return {**result, "text": text, "segments": segments}
+
+def correct_file(path):
+    """تصحيح ملف نصي موجود في مكانه (True إذا تغير)"""
+    from transcript_cache import atomic_write_text
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    corrected = correct_texts(lines)
+    if corrected == lines:
+        return False
+    atomic_write_text(path, "\n".join(corrected))
+    return True
+
+if __name__ == "__main__":
+    # تصحيح النصوص الموجودة: python text_correction.py <مجلد النصوص> ...
+    for directory in sys.argv[1:] or ["ملخصات_الصوتيات/transcripts"]:
+        for path in sorted(Path(directory).glob("*_transcript*.txt")):
+            if correct_file(path):
+                print(f"✓ تم تصحيح: {path.name}")
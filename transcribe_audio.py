@@ -25,8 +25,8 @@ def install_requirements():
             print(f"جارٍ تثبيت {package}...")
             subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
-def download_audio(url, output_dir="audio_files"):
-    """تحميل المقطع الصوتي من SoundCloud"""
+def download_audio(url, output_dir="audio_files", native=False):
+    """تحميل المقطع الصوتي من SoundCloud (native: بالصيغة الأصلية دون إعادة ترميز إلى mp3)"""
     print(f"\nجارٍ تحميل المقطع من: {url}")
     
     # إنشاء مجلد للصوتيات
@@ -36,21 +36,28 @@ def download_audio(url, output_dir="audio_files"):
     
     try:
         # استخدام yt-dlp لتحميل المقطع
-        cmd = [
-            "yt-dlp",
-            "-x",  # استخراج الصوت فقط
-            "--audio-format", "mp3",
-            "--audio-quality", "0",  # أفضل جودة
-            "-o", output_path,
-            url
-        ]
+        if native:
+            # الصيغة الأصلية (opus/m4a) كما هي، ثم فك ترميز واحد إلى PCM
+            cmd = ["yt-dlp", "-f", "bestaudio/best", "-o", output_path, url]
+        else:
+            cmd = [
+                "yt-dlp",
+                "-x",  # استخراج الصوت فقط
+                "--audio-format", "mp3",
+                "--audio-quality", "0",  # أفضل جودة
+                "-o", output_path,
+                url
+            ]
         
         subprocess.run(cmd, check=True)
         
         # العثور على الملف المحمل
-        audio_files = list(Path(output_dir).glob("audio.*"))
+        audio_files = [f for f in Path(output_dir).glob("audio.*") if not f.name.endswith(".f32")]
         if audio_files:
             audio_file = str(audio_files[0])
+            if native:
+                import pcm_cache
+                pcm_cache.decode_to_pcm(audio_file)
             print(f"✓ تم التحميل بنجاح: {audio_file}")
             return audio_file
         else:
@@ -70,19 +77,27 @@ def transcribe_audio(audio_file, model="base", language="ar"):
     print(f"\nجارٍ تحويل الصوت إلى نص باستخدام نموذج {model}...")
     
     try:
-        import whisper
+        import model_registry
         
         # تحميل النموذج
-        print("جارٍ تحميل نموذج Whisper...")
-        model_obj = whisper.load_model(model)
+        model_obj = model_registry.get_model(model)
         
         # تحويل الصوت إلى نص
         print("جارٍ معالجة الملف الصوتي...")
-        result = model_obj.transcribe(
-            audio_file,
-            language=language,
-            task="transcribe"
-        )
+        # استخدام PCM المحفوظ إن وُجد بدلاً من فك الترميز مجدداً
+        import pcm_cache
+        import profiling
+        audio = pcm_cache.load_pcm(audio_file) if pcm_cache.has_pcm(audio_file) else audio_file
+        with profiling.section("transcribe", os.path.basename(audio_file)):
+            result = model_obj.transcribe(
+                audio,
+                language=language,
+                task="transcribe"
+            )
+        
+        # تصحيح الأخطاء الإملائية المتكررة في النص والمقاطع
+        import text_correction
+        result = text_correction.correct_result(result)
         
         # حفظ النص
         transcript_file = audio_file.replace(os.path.splitext(audio_file)[1], "_transcript.txt")
@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 """سكريبت بسيط لتحويل الصوت إلى نص"""
-import whisper
 import sys
 
-print("جارٍ تحميل نموذج Whisper (base)...")
+import model_registry
+
 print("هذا قد يستغرق دقيقة أو دقيقتين...")
-model = whisper.load_model("base")
+model = model_registry.get_model("base")
 
-print("\n✓ تم تحميل النموذج")
 print("جارٍ تحويل الصوت إلى نص...")
 print("(هذا قد يستغرق 10-15 دقيقة للمقطع الذي مدته 53 دقيقة)")
 
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+ذاكرة تخزين للنصوص المحولة مفهرسة بمحتوى الصوت، مع سجل SQLite واستئناف آمن بعد الانقطاع
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import contextlib
+from pathlib import Path
+
+import segment_store
+
+DEFAULT_CACHE_DIR = ".transcript_cache"
+
+def atomic_write_text(path, text):
+    """كتابة ملف نصي بشكل ذري: ملف مؤقت في نفس المجلد ثم إعادة تسمية"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+_schemas_applied = set()
+
+@contextlib.contextmanager
+def sqlite_connection(db_path, schema):
+    """اتصال SQLite لكتلة with واحدة: تثبيت المعاملة أو التراجع عنها ثم إغلاق الاتصال
+    (with على الاتصال وحده لا يغلقه)؛ المخطط و WAL يُطبَّقان مرة واحدة لكل عملية"""
+    key = (os.getpid(), str(db_path))
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if key not in _schemas_applied:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(schema)
+            _schemas_applied.add(key)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+MANIFEST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, audio_hash TEXT
+    );
+    CREATE TABLE IF NOT EXISTS jobs (
+        key TEXT PRIMARY KEY, audio_hash TEXT, model TEXT, language TEXT,
+        options TEXT, status TEXT, updated_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS chunks (
+        key TEXT, start REAL, end REAL, text TEXT, segments TEXT,
+        PRIMARY KEY (key, start)
+    );
+"""
+
+def _connect(cache_dir):
+    """اتصال بسجل SQLite (تُنشأ الجداول عند أول فتح في العملية)"""
+    return sqlite_connection(Path(cache_dir) / "manifest.sqlite3", MANIFEST_SCHEMA)
+
+def file_hash(audio_file, cache_dir=DEFAULT_CACHE_DIR):
+    """بصمة SHA-256 لمحتوى الملف (تُحفظ مع الحجم ووقت التعديل لتجنب إعادة القراءة)"""
+    audio_file = Path(audio_file)
+    stat = audio_file.stat()
+    path = str(audio_file.resolve())
+    with _connect(cache_dir) as conn:
+        row = conn.execute(
+            "SELECT audio_hash FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns)
+        ).fetchone()
+    if row:
+        return row[0]
+
+    digest = hashlib.sha256()
+    with open(audio_file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    audio_hash = digest.hexdigest()
+
+    with _connect(cache_dir) as conn:
+        conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                     (path, stat.st_size, stat.st_mtime_ns, audio_hash))
+    return audio_hash
+
+def job_key(audio_file, model, language, options, cache_dir=DEFAULT_CACHE_DIR):
+    """مفتاح المهمة: بصمة الصوت + النموذج + اللغة + خيارات فك الترميز"""
+    payload = json.dumps({
+        "audio": file_hash(audio_file, cache_dir),
+        "model": model,
+        "language": language,
+        "options": options,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def job_status(key, cache_dir=DEFAULT_CACHE_DIR):
+    """حالة المهمة في السجل: None أو running أو done"""
+    with _connect(cache_dir) as conn:
+        row = conn.execute("SELECT status FROM jobs WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def mark_running(key, audio_file, model, language, options, cache_dir=DEFAULT_CACHE_DIR):
+    """تسجيل بدء المهمة (تبقى running إذا انقطعت العملية)"""
+    audio_hash = file_hash(audio_file, cache_dir)
+    with _connect(cache_dir) as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO jobs VALUES (?, ?, ?, ?, ?, 'running', ?)",
+            (key, audio_hash, model, language,
+             json.dumps(options, sort_keys=True), time.time())
+        )
+
+def _result_path(key, cache_dir):
+    return Path(cache_dir) / "results" / f"{key}.json"
+
+def store_result(key, result, cache_dir=DEFAULT_CACHE_DIR):
+    """حفظ النتيجة (النص والمقاطع) في الذاكرة وتعليم المهمة كمكتملة"""
+    segments = [segment_store.compact_segment(s) for s in result["segments"]]
+    atomic_write_text(_result_path(key, cache_dir),
+                      json.dumps({"text": result["text"], "segments": segments}, ensure_ascii=False))
+    with _connect(cache_dir) as conn:
+        conn.execute("UPDATE jobs SET status = 'done', updated_at = ? WHERE key = ?", (time.time(), key))
+        conn.execute("DELETE FROM chunks WHERE key = ?", (key,))
+
+def load_result(key, cache_dir=DEFAULT_CACHE_DIR):
+    """قراءة نتيجة مخزنة سابقاً أو None"""
+    path = _result_path(key, cache_dir)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_chunk(key, start, end, text, segments, cache_dir=DEFAULT_CACHE_DIR):
+    """تسجيل دفعة مكتملة من التحويل التدفقي للاستئناف منها لاحقاً"""
+    segments = [segment_store.compact_segment(s) for s in segments]
+    with _connect(cache_dir) as conn:
+        conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                     (key, start, end, text, json.dumps(segments, ensure_ascii=False)))
+
+def load_chunks(key, cache_dir=DEFAULT_CACHE_DIR):
+    """الدفعات المكتملة لمهمة منقطعة مرتبة زمنياً"""
+    with _connect(cache_dir) as conn:
+        rows = conn.execute(
+            "SELECT start, end, text, segments FROM chunks WHERE key = ? ORDER BY start", (key,)
+        ).fetchall()
+    return [
+        {"start": start, "end": end, "text": text, "segments": json.loads(segments)}
+        for start, end, text, segments in rows
+    ]
+
+def chunks_to_result(chunks):
+    """دمج الدفعات في نتيجة واحدة بصيغة Whisper"""
+    return {
+        "text": "".join(chunk["text"] for chunk in chunks),
+        "segments": [segment for chunk in chunks for segment in chunk["segments"]],
+    }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+واجهات تحويل قابلة للاستبدال: openai-whisper (PyTorch) أو faster-whisper (CTranslate2، int8)
+
+كل واجهة تُرجع كائناً له transcribe(audio, language=..., ...) يعيد نتيجة بصيغة Whisper
+({"text", "segments"})، فتبقى كل المخرجات (المخزن، النصوص، التوقيتات) كما هي.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+import profiling
+
+BACKENDS = ("whisper", "faster-whisper")
+DEFAULT_BACKEND = os.environ.get("TRANSCRIBE_BACKEND", "whisper")
+
+SAMPLE_RATE = 16000
+CLIP_SECONDS = 30            # أقصى طول لمقطع يُرسل للنموذج
+DEFAULT_BATCH_SIZE = 8       # عدد المقاطع في استدعاء استدلال واحد
+DEFAULT_BATCH_SECONDS = 1800 # أقصى مدة صوت مجمّع من عدة ملفات في مجموعة واحدة
+
+# نماذج faster-whisper المحملة: (name, compute_type, cpu_threads) -> FasterWhisperModel
+_faster_models = {}
+# خيوط CTranslate2 لهذه العملية (0 = كل الأنوية)؛ عمال المجموعة يضبطونها بحصتهم عند التهيئة
+_cpu_threads = 0
+
+def set_cpu_threads(cpu_threads):
+    """عدد الخيوط الافتراضي لكل نموذج faster-whisper يُحمّل في هذه العملية"""
+    global _cpu_threads
+    _cpu_threads = cpu_threads
+
+def _load_samples(audio):
+    """عينات 16 kHz أحادية من مسار (مع استخدام PCM المحفوظ إن وُجد) أو مصفوفة جاهزة"""
+    if isinstance(audio, (str, Path)):
+        import pcm_cache
+        if pcm_cache.has_pcm(audio):
+            return np.asarray(pcm_cache.load_pcm(audio))
+        from faster_whisper import decode_audio
+        return decode_audio(str(audio), sampling_rate=SAMPLE_RATE)
+    return np.asarray(audio, dtype=np.float32)
+
+def _speech_clips(samples, offset):
+    """مقاطع كلام من VAD مدمجة في مقاطع لا تتجاوز CLIP_SECONDS (بالثواني من بداية المجموعة)"""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    speech = get_speech_timestamps(samples, VadOptions(max_speech_duration_s=CLIP_SECONDS,
+                                                       min_silence_duration_ms=160))
+    clips = []
+    for span in speech:
+        start, end = span["start"] / SAMPLE_RATE, span["end"] / SAMPLE_RATE
+        if clips and end - clips[-1][0] <= CLIP_SECONDS:
+            clips[-1][1] = end
+        else:
+            clips.append([start, end])
+    return [{"start": offset + start, "end": offset + end} for start, end in clips]
+
+def _to_whisper_segment(segment, segment_id, offset):
+    """مقطع faster-whisper بصيغة openai-whisper مع توقيت نسبي لملفه"""
+    return {
+        "id": segment_id,
+        "seek": segment.seek,
+        "start": float(segment.start - offset),
+        "end": float(segment.end - offset),
+        "text": segment.text,
+        "tokens": list(segment.tokens),
+        "temperature": segment.temperature,
+        "avg_logprob": segment.avg_logprob,
+        "compression_ratio": segment.compression_ratio,
+        "no_speech_prob": segment.no_speech_prob,
+    }
+
+class FasterWhisperModel:
+    """نموذج faster-whisper مكمّم مع BatchedInferencePipeline وواجهة مطابقة لـ whisper"""
+
+    def __init__(self, name="base", compute_type="int8", cpu_threads=0, batch_size=DEFAULT_BATCH_SIZE):
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
+        self.model = WhisperModel(name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+        self.pipeline = BatchedInferencePipeline(self.model)
+        self.batch_size = batch_size
+
+    def transcribe(self, audio, language="ar", task="transcribe", verbose=None, initial_prompt=None, **kwargs):
+        """تحويل ملف أو مصفوفة عينات واحدة"""
+        return self.transcribe_many([audio], language=language, task=task, initial_prompt=initial_prompt)[0]
+
+    def transcribe_many(self, audios, language="ar", task="transcribe", initial_prompt=None):
+        """تحويل عدة ملفات في استدعاء مجمّع واحد: مقاطع كل الملفات تُملأ بها نفس الدفعات"""
+        samples = [_load_samples(audio) for audio in audios]
+        offsets = np.cumsum([0] + [len(s) / SAMPLE_RATE for s in samples])
+        clips = [clip for s, offset in zip(samples, offsets) for clip in _speech_clips(s, offset)]
+        results = [{"text": "", "segments": [], "language": language} for _ in samples]
+        if not clips:
+            return results
+
+        segments, _ = self.pipeline.transcribe(
+            np.concatenate(samples),
+            language=language,
+            task=task,
+            initial_prompt=initial_prompt,
+            clip_timestamps=clips,
+            without_timestamps=False,
+            batch_size=self.batch_size,
+        )
+        for segment in segments:
+            # المقاطع لا تعبر حدود الملفات، فيكفي موضع البداية (مع هامش تقريب عينة) لمعرفة الملف
+            index = int(np.searchsorted(offsets, segment.start + 1e-3, side="right")) - 1
+            result = results[index]
+            result["segments"].append(_to_whisper_segment(segment, len(result["segments"]), offsets[index]))
+        for result in results:
+            result["text"] = "".join(s["text"] for s in result["segments"])
+        return results
+
+def get_faster_model(name="base", compute_type=None, cpu_threads=None):
+    """نموذج faster-whisper من الذاكرة أو تحميله مرة واحدة (cpu_threads افتراضياً حصة العملية)"""
+    cpu_threads = _cpu_threads if cpu_threads is None else cpu_threads
+    compute_type = compute_type or os.environ.get("FASTER_WHISPER_COMPUTE", "int8")
+    key = (name, compute_type, cpu_threads)
+    if key not in _faster_models:
+        print(f"🔄 جارٍ تحميل نموذج faster-whisper ({name}, {compute_type})...")
+        with profiling.section("model_load", f"faster-{name}"):
+            _faster_models[key] = FasterWhisperModel(name, compute_type, cpu_threads)
+        print("✓ تم تحميل النموذج")
+    return _faster_models[key]
+
+def get_backend(backend=DEFAULT_BACKEND, model="base", cpu_threads=None):
+    """نموذج جاهز للتحويل حسب الواجهة المختارة"""
+    if backend == "whisper":
+        import model_registry
+        return model_registry.get_model(model)
+    if backend == "faster-whisper":
+        return get_faster_model(model, cpu_threads=cpu_threads)
+    raise ValueError(f"واجهة غير معروفة: {backend} (المتاح: {', '.join(BACKENDS)})")
+
+def batch_groups(audio_files, batch_seconds=DEFAULT_BATCH_SECONDS):
+    """تقسيم الملفات إلى مجموعات لا تتجاوز مدتها batch_seconds تقريباً (حسب حجم PCM أو الملف)"""
+    import pcm_cache
+    groups, current, current_seconds = [], [], 0.0
+    for audio_file in audio_files:
+        if pcm_cache.has_pcm(audio_file):
+            seconds = pcm_cache.pcm_path(audio_file).stat().st_size / (4 * SAMPLE_RATE)
+        else:
+            # تقدير تقريبي: 128 kbps
+            seconds = Path(audio_file).stat().st_size / 16000
+        if current and current_seconds + seconds > batch_seconds:
+            groups.append(current)
+            current, current_seconds = [], 0.0
+        current.append(audio_file)
+        current_seconds += seconds
+    if current:
+        groups.append(current)
+    return groups
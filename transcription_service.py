@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""
+خدمة تحويل دائمة: النماذج تبقى محمّلة في عمليات العمال، والمهام تصل عبر HTTP محلي وتُرتب في جدول
+SQLite بالأولوية، وتقدم كل مهمة (المراحل ثم المقاطع) يُبث بـ Server-Sent Events
+
+المهمة مفتاحها نفس مفتاح ذاكرة النصوص (بصمة الصوت + النموذج + الخيارات)، فطلبان متزامنان لنفس
+الصوت يعودان بنفس المهمة، وصوت محوّل سابقاً يُسترجع دون إعادة التحويل.
+إذا انهار عامل (نفاد الذاكرة مثلاً) تُعاد مجموعة العمال وتعود مهامه الجارية إلى الطابور.
+
+الواجهة:
+    POST   /jobs               {"path": ..., "priority": 0, "summarize": false, "model": "base", ...}
+    POST   /jobs?name=x.mp3    جسم الطلب هو الملف الصوتي نفسه (رفع)
+    GET    /jobs               آخر المهام
+    GET    /jobs/<id>          حالة مهمة
+    GET    /jobs/<id>/events   بث SSE: state ثم stage و segment ثم done أو failed
+    DELETE /jobs/<id>          إلغاء مهمة لم تبدأ
+
+أمثلة:
+    python transcription_service.py serve --workers 2
+    python transcription_service.py submit audio_files/lecture.mp3 --priority 5 --summarize --follow
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import hashlib
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs, quote
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import audio_scanner
+import profiling
+import transcript_cache
+import transcription_backends
+
+DEFAULT_DB = os.path.join(transcript_cache.DEFAULT_CACHE_DIR, "service.sqlite3")
+DEFAULT_PORT = int(os.environ.get("TRANSCRIBE_SERVICE_PORT", "8765"))
+DEFAULT_AUDIO_DIR = "audio_files"
+DEFAULT_TRANSCRIPTS_DIR = "ملخصات_الصوتيات/transcripts"
+DEFAULT_SUMMARIES_DIR = "ملخصات_الصوتيات/summaries"
+DEFAULT_OPTIONS = {"model": "base", "language": "ar", "backend": transcription_backends.DEFAULT_BACKEND,
+                   "stream": True, "vad": False, "cascade": None, "summarize": False}
+OPTION_TYPES = {"model": str, "language": str, "backend": str, "stream": bool, "vad": bool,
+                "cascade": (str, type(None)), "summarize": bool}
+POLL_SECONDS = 5.0        # المهام المضافة مباشرة إلى الجدول (دون HTTP) تُلتقط خلال هذه المدة
+KEEPALIVE_SECONDS = 15.0
+UPLOAD_BLOCK = 1 << 20
+FINAL_STATES = ("done", "failed", "cancelled")
+MAX_WORKER_CRASHES = 3   # مهمة انهار عاملها هذا العدد من المرات تُعد فاشلة بدل إعادتها
+
+# ----------------------------------------------------------------------
+# جدول المهام
+
+JOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, audio_path TEXT, options TEXT,
+        priority INTEGER, state TEXT, created_at REAL, started_at REAL, finished_at REAL,
+        error TEXT, result TEXT
+    );
+    -- مهمة نشطة واحدة لكل مفتاح: هذا ما يمنع تكرار الطلبات المتزامنة
+    CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_key ON jobs(key)
+        WHERE state IN ('queued', 'running');
+    CREATE INDEX IF NOT EXISTS jobs_queue ON jobs(state, priority DESC, id);
+"""
+
+@contextlib.contextmanager
+def _connect(db_path):
+    """اتصال بجدول المهام يُغلق بانتهاء with (يُنشأ الجدول عند أول فتح في العملية، كما في transcript_cache)"""
+    with transcript_cache.sqlite_connection(db_path, JOBS_SCHEMA) as conn:
+        conn.row_factory = sqlite3.Row
+        yield conn
+
+def _job_dict(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["options"] = json.loads(job["options"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def job_options(options=None):
+    """خيارات المهمة بعد إكمالها بالقيم الافتراضية (المفاتيح غير المعروفة ترفض)"""
+    unknown = set(options or {}) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"خيارات غير معروفة: {', '.join(sorted(unknown))}")
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    for name, expected in OPTION_TYPES.items():
+        # {"model": null} مثلاً يُرفض هنا بدل أن يفشل داخل العامل
+        if not isinstance(options[name], expected) or options[name] == "":
+            raise ValueError(f"قيمة غير صالحة للخيار {name}: {json.dumps(options[name], ensure_ascii=False)}")
+    if options["backend"] not in transcription_backends.BACKENDS:
+        raise ValueError(f"واجهة غير معروفة: {options['backend']}")
+    if options["stream"]:
+        # نفس تطبيع process_audio_improved: المسار التدفقي له بوابة صمت ولا يدعم التدرج
+        options["vad"], options["cascade"] = False, None
+    return options
+
+def job_priority(value):
+    """أولوية المهمة من الطلب: عدد صحيح (أو نص عدد صحيح من سطر الاستعلام)"""
+    try:
+        if isinstance(value, (bool, float)):
+            raise TypeError
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"أولوية غير صالحة: {json.dumps(value, ensure_ascii=False)}") from None
+
+def submit_job(audio_file, options=None, priority=0, db_path=DEFAULT_DB):
+    """إضافة مهمة أو إرجاع المهمة النشطة لنفس الصوت والخيارات: (المهمة، جديدة؟)"""
+    import process_audio_improved
+    audio_file = Path(audio_file).resolve()
+    if not audio_file.is_file():
+        raise FileNotFoundError(f"الملف غير موجود: {audio_file}")
+    options = job_options(options)
+    key = transcript_cache.job_key(
+        audio_file, options["model"], options["language"],
+        process_audio_improved._decode_options(options["stream"], options["backend"], options["vad"],
+                                               options["cascade"]))
+    with _connect(db_path) as conn:
+        while True:
+            try:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (key, audio_path, options, priority, state, created_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (key, str(audio_file), json.dumps(options), priority, time.time()))
+                return get_job(cursor.lastrowid, conn=conn), True
+            except sqlite3.IntegrityError:
+                row = conn.execute("SELECT * FROM jobs WHERE key = ? AND state IN ('queued', 'running')",
+                                   (key,)).fetchone()
+            if row is None:
+                # المهمة النشطة انتهت بين المحاولتين
+                continue
+            # الطلب المكرر يرفع الأولوية ويضيف التلخيص إن طلبه، دون مهمة ثانية
+            merged = json.loads(row["options"])
+            merged["summarize"] = merged["summarize"] or options["summarize"]
+            conn.execute("UPDATE jobs SET priority = MAX(priority, ?), options = ? WHERE id = ?",
+                         (priority, json.dumps(merged), row["id"]))
+            return get_job(row["id"], conn=conn), False
+
+def get_job(job_id, db_path=DEFAULT_DB, conn=None):
+    if conn is None:
+        with _connect(db_path) as conn:
+            return get_job(job_id, conn=conn)
+    return _job_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+def list_jobs(limit=100, db_path=DEFAULT_DB):
+    with _connect(db_path) as conn:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    return [_job_dict(row) for row in rows]
+
+def cancel_job(job_id, db_path=DEFAULT_DB):
+    """إلغاء مهمة في الطابور (المهمة الجارية لا تُقطع)"""
+    with _connect(db_path) as conn:
+        cursor = conn.execute("UPDATE jobs SET state = 'cancelled', finished_at = ? "
+                              "WHERE id = ? AND state = 'queued'", (time.time(), job_id))
+    return cursor.rowcount == 1
+
+def queue_counts(db_path=DEFAULT_DB):
+    """عدد المهام في كل حالة"""
+    with _connect(db_path) as conn:
+        return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+def claim_next_job(db_path=DEFAULT_DB):
+    """أعلى مهمة أولوية في الطابور (الأقدم عند التساوي) بعد تعليمها جارية"""
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "UPDATE jobs SET state = 'running', started_at = ? WHERE id = ("
+            "  SELECT id FROM jobs WHERE state = 'queued' ORDER BY priority DESC, id LIMIT 1"
+            ") RETURNING *", (time.time(),)).fetchone()
+    return _job_dict(row)
+
+def finish_job(job_id, result=None, error=None, db_path=DEFAULT_DB):
+    with _connect(db_path) as conn:
+        conn.execute("UPDATE jobs SET state = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                     ("failed" if error else "done", time.time(),
+                      json.dumps(result, ensure_ascii=False) if result else None, error, job_id))
+
+def requeue_job(job_id, db_path=DEFAULT_DB):
+    """إعادة مهمة جارية إلى الطابور (انهار عاملها قبل أن تكتمل)"""
+    with _connect(db_path) as conn:
+        return conn.execute("UPDATE jobs SET state = 'queued', started_at = NULL "
+                            "WHERE id = ? AND state = 'running'", (job_id,)).rowcount == 1
+
+def requeue_interrupted(db_path=DEFAULT_DB):
+    """مهام بقيت جارية من تشغيل سابق تعود للطابور (التدفقية منها تستأنف من آخر دفعة)"""
+    with _connect(db_path) as conn:
+        return conn.execute("UPDATE jobs SET state = 'queued', started_at = NULL "
+                            "WHERE state = 'running'").rowcount
+
+# ----------------------------------------------------------------------
+# عمليات العمال
+
+_events = None  # طابور الأحداث إلى العملية الرئيسية (لكل عامل)
+
+class _StageEvents:
+    """بديل ProgressTracker داخل العامل: كل مرحلة تُرسل حدثاً"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def stage(self, name):
+        _events.put((self.job_id, "stage", {"stage": name}))
+        return profiling.section(name, f"job {self.job_id}")
+
+def _init_worker(model, torch_threads, backend, events):
+    global _events
+    import process_audio_improved
+    _events = events
+    process_audio_improved._init_worker(model, torch_threads, backend)
+
+def _run_job(job, transcripts_dir, summaries_dir):
+    """تنفيذ مهمة في عملية عامل؛ يعيد مسارات المخرجات أو يرفع استثناءً"""
+    import process_audio_improved
+    import create_smart_summaries
+    job_id, options = job["id"], job["options"]
+    audio_file = Path(job["audio_path"])
+    tracker = _StageEvents(job_id)
+
+    def on_segment(start, end, text):
+        _events.put((job_id, "segment", {"start": start, "end": end, "text": text}))
+
+    ok = process_audio_improved.transcribe_single_file(
+        audio_file, options["model"], options["language"], transcripts_dir, options["stream"],
+        backend=options["backend"], tracker=tracker, vad=options["vad"], cascade=options["cascade"],
+        on_segment=on_segment)
+    if not ok:
+        raise RuntimeError(f"فشل تحويل {audio_file.name}")
+
+    transcript_file, timestamps_file = process_audio_improved._output_paths(audio_file, transcripts_dir)
+    result = {"transcript": str(transcript_file), "timestamps": str(timestamps_file)}
+    if options["summarize"]:
+        with tracker.stage("summarize"):
+            Path(summaries_dir).mkdir(parents=True, exist_ok=True)
+            create_smart_summaries.summarize_transcript(transcript_file, summaries_dir)
+        result["summary"] = str(create_smart_summaries.summary_files(transcript_file, summaries_dir)[0])
+    return result
+
+# ----------------------------------------------------------------------
+# الخدمة
+
+class _EventHub:
+    """توزيع أحداث المهام على مشتركي SSE، مع سجل المهمة الجارية لمن يشترك متأخراً"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history = {}      # job_id -> [(event, data)]
+        self._subscribers = {}  # job_id -> [queue.Queue]
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            if event in FINAL_STATES:
+                self._history.pop(job_id, None)
+            else:
+                self._history.setdefault(job_id, []).append((event, data))
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for subscriber in subscribers:
+            subscriber.put((event, data))
+
+    def subscribe(self, job_id):
+        subscriber = queue.Queue()
+        with self._lock:
+            for item in self._history.get(job_id, ()):
+                subscriber.put(item)
+            self._subscribers.setdefault(job_id, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+class TranscriptionService:
+    """مجموعة عمال بعدد ثابت يسحب من جدول المهام، وخادم HTTP محلي"""
+
+    def __init__(self, workers=1, model="base", backend=transcription_backends.DEFAULT_BACKEND,
+                 db_path=DEFAULT_DB, audio_dir=DEFAULT_AUDIO_DIR, transcripts_dir=DEFAULT_TRANSCRIPTS_DIR,
+                 summaries_dir=DEFAULT_SUMMARIES_DIR):
+        self.workers = workers
+        self.db_path = db_path
+        self.audio_dir = Path(audio_dir)
+        self.transcripts_dir = transcripts_dir
+        self.summaries_dir = summaries_dir
+        self.hub = _EventHub()
+        self._wake = threading.Event()
+        self._slots = threading.Semaphore(workers)
+        self._stopping = False
+        self._server = None
+        self._crashes = {}  # المهمة -> عدد مرات انهيار عاملها
+        self._pool_lock = threading.Lock()
+
+        # عمليات جديدة (spawn) لا fork: العملية الرئيسية فيها خيوط HTTP وخيوط توزيع
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        # طابور عبر مدير: put في العامل يكتمل قبل عودة المهمة، فتسبق المقاطعُ حدثَ الانتهاء
+        self._events = self._manager.Queue()
+        self._context = context
+        self._initargs = (model, max(1, (os.cpu_count() or 1) // workers), backend, self._events)
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                   initializer=_init_worker, initargs=self._initargs)
+
+    def _replace_pool(self, broken):
+        """مجموعة عمال جديدة بدل المنهارة (مرة واحدة مهما تعددت المهام التي انقطعت معها)"""
+        with self._pool_lock:
+            if self._pool is broken and not self._stopping:
+                print("⚠ انهار أحد العمال - إعادة تشغيل مجموعة العمال")
+                self._pool = self._new_pool()
+                broken.shutdown(wait=False)
+
+    def start(self):
+        requeued = requeue_interrupted(self.db_path)
+        if requeued:
+            print(f"↩️  إعادة {requeued} مهمة انقطعت إلى الطابور")
+        threading.Thread(target=self._dispatch, daemon=True).start()
+        threading.Thread(target=self._relay, daemon=True).start()
+
+    def submit(self, audio_file, options=None, priority=0):
+        job, created = submit_job(audio_file, options, priority, self.db_path)
+        if created:
+            self.hub.publish(job["id"], "state", {"state": "queued"})
+            self._wake.set()
+        return job, created
+
+    def _dispatch(self):
+        """سحب المهام بالأولوية كلما فرغ عامل"""
+        while not self._stopping:
+            self._slots.acquire()
+            job = claim_next_job(self.db_path)
+            if job is None:
+                self._slots.release()
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                continue
+            print(f"▶️  المهمة {job['id']}: {Path(job['audio_path']).name} (أولوية {job['priority']})")
+            self._events.put((job["id"], "state", {"state": "running"}))
+            pool = self._pool
+            try:
+                future = pool.submit(_run_job, job, self.transcripts_dir, self.summaries_dir)
+            except BrokenProcessPool:
+                # انهار عامل بعد آخر مهمة أُرسلت: المهمة تعود للطابور وتُسحب من المجموعة الجديدة
+                self._requeue(job["id"])
+                self._replace_pool(pool)
+                self._slots.release()
+                continue
+            future.add_done_callback(
+                lambda future, job_id=job["id"], pool=pool: self._finished(job_id, future, pool))
+
+    def _requeue(self, job_id):
+        requeue_job(job_id, self.db_path)
+        if not self._stopping:
+            self._events.put((job_id, "state", {"state": "queued"}))
+
+    def _finished(self, job_id, future, pool):
+        try:
+            result, error = future.result(), None
+        except BrokenProcessPool:
+            # انهار عامل (نفاد الذاكرة، قتل العملية...): كل مهام المجموعة تنقطع معه، فتعود للطابور
+            self._replace_pool(pool)
+            self._crashes[job_id] = self._crashes.get(job_id, 0) + 1
+            if self._stopping or self._crashes[job_id] < MAX_WORKER_CRASHES:
+                self._requeue(job_id)
+                self._slots.release()
+                self._wake.set()
+                return
+            result, error = None, f"انهار العامل {self._crashes[job_id]} مرات أثناء هذه المهمة"
+        except Exception as e:
+            result, error = None, str(e) or type(e).__name__
+        self._crashes.pop(job_id, None)
+        finish_job(job_id, result, error, self.db_path)
+        print(f"{'✗' if error else '✓'} المهمة {job_id}" + (f": {error}" if error else ""))
+        self._events.put((job_id, "failed" if error else "done", get_job(job_id, self.db_path)))
+        self._slots.release()
+
+    def _relay(self):
+        """نقل أحداث العمال إلى المشتركين بالترتيب الذي وصلت به"""
+        while True:
+            try:
+                job_id, event, data = self._events.get()
+            except (EOFError, OSError):
+                return
+            self.hub.publish(job_id, event, data)
+
+    def save_upload(self, name, stream, length):
+        """حفظ ملف مرفوع في مجلد الصوتيات (اسم جديد إذا كان الاسم موجوداً بمحتوى مختلف)"""
+        name = Path(name or "").name
+        if Path(name).suffix.lower() not in audio_scanner.DEFAULT_PREFERENCE:
+            raise ValueError(f"صيغة غير مدعومة: {name or '(بلا اسم)'}")
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.audio_dir, prefix=f".{name}.", suffix=".upload")
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while length > 0:
+                    block = stream.read(min(UPLOAD_BLOCK, length))
+                    if not block:
+                        raise ValueError("انقطع الرفع قبل اكتمال الملف")
+                    f.write(block)
+                    digest.update(block)
+                    length -= len(block)
+            target = self.audio_dir / name
+            counter = 1
+            while target.exists():
+                if transcript_cache.file_hash(target) == digest.hexdigest():
+                    # نفس المحتوى: الملف الموجود يكفي
+                    os.unlink(tmp_path)
+                    return target
+                target = self.audio_dir / f"{Path(name).stem} ({counter}){Path(name).suffix}"
+                counter += 1
+            os.replace(tmp_path, target)
+            return target
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def serve(self, port=DEFAULT_PORT, host="127.0.0.1"):
+        """خادم HTTP المحلي (يعمل حتى Ctrl+C)"""
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        print(f"🛰️  خدمة التحويل على http://{host}:{self._server.server_port} ({self.workers} عامل)")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._stopping:
+            return
+        self._stopping = True
+        self._wake.set()
+        if self._server:
+            # يعود فوراً إن كانت serve_forever قد توقفت، ويوقفها إن كانت تعمل في خيط آخر
+            self._server.shutdown()
+            self._server.server_close()
+        # المهام الجارية تبقى running في الجدول وتعود للطابور عند التشغيل التالي
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+def _handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _job_id(self, parts):
+            try:
+                return int(parts[1])
+            except ValueError:
+                return None
+
+        def do_GET(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            if parts == ["jobs"]:
+                self._send_json(200, list_jobs(db_path=service.db_path))
+                return
+            job_id = self._job_id(parts) if parts[0] == "jobs" and len(parts) in (2, 3) else None
+            job = get_job(job_id, service.db_path) if job_id is not None else None
+            if job is None:
+                self._send_json(404, {"error": "not found"})
+            elif len(parts) == 2:
+                self._send_json(200, job)
+            elif parts[2] == "events":
+                self._stream_events(job)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def _discard_body(self, length):
+            while length > 0:
+                block = self.rfile.read(min(UPLOAD_BLOCK, length))
+                if not block:
+                    break
+                length -= len(block)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path.rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "not found"})
+                return
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(request, dict):
+                        raise ValueError("جسم الطلب يجب أن يكون كائن JSON")
+                    audio_file = request.pop("path")
+                    priority = job_priority(request.pop("priority", 0))
+                    job_options(request)
+                else:
+                    name = query.pop("name", None)
+                    try:
+                        priority = job_priority(query.pop("priority", 0))
+                        request = {k: json.loads(v) if k in ("stream", "vad", "summarize") else v
+                                   for k, v in query.items()}
+                        # التحقق قبل الحفظ: ملف يبقى في مجلد الصوتيات بعد رفض الطلب يلتقطه المراقب
+                        job_options(request)
+                    except (ValueError, TypeError):
+                        # الملف لم يُقرأ بعد: يُستهلك حتى يصل الرد إلى عميل ما زال يرسله
+                        self._discard_body(length)
+                        raise
+                    audio_file = service.save_upload(name, self.rfile, length)
+                job, created = service.submit(audio_file, request, priority)
+            except KeyError:
+                self._send_json(400, {"error": "path مطلوب"})
+            except (ValueError, TypeError, FileNotFoundError) as e:
+                self._send_json(400, {"error": str(e)})
+            else:
+                self._send_json(201 if created else 200, {**job, "duplicate": not created})
+
+        def do_DELETE(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            job_id = self._job_id(parts) if parts[0] == "jobs" and len(parts) == 2 else None
+            if job_id is None or get_job(job_id, service.db_path) is None:
+                self._send_json(404, {"error": "not found"})
+            elif cancel_job(job_id, service.db_path):
+                service.hub.publish(job_id, "cancelled", {"state": "cancelled"})
+                self._send_json(200, get_job(job_id, service.db_path))
+            else:
+                self._send_json(409, {"error": "المهمة بدأت أو انتهت"})
+
+        def _write_event(self, event, data):
+            body = json.dumps(data, ensure_ascii=False)
+            self.wfile.write(f"event: {event}\ndata: {body}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def _stream_events(self, job):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            subscriber = service.hub.subscribe(job["id"])
+            try:
+                # الحالة تُقرأ بعد الاشتراك حتى لا يضيع انتهاء يقع بينهما
+                job = get_job(job["id"], service.db_path)
+                self._write_event("state", {"state": job["state"]})
+                if job["state"] in FINAL_STATES:
+                    self._write_event(job["state"], job)
+                    return
+                while True:
+                    try:
+                        event, data = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                        continue
+                    self._write_event(event, data)
+                    if event in FINAL_STATES:
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                service.hub.unsubscribe(job["id"], subscriber)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+# ----------------------------------------------------------------------
+# العميل
+
+def follow_events(url):
+    """طباعة أحداث مهمة حتى انتهائها"""
+    event = None
+    with urllib.request.urlopen(url) as response:
+        for line in response:
+            line = line.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "segment":
+                    print(f"[{data['start']:7.1f} - {data['end']:7.1f}] {data['text'].strip()}")
+                elif event == "stage":
+                    print(f"⏳ {data['stage']}")
+                elif event in FINAL_STATES:
+                    print(f"{'✓' if event == 'done' else '✗'} {event}: "
+                          f"{json.dumps(data.get('result') or data.get('error'), ensure_ascii=False)}")
+                    return event == "done"
+    return False
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="خدمة تحويل دائمة بطابور مهام و HTTP محلي")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="تشغيل الخدمة")
+    serve.add_argument("--workers", type=int, default=1)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--model", default="base", help="النموذج المحمّل مسبقاً في كل عامل")
+    serve.add_argument("--backend", choices=transcription_backends.BACKENDS,
+                       default=transcription_backends.DEFAULT_BACKEND)
+    serve.add_argument("--db", default=DEFAULT_DB)
+
+    status = commands.add_parser("status", help="أعداد المهام في الطابور من الجدول مباشرة")
+    status.add_argument("--db", default=DEFAULT_DB)
+
+    submit = commands.add_parser("submit", help="إرسال ملف إلى خدمة تعمل")
+    submit.add_argument("audio_file")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--model", default="base")
+    submit.add_argument("--summarize", action="store_true")
+    submit.add_argument("--no-stream", action="store_true", help="تحويل الملف كاملاً (المقاطع تظهر في النهاية)")
+    submit.add_argument("--upload", action="store_true", help="رفع الملف بدلاً من إرسال مساره")
+    submit.add_argument("--follow", action="store_true", help="متابعة التقدم حتى الانتهاء")
+    submit.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        service = TranscriptionService(args.workers, args.model, args.backend, args.db)
+        service.start()
+        service.serve(args.port)
+        return 0
+
+    if args.command == "status":
+        counts = queue_counts(args.db)
+        print("=== طابور خدمة التحويل ===\n")
+        print(f"في الانتظار: {counts.get('queued', 0)}، جارية: {counts.get('running', 0)}، "
+              f"منجزة: {counts.get('done', 0)}، فاشلة: {counts.get('failed', 0)}")
+        for job in list_jobs(20, args.db):
+            if job["state"] == "running":
+                print(f"  ⏳ {Path(job['audio_path']).name} (منذ {time.time() - job['started_at']:.0f} ث)")
+        return 0
+
+    base = f"http://127.0.0.1:{args.port}"
+    options = {"model": args.model, "summarize": args.summarize, "stream": not args.no_stream}
+    if args.upload:
+        query = "&".join(f"{k}={json.dumps(v) if isinstance(v, bool) else v}" for k, v in options.items())
+        name = quote(Path(args.audio_file).name)
+        request = urllib.request.Request(f"{base}/jobs?name={name}&priority={args.priority}&{query}",
+                                         data=Path(args.audio_file).read_bytes(),
+                                         headers={"Content-Type": "application/octet-stream"})
+    else:
+        body = {"path": str(Path(args.audio_file).resolve()), "priority": args.priority, **options}
+        request = urllib.request.Request(f"{base}/jobs", data=json.dumps(body).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        job = json.load(response)
+    print(f"{'♻️  مهمة قائمة' if job['duplicate'] else '📥 مهمة جديدة'} {job['id']} ({job['state']})")
+    if args.follow:
+        return 0 if follow_events(f"{base}/jobs/{job['id']}/events") else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+مراقبة مجلد الصوتيات بـ inotify: كل ملف يكتمل نسخه أو تحميله يُضاف وحده إلى طابور خدمة التحويل
+(تحويل ثم تلخيص)، دون إعادة مسح المجلد أو فحص النصوص الموجودة
+
+الحدثان IN_CLOSE_WRITE (انتهاء الكتابة) و IN_MOVED_TO (إعادة تسمية إلى المجلد، كما يفعل yt-dlp
+بعد .part) يبدآن مهلة قصيرة، ثم يُعتمد الملف إن لم يتغير حجمه ووقت تعديله خلالها. بلا أحداث
+ينتظر المراقب في select دون مهلة، فلا كلفة في الخمول. على أنظمة بلا inotify يُستعمل مسح دوري.
+
+أمثلة:
+    python watch_folder.py                      # يضيف المهام إلى جدول خدمة تعمل (transcription_service.py serve)
+    python watch_folder.py --serve --workers 2  # المراقب والخدمة في عملية واحدة
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+import threading
+from pathlib import Path
+
+import audio_scanner
+import transcription_service
+
+SETTLE_SECONDS = 2.0     # مهلة ثبات الحجم بعد آخر حدث للملف
+POLL_SECONDS = 2.0       # فترة المسح في الوضع البديل
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len ثم الاسم
+
+class _Inotify:
+    """مراقبة مجلد واحد عبر inotify من libc مباشرة (ctypes)"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify غير متاح")
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch: {directory}")
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        """الأحداث المتاحة: [(الاسم، القناع)]"""
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+def is_candidate(path, ranks):
+    """ملف صوتي مكتمل الاسم: لا ملفات مخفية أو مؤقتة، ولا صيغة أدنى لاسم له صيغة مفضلة بجانبه"""
+    path = Path(path)
+    rank = ranks.get(path.suffix.lower())
+    if rank is None or path.name.startswith("."):
+        return False
+    # نفس تفضيل audio_scanner عند وجود الاسم بأكثر من صيغة
+    return not any(path.with_suffix(ext).exists() for ext, other in ranks.items() if other < rank)
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def _scan(directory, ranks):
+    """{المسار: (الحجم، وقت التعديل)} للملفات الصوتية في المجلد (للوضع البديل)"""
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and Path(entry.name).suffix.lower() in ranks and not entry.name.startswith("."):
+                stat = entry.stat()
+                found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+def iter_ready_files(directory, settle_seconds=SETTLE_SECONDS, poll_seconds=POLL_SECONDS, polling=False,
+                     preference=audio_scanner.DEFAULT_PREFERENCE):
+    """الملفات الصوتية الجديدة في المجلد بعد اكتمال كتابتها، واحداً واحداً وإلى ما لا نهاية"""
+    ranks = {ext.lower(): i for i, ext in enumerate(preference)}
+    watcher = None
+    if not polling:
+        try:
+            watcher = _Inotify(directory)
+        except (OSError, AttributeError) as e:
+            print(f"⚠ inotify غير متاح ({e}) - مسح دوري كل {poll_seconds:.0f} ث")
+    # الوضع البديل يقارن بلقطة المجلد عند البدء، فالموجود مسبقاً لا يُعد جديداً
+    known = {} if watcher else _scan(directory, ranks)
+    pending = {}  # المسار -> (التوقيع عند آخر حدث، موعد الاعتماد)
+
+    def arm(path):
+        signature = _signature(path)
+        if signature is not None:
+            pending[path] = (signature, time.monotonic() + settle_seconds)
+
+    try:
+        while True:
+            now = time.monotonic()
+            timeout = max(0.0, min(d for _, d in pending.values()) - now) if pending else None
+            if watcher:
+                # بلا ملفات معلقة: انتظار بلا مهلة حتى يصل حدث
+                readable, _, _ = select.select([watcher], [], [], timeout)
+                for name, mask in watcher.read() if readable else ():
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                        raise FileNotFoundError(f"المجلد المراقب حُذف أو نُقل: {directory}")
+                    if mask & IN_Q_OVERFLOW:
+                        # ضاعت أحداث: كل ملف صوتي في المجلد يعامل كأنه جديد، والطابور يسقط المكرر
+                        print("⚠ فاض طابور inotify - إعادة مسح المجلد")
+                        for path in _scan(directory, ranks):
+                            arm(path)
+                    elif not mask & IN_ISDIR and Path(name).suffix.lower() in ranks:
+                        arm(os.path.join(directory, name))
+            else:
+                time.sleep(poll_seconds if timeout is None else min(timeout, poll_seconds))
+                current = _scan(directory, ranks)
+                for path, signature in current.items():
+                    if known.get(path) != signature:
+                        arm(path)
+                known = current
+
+            now = time.monotonic()
+            for path, (signature, deadline) in list(pending.items()):
+                if deadline > now:
+                    continue
+                current = _signature(path)
+                if current is None:
+                    del pending[path]
+                elif current != signature:
+                    # ما زالت الكتابة جارية (كاتب يفتح الملف ويغلقه أكثر من مرة)
+                    arm(path)
+                else:
+                    del pending[path]
+                    if is_candidate(path, ranks):
+                        yield Path(path)
+    finally:
+        if watcher:
+            watcher.close()
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description="مراقبة مجلد الصوتيات وإضافة الملفات الجديدة إلى طابور التحويل")
+    parser.add_argument("--audio-dir", default=transcription_service.DEFAULT_AUDIO_DIR)
+    parser.add_argument("--priority", type=int, default=0)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--no-summarize", action="store_true", help="تحويل فقط دون تلخيص")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="ثوانٍ يثبت فيها حجم الملف قبل اعتماده")
+    parser.add_argument("--polling", action="store_true", help="مسح دوري بدلاً من inotify")
+    parser.add_argument("--serve", action="store_true", help="تشغيل خدمة التحويل في نفس العملية")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=transcription_service.DEFAULT_PORT)
+    parser.add_argument("--db", default=transcription_service.DEFAULT_DB)
+    args = parser.parse_args()
+
+    Path(args.audio_dir).mkdir(parents=True, exist_ok=True)
+    options = {"model": args.model, "summarize": not args.no_summarize}
+    service = None
+    if args.serve:
+        service = transcription_service.TranscriptionService(args.workers, args.model, db_path=args.db,
+                                                             audio_dir=args.audio_dir)
+        service.start()
+        threading.Thread(target=service.serve, args=(args.port,), daemon=True).start()
+
+    print(f"👀 مراقبة {args.audio_dir} (الملفات الجديدة فقط)")
+    try:
+        for audio_file in iter_ready_files(args.audio_dir, args.settle, polling=args.polling):
+            try:
+                if service:
+                    job, created = service.submit(audio_file, options, args.priority)
+                else:
+                    # الخدمة تلتقط المهام المضافة إلى الجدول مباشرة خلال ثوانٍ
+                    job, created = transcription_service.submit_job(audio_file, options, args.priority, args.db)
+            except (OSError, ValueError) as e:
+                print(f"✗ {audio_file.name}: {e}")
+                continue
+            print(f"{'📥' if created else '♻️ '} {audio_file.name} → المهمة {job['id']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if service:
+            service.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())